@@ -1,8 +1,29 @@
 from django.contrib import admin
-from .models import MatchResult
+from .models import MatchResult, ResumeParseTask, SkillAlias, SkillTerm
 
 @admin.register(MatchResult)
 class MatchResultAdmin(admin.ModelAdmin):
     list_display = ['user', 'job', 'match_score', 'created_at']
     search_fields = ['user__username', 'job__title']
     list_filter = ['match_score', 'created_at']
+
+@admin.register(ResumeParseTask)
+class ResumeParseTaskAdmin(admin.ModelAdmin):
+    list_display = ['user', 'status', 'created_at', 'updated_at']
+    search_fields = ['user__username']
+    list_filter = ['status', 'created_at']
+
+class SkillAliasInline(admin.TabularInline):
+    model = SkillAlias
+    extra = 1
+
+@admin.register(SkillTerm)
+class SkillTermAdmin(admin.ModelAdmin):
+    list_display = ['name', 'created_at']
+    search_fields = ['name', 'aliases__alias']
+    inlines = [SkillAliasInline]
+
+@admin.register(SkillAlias)
+class SkillAliasAdmin(admin.ModelAdmin):
+    list_display = ['alias', 'term']
+    search_fields = ['alias', 'term__name']
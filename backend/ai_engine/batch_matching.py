@@ -0,0 +1,278 @@
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from django.contrib.auth.models import User
+from jobs.models import Job, JobSkill
+from users.models import Skill
+from .catalog_snapshot import catalog_snapshot
+from .match_cache import bump_user_version
+from .matcher import _chunked, get_match_settings, iter_job_skills, remember_match_settings
+from .models import MatchResult
+from .nlp_utils import calculate_skill_match, get_related_skills
+from .scoring import JobSkillMatrix
+from .skill_terms import skill_terms
+
+# Offline matching for every user (or the users affected by recent changes).
+#
+# Users are processed in id order, in batches handed to a process pool. Each
+# worker maps the catalog snapshot (or loads the catalog) once, then scores
+# every user of a batch against it in one vectorized pass per user and
+# writes the batch with a single upsert and a single stale-row delete.
+# Progress is checkpointed as the highest user id below which every batch
+# has finished, so an interrupted run can resume.
+
+_catalog = None
+
+
+class Catalog:
+    """The whole job catalog, loaded once per worker process."""
+
+    def __init__(self):
+        # Workers map the same snapshot file rather than each holding a copy
+        snapshot = catalog_snapshot.get(wait=True)
+        if snapshot is not None:
+            self.matrix = snapshot.matrix
+        else:
+            self.matrix = JobSkillMatrix.from_job_skills(iter_job_skills(with_importance=True))
+
+    def score(self, skills, scoring):
+        """Scores of every job for a user's {skill name: proficiency}."""
+        if scoring == 'weighted':
+            return self.matrix.weighted_score(skills)
+        return self.matrix.score(list(skills))
+
+
+def _init_worker():
+    global _catalog
+    _catalog = Catalog()
+
+
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog()
+    return _catalog
+
+
+def match_users(user_ids, scoring=None, min_score=None):
+    """
+    Score and store matches for a batch of users against the loaded catalog.
+
+    Each user is scored with the mode and threshold they last matched with,
+    unless `scoring` / `min_score` override them; overridden values are
+    stored as the users' new match settings. Returns (number of users,
+    number of matches written).
+    """
+    catalog = get_catalog()
+    settings_by_user = get_match_settings(user_ids)
+    for user_id, (user_scoring, user_min_score) in settings_by_user.items():
+        settings_by_user[user_id] = (
+            scoring or user_scoring,
+            user_min_score if min_score is None else min_score,
+        )
+    rows_by_user = {user_id: [] for user_id in user_ids}
+    user_rows = Skill.objects.filter(user_id__in=user_ids).values_list('user_id', 'term_id', 'name', 'proficiency')
+    for user_id, *row in user_rows:
+        rows_by_user[user_id].append(row)
+    skills_by_user = {user_id: skill_terms.proficiencies(rows) for user_id, rows in rows_by_user.items()}
+
+    matches = []
+    for user_id, skills in skills_by_user.items():
+        if not skills:
+            continue
+        user_scoring, user_min_score = settings_by_user[user_id]
+        scores = np.asarray(catalog.score(skills, user_scoring))
+        user_skills = list(skills)
+        # Only rows that share a skill with the user score above zero
+        for row in np.flatnonzero((scores > 0) & (scores >= user_min_score)).tolist():
+            job_id, job_skills, score = int(catalog.matrix.job_ids[row]), catalog.matrix.job_skills[row], scores[row].item()
+            matched, missing = calculate_skill_match(user_skills, job_skills)
+            matches.append(MatchResult(
+                user_id=user_id,
+                job_id=job_id,
+                match_score=score,
+                matched_skills=matched,
+                missing_skills=missing
+            ))
+
+    with transaction.atomic():
+        persist_user_batch(user_ids, matches)
+        if scoring is not None or min_score is not None:
+            # Later incremental re-matching continues with the overridden settings
+            users_by_settings = {}
+            for user_id, user_settings in settings_by_user.items():
+                users_by_settings.setdefault(user_settings, []).append(user_id)
+            for (user_scoring, user_min_score), users in users_by_settings.items():
+                remember_match_settings(users, user_scoring, user_min_score)
+    return len(user_ids), len(matches)
+
+
+def _match_indexed(task):
+    index, user_ids, scoring, min_score = task
+    return index, match_users(user_ids, scoring, min_score)
+
+
+def persist_user_batch(user_ids, matches, batch_size=None):
+    """
+    Atomically replace the stored matches of several users at once.
+
+    Like persist_matches, but one upsert and one delete cover the whole batch.
+    """
+    batch_size = batch_size or settings.MATCHING_BATCH_SIZE
+    kept = {(match.user_id, match.job_id) for match in matches}
+    with transaction.atomic():
+        MatchResult.objects.bulk_create(
+            matches,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['user', 'job'],
+            update_fields=['match_score', 'matched_skills', 'missing_skills'],
+        )
+        existing = MatchResult.objects.filter(user_id__in=user_ids).values_list('id', 'user_id', 'job_id')
+        stale_ids = [row_id for row_id, user_id, job_id in existing if (user_id, job_id) not in kept]
+        for start in range(0, len(stale_ids), batch_size):
+            MatchResult.objects.filter(id__in=stale_ids[start:start + batch_size]).delete()
+        for user_id in user_ids:
+            bump_user_version(user_id)
+
+
+def changed_user_ids(since):
+    """
+    Users whose matches may be outdated since `since`: those who added a skill
+    or re-uploaded a resume, and those holding a skill equal or related to a
+    skill of a job updated since. Skill edits and deletions carry no
+    timestamp; the incremental matcher handles those as they happen.
+    """
+    user_ids = set(Skill.objects.filter(created_at__gte=since).values_list('user_id', flat=True))
+    user_ids |= set(User.objects.filter(resume__updated_at__gte=since).values_list('id', flat=True))
+
+    changed_jobs = Job.objects.filter(updated_at__gte=since).values('id')
+    related = set()
+    skill_terms.ensure_fresh()
+    job_skills = JobSkill.objects.filter(job_id__in=changed_jobs).values_list('term_id', 'skill_name').distinct()
+    for term_id, skill_name in job_skills:
+        related |= get_related_skills(skill_terms.term_name(term_id, skill_name))
+    for chunk in _chunked(sorted(skill_terms.known_ids(related)), settings.MATCHING_BATCH_SIZE):
+        user_ids |= set(Skill.objects.filter(term_id__in=chunk).values_list('user_id', flat=True))
+    return user_ids
+
+
+class Checkpoint:
+    """
+    Progress of a rematch_all run, kept in a small JSON file.
+
+    `done_through` is the highest user id such that every user up to it has
+    been matched; a resumed run starts after it.
+    """
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = params
+        self.done_through = 0
+
+    def load(self):
+        """Resume from the file if it was written by a run with the same parameters."""
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if state.get('params') != self.params:
+            return False
+        self.done_through = state.get('done_through', 0)
+        return True
+
+    def save(self, done_through):
+        self.done_through = done_through
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'params': self.params, 'done_through': done_through}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class Progress:
+    """Throughput counters passed to the progress callback after every batch."""
+
+    def __init__(self, total_users):
+        self.total_users = total_users
+        self.users = 0
+        self.matches = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def users_per_second(self):
+        return self.users / self.elapsed if self.elapsed else 0.0
+
+
+def rematch_all(user_ids=None, workers=None, batch_size=None, scoring=None, min_score=None,
+                checkpoint=None, progress=None):
+    """
+    Re-match `user_ids` (default: every user with skills) against the whole catalog.
+
+    Batches of `batch_size` users are spread over `workers` processes (default:
+    CPU count; 1 runs inline). Users keep their own scoring mode and
+    threshold unless `scoring` / `min_score` are given (see match_users).
+    With a `checkpoint`, users at or below its
+    `done_through` id are skipped and it is advanced as batches finish.
+    `progress(Progress)` is called after every batch. Returns the final Progress.
+    """
+    batch_size = batch_size or settings.MATCHING_BATCH_SIZE
+    workers = workers or os.cpu_count() or 1
+
+    if user_ids is None:
+        user_ids = Skill.objects.values_list('user_id', flat=True).distinct()
+    user_ids = sorted(set(user_ids))
+    if checkpoint:
+        user_ids = [user_id for user_id in user_ids if user_id > checkpoint.done_through]
+    batches = list(_chunked(user_ids, batch_size))
+    stats = Progress(len(user_ids))
+
+    finished = set()
+    next_unfinished = 0
+
+    def record(index, result):
+        nonlocal next_unfinished
+        users, matches = result
+        stats.users += users
+        stats.matches += matches
+        finished.add(index)
+        while next_unfinished in finished:
+            next_unfinished += 1
+        if checkpoint and next_unfinished:
+            checkpoint.save(batches[next_unfinished - 1][-1])
+        if progress:
+            progress(stats)
+
+    if workers == 1 or len(batches) <= 1:
+        _init_worker()
+        for index, batch in enumerate(batches):
+            record(index, match_users(batch, scoring, min_score))
+    else:
+        # Workers are forked so they inherit the configured Django setup; the
+        # parent's connections are closed first so no socket is shared. The
+        # catalog snapshot is brought up to date once, before the workers map it
+        catalog_snapshot.get(wait=True)
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        tasks = [(index, batch, scoring, min_score) for index, batch in enumerate(batches)]
+        with context.Pool(workers, initializer=_init_worker) as pool:
+            for index, result in pool.imap_unordered(_match_indexed, tasks):
+                record(index, result)
+
+    if checkpoint:
+        checkpoint.clear()
+    return stats
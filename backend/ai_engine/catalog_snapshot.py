@@ -0,0 +1,275 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections.abc import Sequence
+from pathlib import Path
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from .nlp_utils import IMPORTANCE_WEIGHTS
+from .scoring import JobSkillMatrix
+from .skill_index import skill_index
+from .skill_terms import skill_terms
+
+# A compact, read-only copy of the job catalog's skills for the matcher.
+#
+# The catalog is written once to a binary file: a JSON header (catalog stamp,
+# skill vocabulary, array layout) followed by the arrays of a JobSkillMatrix
+# in CSR form -- job ids, row offsets, integer skill ids, first-occurrence
+# flags, importance weights and row numbers. Every process memory-maps the
+# same file, so the arrays are shared through the page cache rather than
+# rebuilt from the ORM per request or per worker.
+#
+# The file name carries the catalog stamp: the skill index's shared version,
+# which moves whenever JobSkill rows are written, and the skill term map's
+# version, since the snapshot stores canonical skill names. Both are read
+# from the match cache, so checking the stamp runs no query over the
+# catalog. When the stamp moves, the first process to notice schedules the
+# new snapshot on the background pool; until the file exists get() returns
+# None and the matcher reads the catalog from the database, so no request
+# pays for a rebuild.
+
+MAGIC = b'JMCATSNP'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+PREAMBLE = struct.Struct('<8sII')  # magic, format version, header length
+
+ARRAYS = {
+    'job_ids': np.int64,
+    'indptr': np.int64,
+    'indices': np.int32,
+    'first': np.bool_,
+    'weights': np.float64,
+    'rows': np.int32,
+    'name_ids': np.int32,
+}
+
+
+class SnapshotJobSkills(Sequence):
+    """The skill names of every snapshot row, decoded on access."""
+
+    def __init__(self, names, name_ids, indptr):
+        self.names = names
+        self.name_ids = name_ids
+        self.indptr = indptr
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, row):
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return [self.names[name_id] for name_id in self.name_ids[start:end].tolist()]
+
+
+class CatalogSnapshot:
+    """A memory-mapped snapshot file, exposed as a JobSkillMatrix over the whole catalog."""
+
+    def __init__(self, path, stamp, matrix, buffer=None):
+        self.path = path
+        self.stamp = stamp
+        self.matrix = matrix
+        self._buffer = buffer
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_length = PREAMBLE.unpack_from(buffer)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{path} is not a version {FORMAT_VERSION} catalog snapshot')
+        header = json.loads(buffer[PREAMBLE.size:PREAMBLE.size + header_length])
+        data_start = _aligned(PREAMBLE.size + header_length)
+
+        arrays = {
+            name: np.frombuffer(buffer, dtype=ARRAYS[name], count=length, offset=data_start + offset)
+            for name, (offset, length) in header['arrays'].items()
+        }
+        vocabulary = {skill: skill_id for skill_id, skill in enumerate(header['vocabulary'])}
+        matrix = JobSkillMatrix(
+            arrays['job_ids'],
+            SnapshotJobSkills(header['names'], arrays['name_ids'], arrays['indptr']),
+            arrays['indptr'],
+            arrays['indices'],
+            arrays['first'],
+            vocabulary,
+            arrays['weights'],
+            rows=arrays['rows'],
+        )
+        return cls(path, header['stamp'], matrix, buffer)
+
+    def positions(self, job_ids):
+        """Sorted row positions of the given job ids; ids without skills are left out."""
+        wanted = np.fromiter(sorted(job_ids), dtype=np.int64, count=len(job_ids))
+        positions = np.searchsorted(self.matrix.job_ids, wanted)
+        positions = positions[positions < len(self.matrix)]
+        return positions[self.matrix.job_ids[positions] == wanted[:len(positions)]]
+
+    def iter_matrices(self, job_ids, chunk_size):
+        """Yield JobSkillMatrix chunks of at most `chunk_size` of the given jobs, in job id order."""
+        positions = self.positions(job_ids)
+        for start in range(0, len(positions), chunk_size):
+            yield self.matrix.select(positions[start:start + chunk_size])
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(path, stamp, job_skills):
+    """
+    Write a snapshot of `job_skills` ((job_id, [skill_name, ...], [importance, ...])
+    triples in job id order, as from iter_job_skills(with_importance=True)).
+
+    The file is written next to `path` and renamed into place, so readers
+    never see a partial snapshot.
+    """
+    vocabulary, names = {}, {}
+    job_ids, indptr, indices, first, weights, name_ids = [], [0], [], [], [], []
+    default_weight = IMPORTANCE_WEIGHTS['required']
+    for job_id, skills, importances in job_skills:
+        seen = set()
+        for skill, importance in zip(skills, importances):
+            skill_id = vocabulary.setdefault(skill.lower(), len(vocabulary))
+            indices.append(skill_id)
+            first.append(skill_id not in seen)
+            seen.add(skill_id)
+            weights.append(IMPORTANCE_WEIGHTS.get(importance, default_weight))
+            name_ids.append(names.setdefault(skill, len(names)))
+        job_ids.append(job_id)
+        indptr.append(len(indices))
+
+    arrays = {
+        'job_ids': job_ids,
+        'indptr': indptr,
+        'indices': indices,
+        'first': first,
+        'weights': weights,
+        'rows': np.repeat(np.arange(len(job_ids)), np.diff(indptr)),
+        'name_ids': name_ids,
+    }
+    arrays = {name: np.asarray(values, dtype=ARRAYS[name]) for name, values in arrays.items()}
+
+    # Array offsets are relative to the aligned end of the header
+    header = {'stamp': stamp, 'vocabulary': list(vocabulary), 'names': list(names), 'arrays': {}}
+    offset = 0
+    for name, array in arrays.items():
+        header['arrays'][name] = [offset, len(array)]
+        offset = _aligned(offset + array.nbytes)
+    encoded = json.dumps(header).encode()
+    data_start = _aligned(PREAMBLE.size + len(encoded))
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+            f.write(encoded)
+            for name, array in arrays.items():
+                f.seek(data_start + header['arrays'][name][0])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+BUILD_LOCK_KEY = 'catalog-snapshot:building:{}'
+BUILD_LOCK_TIMEOUT = 600
+
+
+def build_in_background(stamp):
+    """Background task writing the snapshot for `stamp`, unless the catalog has moved on."""
+    try:
+        if catalog_snapshot.current_stamp() == stamp:
+            catalog_snapshot.build(stamp)
+    finally:
+        caches[settings.MATCH_CACHE].delete(BUILD_LOCK_KEY.format(catalog_snapshot.path_for(stamp).name))
+
+
+class SnapshotStore:
+    """
+    The current catalog snapshot of this process.
+
+    get() compares the catalog stamp with that of the mapped snapshot (two
+    cache reads) and, when they differ, maps the file for the new stamp.
+    If no process has written that file yet, one background build is
+    scheduled (a cache lock keeps other processes from scheduling their own)
+    and get() returns None meanwhile; get(wait=True) writes it inline instead.
+    Snapshots for older stamps are removed once a new one is written;
+    processes still mapping one keep reading it until their next get().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def current_stamp(self):
+        return [skill_index.version(), skill_terms.version()]
+
+    def directory(self):
+        return Path(settings.CATALOG_SNAPSHOT_DIR)
+
+    def prefix(self):
+        # Several databases (e.g. the test database) may share the directory
+        database = str(settings.DATABASES['default']['NAME'])
+        return f"catalog-{hashlib.sha256(database.encode()).hexdigest()[:12]}-"
+
+    def path_for(self, stamp):
+        digest = hashlib.sha256(json.dumps(stamp).encode()).hexdigest()[:16]
+        return self.directory() / f'{self.prefix()}{digest}.v{FORMAT_VERSION}.snap'
+
+    def build(self, stamp=None):
+        """Write the snapshot for the current catalog and return its path."""
+        from .matcher import iter_job_skills
+
+        stamp = stamp or self.current_stamp()
+        path = self.path_for(stamp)
+        write_snapshot(path, stamp, iter_job_skills(with_importance=True))
+        for old in self.directory().glob(f'{self.prefix()}*.snap'):
+            if old != path:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+        return path
+
+    def get(self, wait=False):
+        """
+        The snapshot matching the current catalog, or None when snapshots are
+        disabled or the current one is still being written (unless `wait`).
+        """
+        from .tasks import submit
+
+        if not settings.CATALOG_SNAPSHOT_ENABLED:
+            return None
+        stamp = self.current_stamp()
+        with self._lock:
+            if self._snapshot is not None and self._snapshot.stamp == stamp:
+                return self._snapshot
+            path = self.path_for(stamp)
+            try:
+                snapshot = CatalogSnapshot.open(path)
+            except (OSError, ValueError):
+                snapshot = None
+            if snapshot is None or snapshot.stamp != stamp:
+                if not wait:
+                    if caches[settings.MATCH_CACHE].add(BUILD_LOCK_KEY.format(path.name), 1, BUILD_LOCK_TIMEOUT):
+                        submit(build_in_background, stamp)
+                    return None
+                snapshot = CatalogSnapshot.open(self.build(stamp))
+            self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+
+catalog_snapshot = SnapshotStore()
@@ -0,0 +1,141 @@
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import transaction
+from jobs.models import JobSkill
+from users.models import Skill
+from .match_cache import bump_catalog_version
+from .matcher import get_match_settings, persist_matches, score_jobs
+from .models import MatchResult
+from .nlp_utils import (
+    calculate_ai_match_score,
+    calculate_skill_match,
+    calculate_weighted_match_score,
+    get_related_skills,
+)
+from .skill_index import skill_index
+from .skill_terms import skill_terms
+from .tasks import submit
+
+# Incremental re-matching keeps stored MatchResult rows fresh as skills and
+# jobs change, recomputing only the (user, job) pairs a change can affect.
+# Each user is rescored with the scoring mode and min_score their stored
+# matches were last computed with (MatchSettings).
+# Signal handlers schedule the work on the background pool after commit.
+
+_state = threading.local()
+
+
+@contextmanager
+def incremental_matching_suspended():
+    """Ignore skill/job signals inside the block; the caller re-matches afterwards."""
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def is_suspended():
+    return not settings.INCREMENTAL_MATCHING or getattr(_state, 'suspended', False)
+
+
+def rematch_user(user_id, job_ids=None):
+    """Recompute a user's stored matches, optionally only for `job_ids`."""
+    proficiencies = skill_terms.proficiencies(
+        Skill.objects.filter(user_id=user_id).values_list('term_id', 'name', 'proficiency')
+    )
+    user_skills = list(proficiencies)
+    scoring, min_score = get_match_settings([user_id])[user_id]
+    matches = score_jobs(
+        user_id, user_skills, job_ids=job_ids, min_score=min_score, scoring=scoring, proficiencies=proficiencies
+    ) if user_skills else []
+    persist_matches(user_id, matches, job_ids=job_ids)
+
+
+def rematch_user_skill(user_id, skill_name):
+    """A user gained or lost `skill_name`: rescore the jobs that skill can reach."""
+    rematch_user(user_id, job_ids=skill_index.candidate_job_ids([skill_name]))
+
+
+def rematch_job(job_id, batch_size=None):
+    """
+    A job's skill list changed: rescore it for every user it can affect.
+
+    Affected users are those holding a skill equal or related to any of the
+    job's skills; they are scored in memory against this one job, each with
+    their own scoring mode and min_score. Stored matches for anyone else are
+    deleted.
+    """
+    batch_size = batch_size or settings.MATCHING_BATCH_SIZE
+    skill_terms.ensure_fresh()
+    rows = [
+        (skill_terms.term_name(term_id, skill_name), importance)
+        for term_id, skill_name, importance in
+        JobSkill.objects.filter(job_id=job_id).order_by('id').values_list('term_id', 'skill_name', 'importance')
+    ]
+    job_skills = [skill_name for skill_name, _ in rows]
+
+    related = set()
+    for skill_name in job_skills:
+        related |= get_related_skills(skill_name)
+    term_ids = skill_terms.known_ids(related)
+    rows_by_user = {}
+    if term_ids:
+        affected_users = Skill.objects.filter(term_id__in=term_ids).values('user_id')
+        user_rows = Skill.objects.filter(user_id__in=affected_users).values_list('user_id', 'term_id', 'name', 'proficiency')
+        for user_id, *row in user_rows:
+            rows_by_user.setdefault(user_id, []).append(row)
+    skills_by_user = {user_id: skill_terms.proficiencies(user_rows) for user_id, user_rows in rows_by_user.items()}
+
+    match_settings = get_match_settings(skills_by_user)
+    matches = []
+    for user_id, user_skills in skills_by_user.items():
+        scoring, min_score = match_settings[user_id]
+        matched, missing = calculate_skill_match(list(user_skills), job_skills)
+        if scoring == 'weighted':
+            score = calculate_weighted_match_score(user_skills, rows)
+        else:
+            score = calculate_ai_match_score(list(user_skills), job_skills, matched, missing)
+        if score > 0 and score >= min_score:
+            matches.append(MatchResult(
+                user_id=user_id,
+                job_id=job_id,
+                match_score=score,
+                matched_skills=matched,
+                missing_skills=missing
+            ))
+
+    kept_user_ids = {match.user_id for match in matches}
+    with transaction.atomic():
+        MatchResult.objects.bulk_create(
+            matches,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['user', 'job'],
+            update_fields=['match_score', 'matched_skills', 'missing_skills'],
+        )
+        existing_user_ids = set(MatchResult.objects.filter(job_id=job_id).values_list('user_id', flat=True))
+        stale_user_ids = list(existing_user_ids - kept_user_ids)
+        for start in range(0, len(stale_user_ids), batch_size):
+            MatchResult.objects.filter(
+                job_id=job_id, user_id__in=stale_user_ids[start:start + batch_size]
+            ).delete()
+        # Rows of many users changed; the catalog version covers all of them
+        bump_catalog_version()
+
+
+def schedule_user_rematch(user_id):
+    if not is_suspended():
+        submit(rematch_user, user_id)
+
+
+def schedule_user_skill_rematch(user_id, skill_name):
+    if not is_suspended():
+        submit(rematch_user_skill, user_id, skill_name)
+
+
+def schedule_job_rematch(job_id):
+    if not is_suspended():
+        submit(rematch_job, job_id)
@@ -0,0 +1,255 @@
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+# Lightweight request instrumentation: database query count/time per request
+# and wall time of named stages (loading skills, scoring, PDF extraction...).
+#
+# collect() gathers the numbers for one unit of work; InstrumentationMiddleware
+# wraps every request in it and run_task every background task. stage() times
+# a block and can be used anywhere: inside a collection it is reported with
+# that request (Server-Timing header), and every stage feeds the process-wide
+# totals served at /metrics in the Prometheus text format. Totals are per
+# process; with several web workers (or BACKGROUND_TASK_MODE = 'process') each
+# reports its own.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def render(self, name, labels):
+        lines = []
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f'{name}_bucket{_labels(labels, le=_number(bound))} {count}')
+        lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {self.count}')
+        lines.append(f'{name}_sum{_labels(labels)} {_number(self.sum)}')
+        lines.append(f'{name}_count{_labels(labels)} {self.count}')
+        return lines
+
+
+def _number(value):
+    return repr(float(value))
+
+
+def _labels(labels, **extra):
+    pairs = list(labels.items()) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+class MetricsRegistry:
+    """Process-wide request and stage totals, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}          # (view, method, status) -> count
+            self.request_seconds = {}   # view -> Histogram
+            self.db_queries = {}        # view -> query count
+            self.db_seconds = {}        # view -> seconds spent in queries
+            self.stage_seconds = {}     # stage -> Histogram
+
+    def observe_request(self, view, method, status, seconds, queries, query_seconds):
+        with self._lock:
+            key = (view, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.request_seconds.setdefault(view, Histogram()).observe(seconds)
+            self.db_queries[view] = self.db_queries.get(view, 0) + queries
+            self.db_seconds[view] = self.db_seconds.get(view, 0.0) + query_seconds
+
+    def observe_stage(self, name, seconds):
+        with self._lock:
+            self.stage_seconds.setdefault(name, Histogram()).observe(seconds)
+
+    def render(self):
+        with self._lock:
+            lines = [
+                '# HELP jobmatch_requests_total HTTP requests handled.',
+                '# TYPE jobmatch_requests_total counter',
+            ]
+            for (view, method, status), count in sorted(self.requests.items()):
+                lines.append(f'jobmatch_requests_total{_labels({"view": view, "method": method, "status": status})} {count}')
+
+            lines += [
+                '# HELP jobmatch_request_duration_seconds Time spent handling HTTP requests.',
+                '# TYPE jobmatch_request_duration_seconds histogram',
+            ]
+            for view, histogram in sorted(self.request_seconds.items()):
+                lines += histogram.render('jobmatch_request_duration_seconds', {'view': view})
+
+            lines += [
+                '# HELP jobmatch_db_queries_total Database queries issued while handling requests.',
+                '# TYPE jobmatch_db_queries_total counter',
+            ]
+            for view, count in sorted(self.db_queries.items()):
+                lines.append(f'jobmatch_db_queries_total{_labels({"view": view})} {count}')
+
+            lines += [
+                '# HELP jobmatch_db_query_seconds_total Time spent in database queries while handling requests.',
+                '# TYPE jobmatch_db_query_seconds_total counter',
+            ]
+            for view, seconds in sorted(self.db_seconds.items()):
+                lines.append(f'jobmatch_db_query_seconds_total{_labels({"view": view})} {_number(seconds)}')
+
+            lines += [
+                '# HELP jobmatch_stage_duration_seconds Time spent in named processing stages.',
+                '# TYPE jobmatch_stage_duration_seconds histogram',
+            ]
+            for name, histogram in sorted(self.stage_seconds.items()):
+                lines += histogram.render('jobmatch_stage_duration_seconds', {'stage': name})
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class Collection:
+    """Query count/time and stage timings gathered by one collect() block."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.stages = {}  # stage -> seconds, in first-seen order
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed as a database execute wrapper
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - started
+
+    def add_stage(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def server_timing(self):
+        """Value for a Server-Timing header: db, one entry per stage, and total."""
+        entries = [f'db;dur={self.query_seconds * 1000:.1f};desc="{self.queries} queries"']
+        entries += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.stages.items()]
+        entries.append(f'total;dur={self.elapsed * 1000:.1f}')
+        return ', '.join(entries)
+
+
+_current = ContextVar('instrumentation_collection', default=None)
+
+
+@contextmanager
+def collect():
+    """
+    Record the database queries and stages run inside the block into a Collection.
+
+    A stage entered several times within the block is added up and counted
+    once, with its total, in the process-wide stage histogram.
+    """
+    collection = Collection()
+    token = _current.set(collection)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(collection))
+            yield collection
+    finally:
+        _current.reset(token)
+        for name, seconds in collection.stages.items():
+            registry.observe_stage(name, seconds)
+
+
+def _record_stage(name, seconds):
+    collection = _current.get()
+    if collection is None:
+        registry.observe_stage(name, seconds)
+    else:
+        collection.add_stage(name, seconds)
+
+
+@contextmanager
+def stage(name):
+    """Time the block as stage `name`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_stage(name, time.perf_counter() - started)
+
+
+def timed_iter(name, iterable):
+    """Yield from `iterable`, counting only the time spent producing items as stage `name`."""
+    iterator = iter(iterable)
+    spent = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                spent += time.perf_counter() - started
+            yield item
+    finally:
+        _record_stage(name, spent)
+
+
+class InstrumentationMiddleware:
+    """Collect query and stage timings for every request; see SERVER_TIMING_HEADERS."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect() as collection:
+            response = self.get_response(request)
+        match = request.resolver_match
+        registry.observe_request(
+            match.view_name if match else 'unmatched',
+            request.method,
+            response.status_code,
+            collection.elapsed,
+            collection.queries,
+            collection.query_seconds,
+        )
+        if settings.SERVER_TIMING_HEADERS:
+            response['Server-Timing'] = collection.server_timing()
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, served only to METRICS_ALLOWED_IPS."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
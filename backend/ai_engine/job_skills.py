@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from jobs.models import Job, JobSkill
+from .incremental import incremental_matching_suspended
+from .match_cache import bump_catalog_version
+from .skill_index import skill_index
+from .nlp_utils import extract_skills_batch, extract_skills_from_text
+from .skill_terms import skill_terms
+
+# Skills extracted from job descriptions are stored as JobSkill rows with
+# provenance 'auto', so they are computed once when a job is written rather
+# than being missing at match time. Skills listed explicitly ('manual') are
+# never touched, and an auto row is not added when a manual row already
+# names the same skill (in any spelling resolving to the same skill term).
+
+AUTO = 'auto'
+
+
+def apply_auto_skills(extracted_by_job):
+    """
+    Make each job's auto-extracted JobSkills equal to the given skill set.
+
+    `extracted_by_job` maps job id -> iterable of lowercase skill names.
+    Costs one select, at most one delete, one bulk insert and one update
+    however many jobs are passed. The changed jobs' updated_at is touched
+    and the match cache's catalog version bumped; per-row re-matching is
+    suppressed. Returns the ids of the jobs whose skills changed so the
+    caller can re-match them.
+    """
+    manual = {job_id: set() for job_id in extracted_by_job}
+    auto = {job_id: {} for job_id in extracted_by_job}
+    skill_terms.ensure_fresh()
+    rows = JobSkill.objects.filter(job_id__in=list(extracted_by_job)).values_list(
+        'id', 'job_id', 'term_id', 'skill_name', 'provenance'
+    )
+    for row_id, job_id, term_id, skill_name, provenance in rows:
+        if provenance == AUTO:
+            auto[job_id][skill_terms.term_name(term_id, skill_name)] = row_id
+        else:
+            manual[job_id].add(skill_terms.term_name(term_id, skill_name))
+
+    stale_ids, new_rows, changed = [], [], set()
+    for job_id, extracted in extracted_by_job.items():
+        wanted = {skill_terms.term_name(None, skill_name) for skill_name in extracted} - manual[job_id]
+        for skill_name, row_id in auto[job_id].items():
+            if skill_name not in wanted:
+                stale_ids.append(row_id)
+                changed.add(job_id)
+        for skill_name in sorted(wanted - auto[job_id].keys()):
+            new_rows.append(JobSkill(job_id=job_id, skill_name=skill_name, provenance=AUTO))
+            changed.add(job_id)
+
+    with transaction.atomic(), incremental_matching_suspended():
+        if stale_ids:
+            JobSkill.objects.filter(id__in=stale_ids).delete()
+        skill_terms.assign(new_rows, 'skill_name')
+        JobSkill.objects.bulk_create(new_rows, batch_size=settings.MATCHING_BATCH_SIZE, ignore_conflicts=True)
+        if new_rows:
+            skill_index.changed()
+        if changed:
+            # The bulk writes above skip the signals that normally touch the
+            # jobs (moving their ETags) and bump the catalog version
+            Job.objects.filter(id__in=changed).update(updated_at=timezone.now())
+            bump_catalog_version()
+    return changed
+
+
+def sync_auto_skills(job):
+    """Re-extract one job's skills from its description; True if they changed."""
+    return bool(apply_auto_skills({job.pk: extract_skills_from_text(job.description or '')}))
+
+
+def _iter_batches(queryset, batch_size):
+    batch = []
+    for row in queryset.values_list('id', 'description').iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def backfill_auto_skills(queryset=None, workers=None, batch_size=None, progress=None):
+    """
+    Extract and store auto skills for every job in `queryset` (default: all jobs).
+
+    Descriptions are streamed from the database in batches and extracted on
+    a pool of `workers` processes (default: CPU count) while the main process
+    writes finished batches. `progress(jobs_done, jobs_changed)` is called
+    after every batch. Returns (jobs processed, jobs whose skills changed).
+    """
+    queryset = Job.objects.all() if queryset is None else queryset
+    batch_size = batch_size or settings.MATCHING_BATCH_SIZE
+    workers = workers or os.cpu_count() or 1
+    done = changed = 0
+
+    def write(extracted_by_job):
+        nonlocal done, changed
+        changed += len(apply_auto_skills(extracted_by_job))
+        done += len(extracted_by_job)
+        if progress:
+            progress(done, changed)
+
+    batches = _iter_batches(queryset.order_by('id'), batch_size)
+    if workers == 1:
+        for batch in batches:
+            write(extract_skills_batch(batch))
+        return done, changed
+
+    # Spawned workers share nothing with this process (in particular not its
+    # database connection); they only run the extractor. A bounded window of
+    # in-flight batches keeps memory flat however large the catalog is.
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(extract_skills_batch, batch))
+            if len(pending) >= workers * 2:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+    return done, changed
@@ -0,0 +1,15 @@
+import os
+from django.core.management.base import BaseCommand
+from ai_engine.catalog_snapshot import CatalogSnapshot, catalog_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Write the memory-mapped job catalog snapshot used by the matcher (e.g. after a deploy).'
+
+    def handle(self, *args, **options):
+        path = catalog_snapshot.build()
+        snapshot = CatalogSnapshot.open(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {path}: {len(snapshot.matrix)} jobs, {len(snapshot.matrix.indices)} job skills, '
+            f'{len(snapshot.matrix.vocabulary)} distinct skills, {os.path.getsize(path)} bytes.'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from jobs.models import Job
+from ai_engine.job_skills import backfill_auto_skills
+
+
+class Command(BaseCommand):
+    help = "Extract skills from job descriptions into 'auto' JobSkill rows, in parallel."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Extraction processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, help='Jobs per batch (default: MATCHING_BATCH_SIZE)')
+        parser.add_argument('--missing-only', action='store_true', help='Only jobs that have no skills yet')
+
+    def handle(self, *args, **options):
+        queryset = Job.objects.all()
+        if options['missing_only']:
+            queryset = queryset.filter(required_skills__isnull=True)
+
+        def report(done, changed):
+            self.stdout.write(f'{done} jobs processed, {changed} updated')
+
+        done, changed = backfill_auto_skills(
+            queryset,
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            progress=report,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Extracted skills for {done} jobs; {changed} changed.'))
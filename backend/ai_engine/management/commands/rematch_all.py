@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from ai_engine.batch_matching import Checkpoint, changed_user_ids, rematch_all
+
+
+def parse_since(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'--since must be an ISO date or datetime, not {value!r}')
+        moment = timezone.datetime(day.year, day.month, day.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = 'Re-match every user (or those affected by recent changes) against the whole job catalog, in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Matching processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, help='Users per batch (default: MATCHING_BATCH_SIZE)')
+        parser.add_argument('--since', help='Only users whose skills, resume or matching jobs changed since this ISO date/datetime')
+        parser.add_argument(
+            '--scoring', choices=('legacy', 'weighted'),
+            help="Scoring mode for every user (default: each user's own, else MATCH_SCORING)",
+        )
+        parser.add_argument(
+            '--min-score', type=float,
+            help="Do not store matches scoring below this (default: each user's own threshold, else 0)",
+        )
+        parser.add_argument('--checkpoint', default='rematch_all.checkpoint', help='Progress file used by --resume')
+        parser.add_argument('--resume', action='store_true', help='Continue an interrupted run with the same options')
+
+    def handle(self, *args, **options):
+        since = parse_since(options['since']) if options['since'] else None
+        user_ids = sorted(changed_user_ids(since)) if since else None
+
+        checkpoint = Checkpoint(options['checkpoint'], {
+            'since': since.isoformat() if since else None,
+            'scoring': options['scoring'],
+            'min_score': options['min_score'],
+        })
+        if options['resume']:
+            if checkpoint.load():
+                self.stdout.write(f'Resuming after user {checkpoint.done_through}')
+            else:
+                self.stdout.write('No matching checkpoint; starting from the beginning')
+
+        def report(stats):
+            self.stdout.write(
+                f'{stats.users}/{stats.total_users} users, {stats.matches} matches, '
+                f'{stats.users_per_second:.1f} users/s'
+            )
+
+        stats = rematch_all(
+            user_ids,
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            scoring=options['scoring'],
+            min_score=options['min_score'],
+            checkpoint=checkpoint,
+            progress=report,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Re-matched {stats.users} users ({stats.matches} matches) in {stats.elapsed:.1f}s, '
+            f'{stats.users_per_second:.1f} users/s.'
+        ))
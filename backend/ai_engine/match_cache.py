@@ -0,0 +1,88 @@
+import hashlib
+import json
+import random
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from users.models import Skill
+
+# Cached match-list responses are keyed by version stamps instead of a TTL:
+#
+# - the user's skill-set hash changes as soon as their skills do;
+# - the global catalog version is bumped on every Job/JobSkill write, and
+#   explicitly by the bulk paths that skip those signals (ingest, auto-skill
+#   extraction, term renames and alias merges), so reading it is one cache
+#   lookup;
+# - the per-user results version is bumped whenever their stored matches
+#   are rewritten.
+#
+# A changed stamp simply produces a new key; old entries age out of the
+# cache backend on their own. settings.MATCH_CACHE is shared by every process,
+# so writes made by imports, rematch_all or other workers are seen here too.
+
+CATALOG_VERSION_KEY = 'matches:catalog-version'
+USER_VERSION_KEY = 'matches:user-version:{}'
+
+
+def _cache():
+    return caches[settings.MATCH_CACHE]
+
+
+def _get_counter(key):
+    cache = _cache()
+    value = cache.get(key)
+    if value is None:
+        # Start from a random value so a recreated counter never repeats old keys
+        cache.add(key, random.randrange(2 ** 31), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def _bump_counter(key):
+    # A fresh random value rather than incr(): the database and file backends
+    # implement incr() as get-then-set, so two concurrent bumps could write the
+    # same value and one would be lost
+    _cache().set(key, random.randrange(2 ** 31), timeout=None)
+
+
+def get_catalog_version():
+    return _get_counter(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate every user's cached matches once the current transaction commits."""
+    transaction.on_commit(lambda: _bump_counter(CATALOG_VERSION_KEY))
+
+
+def get_user_version(user_id):
+    return _get_counter(USER_VERSION_KEY.format(user_id))
+
+
+def bump_user_version(user_id):
+    """Invalidate one user's cached matches once the current transaction commits."""
+    transaction.on_commit(lambda: _bump_counter(USER_VERSION_KEY.format(user_id)))
+
+
+def skill_set_hash(user_id):
+    skills = sorted(Skill.objects.filter(user_id=user_id).values_list('name', 'proficiency'))
+    return hashlib.sha256(json.dumps(skills).encode()).hexdigest()[:16]
+
+
+def match_cache_key(kind, user_id, params):
+    """Cache key for one user's `kind` ('list' or 'run') response with the given parameters."""
+    params_hash = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return ':'.join([
+        'matches', kind, str(user_id),
+        skill_set_hash(user_id),
+        str(get_catalog_version()),
+        str(get_user_version(user_id)),
+        params_hash,
+    ])
+
+
+def get_cached(key):
+    return _cache().get(key)
+
+
+def set_cached(key, data):
+    _cache().set(key, data, timeout=settings.MATCH_CACHE_TIMEOUT)
@@ -0,0 +1,333 @@
+import heapq
+from itertools import groupby
+from operator import itemgetter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from jobs.models import JobSkill
+from .match_cache import bump_user_version
+from .models import MatchResult, MatchSettings
+from .nlp_utils import IMPORTANCE_WEIGHTS, RELATED_SKILL_CREDIT, calculate_skill_match, get_related_skills
+from .scoring import JobSkillMatrix
+from .skill_index import skill_index
+from .skill_terms import skill_terms
+from .instrumentation import stage, timed_iter
+from .catalog_snapshot import catalog_snapshot
+
+
+def iter_job_skills(job_ids=None, chunk_size=None, with_importance=False):
+    """
+    Stream (job_id, [skill_name, ...]) pairs in a single query.
+
+    Skill names are canonical (see skill_terms), so every spelling of a skill
+    compares equal. When `job_ids` is given only those jobs are returned. Small
+    id sets are filtered in SQL; large ones are filtered while streaming, which
+    keeps the query count constant and avoids the database's bound-parameter
+    limit. With `with_importance`, the same query also reads each skill's
+    importance and (job_id, [skill_name, ...], [importance, ...]) triples are
+    yielded.
+    """
+    chunk_size = chunk_size or settings.MATCHING_CHUNK_SIZE
+    queryset = JobSkill.objects.order_by('job_id', 'id')
+    if job_ids is not None and len(job_ids) <= chunk_size:
+        queryset = queryset.filter(job_id__in=job_ids)
+    fields = ['job_id', 'term_id', 'skill_name', 'importance'] if with_importance else ['job_id', 'term_id', 'skill_name']
+    skill_terms.ensure_fresh()
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    for job_id, group in groupby(rows, key=itemgetter(0)):
+        if job_ids is not None and job_id not in job_ids:
+            continue
+        group = list(group)
+        skills = [skill_terms.term_name(row[1], row[2]) for row in group]
+        if with_importance:
+            yield job_id, skills, [row[3] for row in group]
+        else:
+            yield job_id, skills
+
+
+def score_upper_bound(user_skill_count, job_skill_count):
+    """
+    Best score a job with `job_skill_count` skills can reach for a user with
+    `user_skill_count` distinct skills.
+
+    At most `user_skill_count` job skills can be exact matches; in the best
+    case every other one is a related (half) match.
+    """
+    exact = min(user_skill_count, job_skill_count)
+    return min((exact * 100 + (job_skill_count - exact) * 50) / job_skill_count, 100)
+
+
+def weighted_score_upper_bound(user_skill_count, job_skills, importances):
+    """
+    Best weighted score a job can reach for a user with `user_skill_count`
+    distinct skills: exact, full-proficiency matches on its most important
+    skills and related matches on all the others.
+    """
+    weights = {}
+    for skill, importance in zip(job_skills, importances):
+        weights.setdefault(skill.lower(), IMPORTANCE_WEIGHTS.get(importance, IMPORTANCE_WEIGHTS['required']))
+    ranked = sorted(weights.values(), reverse=True)
+    total = sum(ranked)
+    if not total:
+        return 0.0
+    exact = sum(ranked[:user_skill_count])
+    return min((exact + (total - exact) * RELATED_SKILL_CREDIT) / total * 100, 100)
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _database_matrices(candidate_job_ids, weighted, chunk_size, user_skill_count, floor):
+    """
+    Read the candidates' skills in one streamed query and yield a JobSkillMatrix
+    per chunk, leaving out jobs whose upper bound is below `floor()`.
+    """
+    rows = iter_job_skills(candidate_job_ids, with_importance=weighted)
+    # Reading job skills is timed as load_jobs, pruning as part of score
+    for chunk in timed_iter('load_jobs', _chunked(rows, chunk_size)):
+        with stage('score'):
+            threshold = floor()
+            if weighted:
+                chunk = [
+                    row for row in chunk
+                    if round(weighted_score_upper_bound(user_skill_count, row[1], row[2]), 2) >= threshold
+                ]
+            else:
+                chunk = [
+                    row for row in chunk
+                    if round(score_upper_bound(user_skill_count, len(row[1])), 2) >= threshold
+                ]
+            job_matrix = JobSkillMatrix.from_job_skills(chunk)
+        yield job_matrix
+
+
+def skill_match_counts(user_skills, job_ids=None, chunk_size=None):
+    """
+    Stream (job_id, total, exact, related) for every job sharing a skill or
+    related skill with `user_skills` (canonical names), in job id order.
+
+    The counts come from one GROUP BY over JobSkill, matching what
+    calculate_ai_match_score counts: `total` job skill rows, `exact` distinct
+    skills the user holds, and `related` rows for skills merely related to
+    one of them. Skills are compared by term id, so only rows linked to a
+    SkillTerm can match. `job_ids` limits the jobs like iter_job_skills does.
+    """
+    chunk_size = chunk_size or settings.MATCHING_CHUNK_SIZE
+    related = set()
+    for skill in user_skills:
+        related |= get_related_skills(skill)
+    exact_ids = skill_terms.canonical_ids(user_skills)
+    related_ids = skill_terms.canonical_ids(related) - exact_ids
+    if not exact_ids and not related_ids:
+        return
+
+    candidates = JobSkill.objects.filter(term_id__in=exact_ids | related_ids).values('job_id')
+    queryset = JobSkill.objects.filter(job_id__in=candidates)
+    if job_ids is not None and len(job_ids) <= chunk_size:
+        queryset = queryset.filter(job_id__in=job_ids)
+    rows = (
+        queryset
+        .values('job_id')
+        .annotate(
+            total=Count('id'),
+            exact=Count('term_id', filter=Q(term_id__in=exact_ids), distinct=True),
+            related=Count('id', filter=Q(term_id__in=related_ids)),
+        )
+        .order_by('job_id')
+        .values_list('job_id', 'total', 'exact', 'related')
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        if job_ids is None or row[0] in job_ids:
+            yield row
+
+
+def _score_jobs_pushdown(user_id, user_skills, job_ids, min_score, top_k, chunk_size):
+    """Legacy scoring with the skill counting done by the database; see score_jobs."""
+    if job_ids is not None:
+        job_ids = set(job_ids)
+    scored = []
+    with stage('score'):
+        for job_id, total, exact, related in skill_match_counts(user_skills, job_ids, chunk_size):
+            # Same arithmetic as calculate_ai_match_score, related skills earning half
+            score = round(min((exact * 100 + related * 50) / (total * 100) * 100, 100), 2)
+            if score >= min_score:
+                scored.append((score, job_id))
+        if top_k:
+            scored = heapq.nlargest(top_k, scored)
+
+    # Skill names are only read for the jobs being returned
+    with stage('load_jobs'):
+        job_skills = dict(iter_job_skills({job_id for _, job_id in scored}, chunk_size=chunk_size))
+    matches = []
+    with stage('score'):
+        for score, job_id in scored:
+            matched, missing = calculate_skill_match(user_skills, job_skills[job_id])
+            matches.append(MatchResult(
+                user_id=user_id,
+                job_id=job_id,
+                match_score=score,
+                matched_skills=matched,
+                missing_skills=missing
+            ))
+    return matches
+
+
+def score_jobs(user_id, user_skills, job_ids=None, min_score=0, top_k=None, chunk_size=None,
+               scoring=None, proficiencies=None, pushdown=None):
+    """
+    Score a user against every job that shares a skill or related skill.
+
+    Pass `job_ids` to limit scoring to those jobs. Returns unsaved MatchResult
+    instances for the jobs scoring at least `min_score`.
+
+    `scoring` selects 'legacy' (calculate_ai_match_score) or 'weighted'
+    (calculate_weighted_match_score, using JobSkill.importance and the
+    `proficiencies` mapping of skill name -> Skill.proficiency); it defaults
+    to MATCH_SCORING.
+
+    Job skills come from the memory-mapped catalog snapshot when
+    CATALOG_SNAPSHOT_ENABLED is set and the snapshot for the current catalog
+    has been written, otherwise from a single streamed query.
+
+    With `top_k`, only the best `top_k` matches are kept (in a bounded heap)
+    and returned best first. Jobs are scored chunk by chunk; when reading
+    from the database, a job's upper bound (from its skill count) is checked
+    against `min_score` and the heap's current floor before it is scored,
+    and jobs that cannot make the cut are skipped.
+
+    With `pushdown` (default: MATCH_SQL_PUSHDOWN), legacy scoring counts
+    each candidate's exact and related skills in the database instead
+    (skill_match_counts) and only reads the skills of the jobs returned.
+    Weighted scoring always uses the matrix.
+    """
+    chunk_size = chunk_size or settings.MATCHING_CHUNK_SIZE
+    weighted = (scoring or settings.MATCH_SCORING) == 'weighted'
+    if pushdown is None:
+        pushdown = settings.MATCH_SQL_PUSHDOWN
+    if pushdown and not weighted:
+        return _score_jobs_pushdown(user_id, user_skills, job_ids, min_score, top_k, chunk_size)
+    if weighted:
+        proficiencies = proficiencies or {}
+        weighted_skills = {skill: proficiencies.get(skill) for skill in user_skills}
+    # Only jobs sharing a skill or related skill with the user can score above zero
+    with stage('load_jobs'):
+        candidate_job_ids = skill_index.candidate_job_ids(user_skills)
+    if job_ids is not None:
+        candidate_job_ids &= set(job_ids)
+
+    user_skill_count = len({s.lower() for s in user_skills})
+    heap = []  # (score, job_id, job_skills), smallest first
+    scored = []
+
+    def floor():
+        if top_k and len(heap) >= top_k:
+            return max(min_score, heap[0][0])
+        return min_score
+
+    with stage('load_jobs'):
+        snapshot = catalog_snapshot.get()
+    if snapshot is not None:
+        # Slices of the memory-mapped catalog; no job skills are read from the database
+        matrices = timed_iter('load_jobs', snapshot.iter_matrices(candidate_job_ids, chunk_size))
+    else:
+        matrices = _database_matrices(candidate_job_ids, weighted, chunk_size, user_skill_count, floor)
+
+    for job_matrix in matrices:
+        with stage('score'):
+            # Score the whole chunk in one vectorized pass
+            scores = job_matrix.weighted_score(weighted_skills) if weighted else job_matrix.score(user_skills)
+            for job_id, job_skills, score in zip(job_matrix.job_ids, job_matrix.job_skills, scores):
+                if score < min_score:
+                    continue
+                if not top_k:
+                    scored.append((score, job_id, job_skills))
+                elif len(heap) < top_k:
+                    heapq.heappush(heap, (score, job_id, job_skills))
+                elif (score, job_id) > heap[0][:2]:
+                    heapq.heapreplace(heap, (score, job_id, job_skills))
+
+    if top_k:
+        scored = sorted(heap, key=itemgetter(0, 1), reverse=True)
+
+    matches = []
+    with stage('score'):
+        for score, job_id, job_skills in scored:
+            matched, missing = calculate_skill_match(user_skills, job_skills)
+            matches.append(MatchResult(
+                user_id=user_id,
+                job_id=job_id,
+                match_score=score,
+                matched_skills=matched,
+                missing_skills=missing
+            ))
+    return matches
+
+
+def get_match_settings(user_ids):
+    """
+    {user_id: (scoring, min_score)} the given users' stored matches were
+    computed with; users who never ran matching get MATCH_SCORING and 0.
+    """
+    user_ids = list(user_ids)
+    found = {}
+    for chunk in _chunked(user_ids, settings.MATCHING_BATCH_SIZE):
+        rows = MatchSettings.objects.filter(user_id__in=chunk).values_list('user_id', 'scoring', 'min_score')
+        found.update((user_id, (scoring, min_score)) for user_id, scoring, min_score in rows)
+    return {user_id: found.get(user_id, (settings.MATCH_SCORING, 0)) for user_id in user_ids}
+
+
+def remember_match_settings(user_ids, scoring, min_score, batch_size=None):
+    """Record the scoring mode and threshold the users' stored matches were just computed with."""
+    MatchSettings.objects.bulk_create(
+        [MatchSettings(user_id=user_id, scoring=scoring, min_score=min_score) for user_id in user_ids],
+        batch_size=batch_size or settings.MATCHING_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['scoring', 'min_score', 'updated_at'],
+    )
+
+
+def persist_matches(user, matches, job_ids=None, batch_size=None):
+    """
+    Atomically replace a user's stored matches.
+
+    `matches` is an iterable of unsaved MatchResult instances. Rows are upserted
+    on the (user, job) key in batches, then rows for jobs that no longer match
+    are deleted, so readers never observe an empty result set. When `job_ids`
+    is given only rows for those jobs are considered stale.
+    """
+    batch_size = batch_size or settings.MATCHING_BATCH_SIZE
+    matches = list(matches)
+    kept_job_ids = {match.job_id for match in matches}
+
+    with transaction.atomic():
+        MatchResult.objects.bulk_create(
+            matches,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['user', 'job'],
+            update_fields=['match_score', 'matched_skills', 'missing_skills'],
+        )
+        existing = MatchResult.objects.filter(user=user)
+        if job_ids is not None and len(job_ids) <= batch_size:
+            existing = existing.filter(job_id__in=job_ids)
+        existing_job_ids = set(existing.values_list('job_id', flat=True))
+        if job_ids is not None:
+            existing_job_ids &= set(job_ids)
+        stale_job_ids = list(existing_job_ids - kept_job_ids)
+        for start in range(0, len(stale_job_ids), batch_size):
+            MatchResult.objects.filter(
+                user=user, job_id__in=stale_job_ids[start:start + batch_size]
+            ).delete()
+        bump_user_version(getattr(user, 'pk', user))
+
+    return matches
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+# Seed the alias table and point every existing Skill and JobSkill row at the
+# SkillTerm its name resolves to. The aliases are the SKILL_ALIASES of the
+# time, copied here so the migration does not change when that table does.
+
+ALIASES = {
+    'golang': 'go',
+    'node.js': 'nodejs',
+    'node js': 'nodejs',
+    'react.js': 'react',
+    'reactjs': 'react',
+    'vue.js': 'vue',
+    'postgres': 'postgresql',
+    'sklearn': 'scikit-learn',
+    'k8s': 'kubernetes',
+    'restful api': 'rest api',
+}
+BATCH_SIZE = 500
+
+
+def normalize(name):
+    return ' '.join(name.lower().split())
+
+
+def link_skill_terms(apps, schema_editor):
+    SkillTerm = apps.get_model('ai_engine', 'SkillTerm')
+    SkillAlias = apps.get_model('ai_engine', 'SkillAlias')
+    Skill = apps.get_model('users', 'Skill')
+    JobSkill = apps.get_model('jobs', 'JobSkill')
+
+    rows = [(Skill, 'name'), (JobSkill, 'skill_name')]
+    names = set()
+    for model, field in rows:
+        names.update(model.objects.values_list(field, flat=True).distinct())
+    canonical = {name: ALIASES.get(normalize(name), normalize(name)) for name in names}
+
+    wanted = set(canonical.values()) | set(ALIASES.values())
+    SkillTerm.objects.bulk_create(
+        [SkillTerm(name=name) for name in sorted(wanted)], batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+    term_ids = dict(SkillTerm.objects.values_list('name', 'id'))
+    SkillAlias.objects.bulk_create(
+        [SkillAlias(alias=alias, term_id=term_ids[name]) for alias, name in ALIASES.items()],
+        ignore_conflicts=True,
+    )
+
+    for model, field in rows:
+        for name in model.objects.values_list(field, flat=True).distinct():
+            model.objects.filter(**{field: name}).update(term_id=term_ids[canonical[name]])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0004_skillterm_skillalias'),
+        ('jobs', '0004_jobskill_term'),
+        ('users', '0002_skill_term'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_skill_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.core.management import call_command
+from django.db import migrations
+
+# The match cache (settings.MATCH_CACHE) holds the version stamps every web
+# worker, background process and management command must agree on, so by
+# default it is a database cache. Create its table here; this does nothing
+# when the cache is configured to use another backend.
+
+
+def create_cache_table(apps, schema_editor):
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0006_matchsettings'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
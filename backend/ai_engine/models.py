@@ -1,6 +1,36 @@
+import uuid
 from django.db import models
 from django.contrib.auth.models import User
 from jobs.models import Job
+from users.models import Resume
+
+class SkillTerm(models.Model):
+    """
+    A canonical skill. Skill and JobSkill rows point at the term their name
+    resolves to, so differently written names of one skill compare equal.
+    """
+    name = models.CharField(max_length=255, unique=True)  # normalized: lowercase, single spaces
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class SkillAlias(models.Model):
+    """Another spelling of a SkillTerm, e.g. 'node.js' for 'nodejs'."""
+    alias = models.CharField(max_length=255, unique=True)  # normalized like SkillTerm.name
+    term = models.ForeignKey(SkillTerm, on_delete=models.CASCADE, related_name='aliases')
+
+    class Meta:
+        ordering = ['alias']
+        verbose_name_plural = 'skill aliases'
+
+    def __str__(self):
+        return f"{self.alias} -> {self.term.name}"
+
 
 class MatchResult(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='match_results')
@@ -14,6 +44,55 @@ class MatchResult(models.Model):
     class Meta:
         ordering = ['-match_score', '-created_at']
         unique_together = ('user', 'job')
+        indexes = [
+            # Serves keyset pagination of a user's matches by score
+            models.Index(fields=['user', '-match_score', '-id'], name='match_user_score_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.job.title} ({self.match_score}%)"
+
+
+class MatchSettings(models.Model):
+    """
+    How a user's stored matches were last computed, so that incremental
+    re-matching keeps them on the same scale.
+    """
+    SCORING_CHOICES = [('legacy', 'Legacy'), ('weighted', 'Weighted')]
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='match_settings')
+    scoring = models.CharField(max_length=20, choices=SCORING_CHOICES)
+    min_score = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.scoring}, min {self.min_score}"
+
+
+class ResumeParseTask(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='resume_parse_tasks')
+    resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='parse_tasks')
+    status = models.CharField(
+        max_length=20,
+        choices=[(STATUS_PENDING, 'Pending'), (STATUS_RUNNING, 'Running'),
+                 (STATUS_COMPLETED, 'Completed'), (STATUS_FAILED, 'Failed')],
+        default=STATUS_PENDING
+    )
+    skills = models.JSONField(default=list)  # Skills extracted from the resume
+    email = models.CharField(max_length=255, blank=True, null=True)
+    phone = models.CharField(max_length=50, blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user.username} - resume parse ({self.status})"
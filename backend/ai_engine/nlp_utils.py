@@ -1,3 +1,5 @@
+import hashlib
+import json
 import re
 from collections import Counter
 
@@ -23,22 +25,140 @@ SKILL_SIMILARITY = {
     'django': ['django', 'python', 'backend', 'rest api'],
 }
 
+# Alternative spellings mapped to their canonical COMMON_SKILLS entry
+SKILL_ALIASES = {
+    'golang': 'go',
+    'node.js': 'nodejs',
+    'node js': 'nodejs',
+    'react.js': 'react',
+    'reactjs': 'react',
+    'vue.js': 'vue',
+    'postgres': 'postgresql',
+    'sklearn': 'scikit-learn',
+    'k8s': 'kubernetes',
+    'restful api': 'rest api',
+}
+
+
+def normalize_skill_name(name):
+    """Lowercase a skill name and collapse its whitespace: the form SkillTerm names and aliases are stored in."""
+    return ' '.join(name.lower().split())
+
+
+def _trie_pattern(node):
+    """Render a character trie as a regex that shares common prefixes."""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ''
+    pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return f'(?:{pattern})?' if '' in node else pattern
+
+
+def compile_skill_pattern(skills, aliases=None):
+    """
+    Compile a skill vocabulary into one word-bounded regex.
+
+    Terms are merged into a prefix trie so the alternation stays fast with
+    thousands of skills and synonyms. Spaces inside a term match any run of
+    whitespace. Returns the pattern and a map from matched alias to canonical
+    skill name.
+    """
+    aliases = {alias.lower(): skill.lower() for alias, skill in (aliases or {}).items()}
+    trie = {}
+    for term in {s.lower() for s in skills} | set(aliases):
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    body = _trie_pattern(trie).replace(re.escape(' '), r'\s+')
+    # Word boundaries that also treat '+' and '#' as part of a word (c++, c#)
+    return re.compile(rf'(?<![\w+#])(?:{body})(?![\w+#])'), aliases
+
+
+def reload_skill_vocabulary():
+    """Recompile the extractor after COMMON_SKILLS or SKILL_ALIASES change."""
+    global _compiled_skill_pattern, _skill_vocabulary_version
+    skills = [skill for group in COMMON_SKILLS.values() for skill in group]
+    _compiled_skill_pattern = compile_skill_pattern(skills, SKILL_ALIASES)
+    fingerprint = json.dumps([sorted(skills), sorted(SKILL_ALIASES.items())])
+    _skill_vocabulary_version = hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+def get_skill_vocabulary_version():
+    """Short hash of the extraction vocabulary; changes whenever the extracted skills could."""
+    return _skill_vocabulary_version
+
+
+reload_skill_vocabulary()
+
+
+def compile_skill_similarity(table):
+    """
+    Compile a similarity table into O(1) lookups.
+
+    Returns a pair of dicts keyed by lowercased skill: a bitmask of the groups
+    the skill belongs to, and the frozenset of every skill sharing a group.
+    """
+    skill_groups = {}
+    members = []
+    for bit, similar_skills in enumerate(table.values()):
+        group = frozenset(s.lower() for s in similar_skills)
+        members.append(group)
+        for skill in group:
+            skill_groups[skill] = skill_groups.get(skill, 0) | (1 << bit)
+
+    related = {}
+    for skill, mask in skill_groups.items():
+        related[skill] = frozenset().union(
+            *(group for bit, group in enumerate(members) if mask >> bit & 1)
+        )
+    return skill_groups, related
+
+
+def reload_skill_similarity(table=None):
+    """
+    Recompile SKILL_SIMILARITY after the taxonomy changes, without a restart.
+
+    If `table` is given it replaces the contents of SKILL_SIMILARITY. The
+    compiled lookups are swapped in with a single assignment, so concurrent
+    readers see either the old or the new taxonomy, never a mix. Cached
+    match responses are invalidated; stored MatchResults keep their old
+    scores until the users are re-matched (e.g. with rematch_all).
+    """
+    from .match_cache import bump_catalog_version
+
+    global _compiled_similarity
+    if table is not None:
+        SKILL_SIMILARITY.clear()
+        SKILL_SIMILARITY.update(table)
+    _compiled_similarity = compile_skill_similarity(SKILL_SIMILARITY)
+    # Cached responses hold scores computed with the old taxonomy
+    bump_catalog_version()
+
+
+_compiled_similarity = compile_skill_similarity(SKILL_SIMILARITY)
+
+
 def extract_skills_from_text(text):
-    """Extract skills from resume/job description text using keyword matching."""
+    """Extract skills from resume/job description text in a single regex pass."""
     if not text:
         return []
     
-    text_lower = text.lower()
+    pattern, canonical = _compiled_skill_pattern
     found_skills = set()
     
-    for category, skills in COMMON_SKILLS.items():
-        for skill in skills:
-            if skill in text_lower:
-                found_skills.add(skill)
+    for match in pattern.finditer(text.lower()):
+        term = ' '.join(match.group().split())
+        found_skills.add(canonical.get(term, term))
     
     return sorted(list(found_skills))
 
 
+def extract_skills_batch(batch):
+    """[(key, text)] -> {key: skills}. Free of Django imports, so it can run in any worker process."""
+    return {key: extract_skills_from_text(text) for key, text in batch}
+
+
 def extract_email(text):
     """Extract email from text."""
     if not text:
@@ -86,15 +206,20 @@ def calculate_similarity_score(user_skill, job_skill):
     if user_skill_lower == job_skill_lower:
         return 1.0
     
-    # Check similarity mapping
-    for skill, similar_skills in SKILL_SIMILARITY.items():
-        similar_skills_lower = [s.lower() for s in similar_skills]
-        if user_skill_lower in similar_skills_lower and job_skill_lower in similar_skills_lower:
-            return 0.7  # Partial match for related skills
+    # Related skills share at least one SKILL_SIMILARITY group
+    skill_groups = _compiled_similarity[0]
+    if skill_groups.get(user_skill_lower, 0) & skill_groups.get(job_skill_lower, 0):
+        return 0.7  # Partial match for related skills
     
     return 0.0
 
 
+def get_related_skills(skill):
+    """Return the lowercased skills that share a SKILL_SIMILARITY group with `skill`, including itself."""
+    skill_lower = skill.lower()
+    return set(_compiled_similarity[1].get(skill_lower, ())) | {skill_lower}
+
+
 def calculate_ai_match_score(user_skills, job_skills, matched_skills, missing_skills):
     """
     Calculate AI-enhanced match score considering:
@@ -127,3 +252,47 @@ def calculate_ai_match_score(user_skills, job_skills, matched_skills, missing_sk
     final_score = round(min(total_score * 100, 100), 2)
     
     return final_score
+
+
+# Weighted scoring: a job skill counts by its importance, and a matching user
+# skill earns credit by its proficiency (half credit for a related skill)
+IMPORTANCE_WEIGHTS = {'required': 1.0, 'preferred': 0.6, 'nice_to_have': 0.3}
+PROFICIENCY_WEIGHTS = {'beginner': 0.6, 'intermediate': 0.8, 'expert': 1.0}
+RELATED_SKILL_CREDIT = 0.5
+
+
+def weighted_skill_credits(user_skills):
+    """
+    Map each lowercased skill a user can cover to the credit it earns (0-1).
+
+    `user_skills` maps skill name -> proficiency. Holding a skill earns its
+    proficiency weight; holding a related skill earns RELATED_SKILL_CREDIT
+    of that. The best credit wins.
+    """
+    credits = {}
+    for name, proficiency in user_skills.items():
+        factor = PROFICIENCY_WEIGHTS.get(proficiency, PROFICIENCY_WEIGHTS['intermediate'])
+        for skill in get_related_skills(name):
+            credit = factor if skill == name.lower() else factor * RELATED_SKILL_CREDIT
+            credits[skill] = max(credits.get(skill, 0.0), credit)
+    return credits
+
+
+def calculate_weighted_match_score(user_skills, job_skills):
+    """
+    Importance- and proficiency-weighted match score (0-100).
+
+    `user_skills` maps skill name -> proficiency; `job_skills` is a list of
+    (skill name, importance) pairs. Each distinct job skill contributes its
+    importance weight times the credit the user earns for it.
+    """
+    weights = {}
+    for name, importance in job_skills:
+        weights.setdefault(name.lower(), IMPORTANCE_WEIGHTS.get(importance, IMPORTANCE_WEIGHTS['required']))
+    total = sum(weights.values())
+    if not total:
+        return 0.0
+
+    credits = weighted_skill_credits(user_skills)
+    earned = sum(weight * credits.get(skill, 0.0) for skill, weight in weights.items())
+    return round(min(earned / total * 100, 100), 2)
@@ -0,0 +1,195 @@
+import base64
+import binascii
+import json
+import math
+import random
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+
+# sort_by -> (field, descending). Every ordering is made total by adding id.
+SORT_FIELDS = {
+    'score': ('match_score', True),
+    'salary': ('job__salary_max', True),
+    'location': ('job__location', False),
+}
+
+# Nullable sort fields are compared through a non-null stand-in value
+NULL_SORT_VALUES = {
+    'job__salary_max': -1,
+    'job__location': '',
+}
+
+# Types a keyset cursor's sort value may have, per sort field
+SORT_VALUE_TYPES = {
+    'match_score': (int, float),
+    'job__salary_max': (int,),
+    'job__location': (str,),
+}
+
+# Integers outside this range cannot be bound as database parameters
+MAX_CURSOR_INT = 2 ** 63 - 1
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+MAX_TOP_K = 1000
+
+
+def parse_page_size(value):
+    try:
+        page_size = int(value)
+    except (ValueError, TypeError):
+        return DEFAULT_PAGE_SIZE
+    if page_size < 1 or page_size > MAX_PAGE_SIZE:
+        return DEFAULT_PAGE_SIZE
+    return page_size
+
+
+def parse_top_k(value):
+    """Return a valid top-K size, or None when top-K mode is not requested."""
+    try:
+        top_k = int(value)
+    except (ValueError, TypeError):
+        return None
+    return min(top_k, MAX_TOP_K) if top_k > 0 else None
+
+
+def parse_page(value):
+    try:
+        return max(int(value), 1)
+    except (ValueError, TypeError):
+        return 1
+
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+
+
+def _is_int(value, minimum=-MAX_CURSOR_INT):
+    return isinstance(value, int) and not isinstance(value, bool) and minimum <= value <= MAX_CURSOR_INT
+
+
+def _is_sort_value(value, types):
+    if isinstance(value, bool) or not isinstance(value, types):
+        return False
+    if isinstance(value, int):
+        return _is_int(value)
+    return not isinstance(value, float) or math.isfinite(value)
+
+
+def decode_cursor(cursor, value_types=(int, float, str)):
+    """
+    Decode a cursor, or return None when it is missing, malformed or tampered
+    with, so the request falls back to the first page.
+
+    A keyset cursor needs an integer 'id' and a sort value 'v' of one of
+    `value_types`; a shuffle cursor a non-negative integer offset 'o' and an
+    integer seed 's'.
+    """
+    if not cursor:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if not isinstance(position, dict):
+        return None
+    if 'o' in position or 's' in position:
+        valid = _is_int(position.get('o'), minimum=0) and _is_int(position.get('s'))
+    else:
+        valid = _is_int(position.get('id')) and _is_sort_value(position.get('v'), value_types)
+    return position if valid else None
+
+
+def keyset_page(queryset, sort_by, page_size, cursor=None, offset=0):
+    """
+    Return (rows, next_cursor) for one page ordered by (sort field, id).
+
+    With a cursor the page starts strictly after the cursor's (value, id)
+    position, so it costs the same however deep it is. `offset` is only used
+    for legacy page-number requests that arrive without a cursor.
+    """
+    field, descending = SORT_FIELDS.get(sort_by, SORT_FIELDS['score'])
+    key = field
+    if field in NULL_SORT_VALUES:
+        key = 'sort_key'
+        queryset = queryset.annotate(sort_key=Coalesce(field, Value(NULL_SORT_VALUES[field])))
+
+    direction = 'lt' if descending else 'gt'
+    prefix = '-' if descending else ''
+    queryset = queryset.order_by(f'{prefix}{key}', f'{prefix}id')
+
+    position = decode_cursor(cursor, SORT_VALUE_TYPES[field])
+    if position and 'v' in position:
+        queryset = queryset.filter(
+            Q(**{f'{key}__{direction}': position['v']}) |
+            Q(**{key: position['v'], f'id__{direction}': position['id']})
+        )
+        offset = 0
+
+    rows = list(queryset[offset:offset + page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor({'v': getattr(last, key), 'id': last.id})
+
+
+def shuffled_page(queryset, page_size, seed, cursor=None, offset=0):
+    """
+    Return (rows, next_cursor) for one page of a seeded, stable shuffle.
+
+    Only the ids are loaded and shuffled in memory, so the database never
+    sorts the table randomly, and the same seed always yields the same order.
+    """
+    position = decode_cursor(cursor)
+    if position and 'o' in position:
+        offset = position['o']
+
+    ids = list(queryset.order_by('id').values_list('id', flat=True))
+    random.Random(seed).shuffle(ids)
+    page_ids = ids[offset:offset + page_size]
+    rows_by_id = queryset.in_bulk(page_ids)
+    rows = [rows_by_id[pk] for pk in page_ids if pk in rows_by_id]
+
+    next_offset = offset + page_size
+    next_cursor = encode_cursor({'o': next_offset, 's': seed}) if next_offset < len(ids) else None
+    return rows, next_cursor
+
+
+def paginate_matches(queryset, params, total):
+    """
+    Paginate a user's MatchResult queryset from request parameters.
+
+    Understands page_size, sort_by ('score', 'salary', 'location', 'random'),
+    cursor, seed and, for clients that have no cursor yet, page.
+    Returns the page rows and the pagination metadata for the response.
+    """
+    page_size = parse_page_size(params.get('page_size', DEFAULT_PAGE_SIZE))
+    page = parse_page(params.get('page', 1))
+    sort_by = params.get('sort_by', 'score')
+    cursor = params.get('cursor')
+    offset = 0 if cursor else (page - 1) * page_size
+
+    meta = {'sort_by': sort_by}
+    if sort_by == 'random':
+        # A cursor pins the seed it was issued with so later pages stay consistent
+        position = decode_cursor(cursor) or {}
+        try:
+            seed = int(position.get('s', params.get('seed')))
+        except (ValueError, TypeError):
+            seed = random.randrange(2 ** 31)
+        rows, next_cursor = shuffled_page(queryset, page_size, seed, cursor, offset)
+        meta['seed'] = seed
+    else:
+        rows, next_cursor = keyset_page(queryset, sort_by, page_size, cursor, offset)
+
+    meta.update({
+        'total_matches': total,
+        'page': page,
+        'page_size': page_size,
+        'total_pages': max(math.ceil(total / page_size), 1),
+        'has_next': next_cursor is not None,
+        'has_previous': page > 1,
+        'next_cursor': next_cursor,
+    })
+    return rows, meta
@@ -0,0 +1,50 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+from .nlp_utils import get_skill_vocabulary_version
+from .resume_parser import PARSER_VERSION, parse_resume
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file):
+    """SHA-256 of a file's bytes, read in chunks; the file is rewound afterwards."""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def resume_cache_key(content_hash):
+    """
+    Cache key for a parsed resume.
+
+    Besides the file hash it includes everything that changes the parse
+    output: the parser version, the skill vocabulary and the page/size limits.
+    Changing any of them makes old entries unreachable; the cache backend
+    evicts them in its own time.
+    """
+    return ':'.join([
+        'resume-parse',
+        PARSER_VERSION,
+        get_skill_vocabulary_version(),
+        str(settings.RESUME_MAX_PAGES),
+        str(settings.RESUME_MAX_CHARS),
+        content_hash,
+    ])
+
+
+def cached_parse_resume(pdf_file):
+    """
+    parse_resume with results cached by file content in the RESUME_PARSE_CACHE
+    cache. Files that fail to parse raise and are not cached.
+    """
+    cache = caches[settings.RESUME_PARSE_CACHE]
+    key = resume_cache_key(hash_file(pdf_file))
+    parsed_data = cache.get(key)
+    if parsed_data is None:
+        parsed_data = parse_resume(pdf_file)
+        cache.set(key, parsed_data)
+    return parsed_data
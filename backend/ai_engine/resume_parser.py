@@ -1,24 +1,82 @@
+import logging
+import re
 import PyPDF2
+from django.conf import settings
 from .nlp_utils import extract_skills_from_text, extract_email, extract_phone
+from .instrumentation import stage, timed_iter
 
+logger = logging.getLogger(__name__)
 
-def extract_text_from_pdf(pdf_file):
-    """Extract text from PDF file."""
+# Bump when a change to the parser alters its output, to invalidate cached parses
+PARSER_VERSION = '2'
+
+# Characters carried over from the previous page so that skills, emails and
+# phone numbers split across a page break are still found
+PAGE_OVERLAP_CHARS = 64
+
+
+class ResumeParseError(ValueError):
+    """The uploaded resume is not a readable PDF."""
+
+
+def iter_pdf_pages(pdf_file, max_pages=None, max_chars=None):
+    """
+    Yield the text of each PDF page, one page at a time.
+
+    Stops early once `max_pages` pages or `max_chars` characters have been
+    produced (RESUME_MAX_PAGES / RESUME_MAX_CHARS by default), so the cost of
+    a huge upload is bounded. Raises ResumeParseError if the file cannot be
+    read as a PDF.
+    """
+    max_pages = max_pages or settings.RESUME_MAX_PAGES
+    max_chars = max_chars or settings.RESUME_MAX_CHARS
     try:
         pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        return text
+        remaining = max_chars
+        for page_number, page in enumerate(pdf_reader.pages):
+            if page_number >= max_pages or remaining <= 0:
+                break
+            text = (page.extract_text() or '')[:remaining]
+            remaining -= len(text)
+            yield text
     except Exception as e:
-        print(f"Error extracting PDF: {e}")
-        return ""
+        logger.warning(f"Error extracting PDF: {e}")
+        raise ResumeParseError(f'Could not read the PDF: {e}') from e
+
+
+def extract_text_from_pdf(pdf_file):
+    """Extract text from PDF file."""
+    return ''.join(iter_pdf_pages(pdf_file))
+
+
+def _overlap(text):
+    """Return the tail of a page, starting at a word boundary."""
+    if len(text) <= PAGE_OVERLAP_CHARS:
+        return text
+    tail = text[-PAGE_OVERLAP_CHARS:]
+    boundary = re.search(r'\s', tail)
+    return tail[boundary.end():] if boundary else ''
 
 
 def parse_resume(pdf_file):
-    """Parse resume and extract structured data."""
-    raw_text = extract_text_from_pdf(pdf_file)
-    
+    """Parse resume and extract structured data, one page at a time."""
+    pages = []
+    skills = set()
+    email = None
+    phone = None
+    previous_tail = ''
+
+    for text in timed_iter('pdf_extract', iter_pdf_pages(pdf_file)):
+        pages.append(text)
+        window = previous_tail + text
+        with stage('skill_extract'):
+            skills.update(extract_skills_from_text(window))
+            email = email or extract_email(window)
+            phone = phone or extract_phone(window)
+        previous_tail = _overlap(text)
+
+    raw_text = ''.join(pages)
+
     if not raw_text:
         return {
             'raw_text': '',
@@ -26,14 +84,10 @@ def parse_resume(pdf_file):
             'email': None,
             'phone': None
         }
-    
-    skills = extract_skills_from_text(raw_text)
-    email = extract_email(raw_text)
-    phone = extract_phone(raw_text)
-    
+
     return {
         'raw_text': raw_text,
-        'skills': skills,
+        'skills': sorted(skills),
         'email': email,
         'phone': phone
     }
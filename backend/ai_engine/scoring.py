@@ -0,0 +1,145 @@
+import numpy as np
+from .nlp_utils import IMPORTANCE_WEIGHTS, get_related_skills, weighted_skill_credits
+
+
+class JobSkillMatrix:
+    """
+    Sparse job x skill matrix for scoring one user against many jobs at once.
+
+    Skills are lowercased and encoded as integer ids. Jobs are stored in CSR
+    form: the skills of row `i` are `indices[indptr[i]:indptr[i + 1]]`, in the
+    order they were given (duplicates included, as calculate_ai_match_score
+    counts them). `first` marks the first occurrence of a skill in its row so
+    exact matches can be counted once per distinct skill. `weights` holds the
+    importance weight of every entry, for weighted scoring.
+
+    The arrays may be read-only views of a memory-mapped catalog snapshot;
+    `rows` (the row of every entry) can then be passed in precomputed.
+    """
+
+    def __init__(self, job_ids, job_skills, indptr, indices, first, vocabulary, weights=None, rows=None):
+        self.job_ids = job_ids
+        self.job_skills = job_skills
+        self.indptr = indptr
+        self.indices = indices
+        self.first = first
+        self.vocabulary = vocabulary
+        self.weights = weights
+        self.rows = rows if rows is not None else np.repeat(np.arange(len(job_ids)), np.diff(indptr))
+
+    @classmethod
+    def from_job_skills(cls, job_skills):
+        """
+        Build the matrix from an iterable of (job_id, [skill_name, ...]) pairs.
+
+        Items may also be (job_id, [skill_name, ...], [importance, ...]), as
+        yielded by iter_job_skills(with_importance=True); the importances are
+        then kept as weights for weighted_score.
+        """
+        vocabulary = {}
+        job_ids, skills_by_row, indptr, indices, first, weights = [], [], [0], [], [], []
+        default_weight = IMPORTANCE_WEIGHTS['required']
+        for job_id, skills, *importances in job_skills:
+            seen = set()
+            for skill in skills:
+                skill_id = vocabulary.setdefault(skill.lower(), len(vocabulary))
+                indices.append(skill_id)
+                first.append(skill_id not in seen)
+                seen.add(skill_id)
+            if importances:
+                weights.extend(IMPORTANCE_WEIGHTS.get(importance, default_weight) for importance in importances[0])
+            job_ids.append(job_id)
+            skills_by_row.append(skills)
+            indptr.append(len(indices))
+        return cls(
+            job_ids,
+            skills_by_row,
+            np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int64),
+            np.array(first, dtype=bool),
+            vocabulary,
+            np.array(weights, dtype=np.float64) if len(weights) == len(indices) else None,
+        )
+
+    def __len__(self):
+        return len(self.job_ids)
+
+    def select(self, positions):
+        """Matrix of the rows at `positions` only, sharing this matrix's vocabulary."""
+        positions = np.asarray(positions, dtype=np.int64)
+        starts = self.indptr[positions]
+        lengths = self.indptr[positions + 1] - starts
+        indptr = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        entries = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return JobSkillMatrix(
+            [int(self.job_ids[i]) for i in positions.tolist()],
+            [self.job_skills[i] for i in positions.tolist()],
+            indptr,
+            self.indices[entries],
+            self.first[entries],
+            self.vocabulary,
+            self.weights[entries] if self.weights is not None else None,
+        )
+
+    def _mask(self, skills):
+        mask = np.zeros(len(self.vocabulary), dtype=bool)
+        ids = [self.vocabulary[s] for s in skills if s in self.vocabulary]
+        mask[ids] = True
+        return mask
+
+    def score(self, user_skills):
+        """
+        Score every job against `user_skills` in one pass.
+
+        Returns a list of scores identical to calling calculate_ai_match_score
+        for each row: exact matches count once per distinct skill, job skills
+        related to a user skill count as half a match.
+        """
+        if not len(self):
+            return []
+        user_skills_lower = {s.lower() for s in user_skills}
+        related_skills = set()
+        for skill in user_skills_lower:
+            related_skills |= get_related_skills(skill)
+
+        exact_mask = self._mask(user_skills_lower)
+        partial_mask = self._mask(related_skills) & ~exact_mask
+
+        n_jobs = len(self)
+        exact = np.bincount(
+            self.rows, weights=exact_mask[self.indices] & self.first, minlength=n_jobs
+        )
+        partial = np.bincount(self.rows, weights=partial_mask[self.indices], minlength=n_jobs)
+        totals = np.diff(self.indptr).astype(np.float64)
+
+        raw = np.minimum((exact * 100 + partial * 50) / (totals * 100) * 100, 100)
+        # Python's round() rounds the exact decimal value; np.round does not
+        return [round(value, 2) for value in raw.tolist()]
+
+    def weighted_score(self, user_skills):
+        """
+        Importance- and proficiency-weighted scores for every job in one pass.
+
+        `user_skills` maps skill name -> proficiency. Returns a list of scores
+        identical to calling calculate_weighted_match_score for each row.
+        Entries without importances are weighted as required skills.
+        """
+        if not len(self):
+            return []
+        credit = np.zeros(len(self.vocabulary), dtype=np.float64)
+        for skill, value in weighted_skill_credits(user_skills).items():
+            if skill in self.vocabulary:
+                credit[self.vocabulary[skill]] = value
+
+        weights = self.weights if self.weights is not None else np.full(len(self.indices), IMPORTANCE_WEIGHTS['required'])
+        # Each distinct skill counts once, with the weight of its first entry
+        weights = weights * self.first
+        n_jobs = len(self)
+        earned = np.bincount(self.rows, weights=weights * credit[self.indices], minlength=n_jobs)
+        totals = np.bincount(self.rows, weights=weights, minlength=n_jobs)
+
+        raw = np.zeros(n_jobs)
+        np.divide(earned, totals, out=raw, where=totals > 0)
+        raw = np.minimum(raw * 100, 100)
+        return [round(value, 2) for value in raw.tolist()]
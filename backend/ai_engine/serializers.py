@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import MatchResult
+from .models import MatchResult, ResumeParseTask
 
 
 class MatchResultSerializer(serializers.ModelSerializer):
@@ -12,3 +12,21 @@ class MatchResultSerializer(serializers.ModelSerializer):
         fields = ['id', 'job', 'job_title', 'job_company', 'job_description', 'match_score', 
                   'matched_skills', 'missing_skills', 'summary', 'created_at']
         read_only_fields = ['id', 'created_at']
+
+    def __init__(self, *args, **kwargs):
+        # Optional subset of fields to return, e.g. to leave out job_description
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields) - {'id'}:
+                self.fields.pop(name)
+
+
+class ResumeParseTaskSerializer(serializers.ModelSerializer):
+    raw_text = serializers.CharField(source='resume.raw_text', read_only=True)
+
+    class Meta:
+        model = ResumeParseTask
+        fields = ['id', 'status', 'skills', 'email', 'phone', 'raw_text', 'error', 
+                  'created_at', 'updated_at']
+        read_only_fields = fields
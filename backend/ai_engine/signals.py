@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from jobs.models import Job, JobSkill
+from users.models import Skill
+from .incremental import schedule_job_rematch, schedule_user_rematch, schedule_user_skill_rematch
+from .job_skills import sync_auto_skills
+from .match_cache import bump_catalog_version
+from .models import SkillAlias, SkillTerm
+from .nlp_utils import normalize_skill_name
+from .skill_index import skill_index
+from .skill_terms import skill_terms
+
+
+@receiver(pre_save, sender=Skill)
+def link_skill_term(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.term_id = skill_terms.term_ids([instance.name])[instance.name]
+
+
+@receiver(pre_save, sender=JobSkill)
+def link_job_skill_term(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.term_id = skill_terms.term_ids([instance.skill_name])[instance.skill_name]
+
+
+@receiver(pre_save, sender=SkillTerm)
+def normalize_skill_term(sender, instance, **kwargs):
+    instance.name = normalize_skill_name(instance.name)
+
+
+@receiver(pre_save, sender=SkillAlias)
+def normalize_skill_alias(sender, instance, **kwargs):
+    instance.alias = normalize_skill_name(instance.alias)
+
+
+def skill_terms_changed():
+    # Names may now resolve differently: every index and cached list keyed by them is stale
+    transaction.on_commit(skill_terms.invalidate)
+    skill_index.invalidate()
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=SkillAlias)
+def merge_alias_term(sender, instance, raw=False, **kwargs):
+    """Rows linked to a separate term spelled like the new alias move to the alias's term."""
+    if raw:
+        return
+    duplicates = SkillTerm.objects.filter(name=instance.alias).exclude(pk=instance.term_id)
+    user_ids = list(Skill.objects.filter(term__in=duplicates).values_list('user_id', flat=True).distinct())
+    job_ids = list(JobSkill.objects.filter(term__in=duplicates).values_list('job_id', flat=True).distinct())
+    Skill.objects.filter(term__in=duplicates).update(term=instance.term_id)
+    JobSkill.objects.filter(term__in=duplicates).update(term=instance.term_id)
+    # Queryset updates send no JobSkill signals; touching the jobs moves the catalog stamps
+    Job.objects.filter(id__in=job_ids).update(updated_at=timezone.now())
+    skill_terms_changed()
+    for job_id in job_ids:
+        schedule_job_rematch(job_id)
+    for user_id in user_ids:
+        schedule_user_rematch(user_id)
+
+
+@receiver(post_delete, sender=SkillAlias)
+@receiver(post_save, sender=SkillTerm)
+@receiver(post_delete, sender=SkillTerm)
+def skill_term_changed(sender, raw=False, **kwargs):
+    if not raw:
+        skill_terms_changed()
+
+
+@receiver(post_save, sender=JobSkill)
+def index_job_skill(sender, instance, created, **kwargs):
+    if created:
+        skill_index.add(instance)
+    else:
+        # The skill name may have changed; rebuild on next lookup, everywhere
+        skill_index.changed()
+    bump_catalog_version()
+    schedule_job_rematch(instance.job_id)
+
+
+@receiver(post_delete, sender=JobSkill)
+def unindex_job_skill(sender, instance, **kwargs):
+    skill_index.remove(instance)
+    bump_catalog_version()
+    schedule_job_rematch(instance.job_id)
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+def job_changed(sender, instance, **kwargs):
+    # Cached match lists embed job details, so any job write invalidates them
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Job)
+def extract_job_skills(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or not settings.AUTO_EXTRACT_JOB_SKILLS:
+        return
+    if update_fields is not None and 'description' not in update_fields:
+        return
+    if sync_auto_skills(instance):
+        schedule_job_rematch(instance.pk)
+
+
+@receiver(post_save, sender=Skill)
+def rematch_saved_skill(sender, instance, created, **kwargs):
+    if created:
+        schedule_user_skill_rematch(instance.user_id, instance.name)
+    else:
+        # The old name is unknown, so rescore everything for this user
+        schedule_user_rematch(instance.user_id)
+
+
+@receiver(post_delete, sender=Skill)
+def rematch_deleted_skill(sender, instance, **kwargs):
+    schedule_user_skill_rematch(instance.user_id, instance.name)
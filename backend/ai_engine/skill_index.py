@@ -0,0 +1,146 @@
+import random
+import threading
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from jobs.models import JobSkill
+from .nlp_utils import get_related_skills
+from .skill_terms import skill_terms
+
+VERSION_KEY = 'skill-index:version'
+
+
+def _cache():
+    return caches[settings.MATCH_CACHE]
+
+
+class SkillIndex:
+    """
+    In-process inverted index from canonical skill name to the jobs requiring it.
+
+    The index is built lazily from JobSkill and stamped with a version token
+    shared through the match cache, so a lookup costs one cache read rather
+    than a query. When a JobSkill save or delete commits, the signal handlers
+    update this process's index in place and move the token, which makes
+    every other process rebuild on its next lookup. Edits to skill terms and
+    aliases are caught through the skill term map's version. Bulk writes send
+    no signals: call changed() after bulk_create, queryset.update() or raw SQL
+    on JobSkill.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._jobs_by_skill = defaultdict(Counter)
+        self._version = None
+        self._terms_version = None
+        self._blocks = []  # atomic blocks open when the index was built
+
+    @staticmethod
+    def normalize(skill_name):
+        return skill_terms.canonical(skill_name)
+
+    def version(self):
+        """Shared token that changes whenever JobSkill rows are written."""
+        cache = _cache()
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, random.randrange(2 ** 31), timeout=None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def _bump_version(self):
+        # A fresh random value rather than incr(), which is get-then-set on
+        # the database cache and could lose a concurrent bump
+        version = random.randrange(2 ** 31)
+        _cache().set(VERSION_KEY, version, timeout=None)
+        return version
+
+    def build(self):
+        """Rebuild the whole index from the database."""
+        with self._lock:
+            # Read the tokens first: a write committed while the rows are
+            # read moves them again, and the next lookup rebuilds
+            version = self.version()
+            skill_terms.ensure_fresh()
+            terms_version = skill_terms.version()
+            jobs_by_skill = defaultdict(Counter)
+            rows = JobSkill.objects.values_list('job_id', 'term_id', 'skill_name').iterator(chunk_size=2000)
+            for job_id, term_id, skill_name in rows:
+                jobs_by_skill[skill_terms.term_name(term_id, skill_name)][job_id] += 1
+            self._jobs_by_skill = jobs_by_skill
+            self._version = version
+            self._terms_version = terms_version
+            self._blocks = list(connection.atomic_blocks)
+
+    def _transaction_ended(self):
+        # An index built inside a transaction may hold rows that were rolled
+        # back, so it is only trusted until then
+        return connection.atomic_blocks[:len(self._blocks)] != self._blocks
+
+    def ensure_fresh(self):
+        version = self.version()
+        with self._lock:
+            if (
+                self._version != version
+                or self._terms_version != skill_terms.version()
+                or self._transaction_ended()
+            ):
+                self.build()
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+    def changed(self):
+        """JobSkill rows were written without signals: rebuild here, and everywhere once they commit."""
+        self.invalidate()
+        transaction.on_commit(self._bump_version)
+
+    def _apply(self, job_skill, delta):
+        with self._lock:
+            current = self.version()
+            version = self._bump_version()
+            if self._version is None or self._version != current:
+                # Not built yet, or another process wrote since: rebuild on the next lookup
+                self._version = None
+                return
+            key = self._key(job_skill)
+            jobs = self._jobs_by_skill[key]
+            jobs[job_skill.job_id] += delta
+            if jobs[job_skill.job_id] <= 0:
+                del jobs[job_skill.job_id]
+            if not jobs:
+                del self._jobs_by_skill[key]
+            self._version = version
+
+    def _key(self, job_skill):
+        skill_terms.ensure_fresh()
+        return skill_terms.term_name(job_skill.term_id, job_skill.skill_name)
+
+    def add(self, job_skill):
+        """Record a new JobSkill row once the transaction creating it commits."""
+        transaction.on_commit(lambda: self._apply(job_skill, 1))
+
+    def remove(self, job_skill):
+        """Forget a deleted JobSkill row once the transaction deleting it commits."""
+        transaction.on_commit(lambda: self._apply(job_skill, -1))
+
+    def job_ids_for(self, skill_name):
+        return set(self._jobs_by_skill.get(self.normalize(skill_name), ()))
+
+    def candidate_job_ids(self, skills):
+        """Return ids of jobs requiring any of `skills` or a skill related to one of them."""
+        self.ensure_fresh()
+        skill_terms.ensure_fresh()
+        expanded = set()
+        for skill in skills:
+            expanded |= get_related_skills(skill_terms.term_name(None, skill))
+        with self._lock:
+            job_ids = set()
+            for skill in expanded:
+                job_ids.update(self._jobs_by_skill.get(skill, ()))
+        return job_ids
+
+
+skill_index = SkillIndex()
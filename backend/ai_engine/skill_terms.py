@@ -0,0 +1,178 @@
+import threading
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from .models import SkillAlias, SkillTerm
+from .nlp_utils import PROFICIENCY_WEIGHTS, normalize_skill_name
+
+# Canonical skill resolution. Every spelling of a skill -- its SkillTerm name
+# or one of the term's aliases, compared after normalize_skill_name -- maps to
+# one term id, and matching compares the terms' canonical names, so 'Node.js',
+# 'nodejs' and 'NodeJS' are the same skill.
+#
+# The map is loaded whole into each process and reloaded when the shared
+# version token changes, which happens whenever a term or alias is edited.
+# New terms do not change how existing names resolve, so creating one leaves
+# the token alone: names unknown to the map resolve to themselves, and lookups
+# that must see every term (term_ids, known_ids) ask the database.
+
+VERSION_KEY = 'skill-terms:version'
+
+
+def _cache():
+    return caches[settings.MATCH_CACHE]
+
+
+def _chunked(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SkillTermMap:
+    """Cached lookup from any spelling of a skill to its SkillTerm id and canonical name."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = {}    # normalized name or alias -> term id
+        self._names = {}  # term id -> canonical name
+        self._by_name = {}  # canonical name -> ids of the terms resolving to it
+        self._version = None
+        self._blocks = []  # atomic blocks open when the map was loaded
+
+    def version(self):
+        """Shared token that changes whenever terms or aliases are edited."""
+        cache = _cache()
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def load(self, version=None):
+        with self._lock:
+            ids, names = {}, {}
+            for term_id, name in SkillTerm.objects.values_list('id', 'name'):
+                ids[name] = term_id
+                names[term_id] = name
+            # An alias wins over a term spelled the same way
+            ids.update(SkillAlias.objects.values_list('alias', 'term_id'))
+            by_name = {}
+            for term_id, name in names.items():
+                names[term_id] = names.get(ids[name], name)
+                by_name.setdefault(names[term_id], set()).add(term_id)
+            self._ids, self._names, self._by_name = ids, names, by_name
+            self._version = version or self.version()
+            self._blocks = list(connection.atomic_blocks)
+
+    def _transaction_ended(self):
+        # A map loaded inside a transaction may hold terms that were rolled
+        # back (and whose ids get reused), so it is only trusted until then
+        return connection.atomic_blocks[:len(self._blocks)] != self._blocks
+
+    def ensure_fresh(self):
+        version = self.version()
+        with self._lock:
+            if self._version != version or self._transaction_ended():
+                self.load(version)
+
+    def invalidate(self):
+        """Drop every process's map; called after a term or alias is edited."""
+        with self._lock:
+            self._version = None
+        _cache().set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+    def _canonical(self, name):
+        key = normalize_skill_name(name)
+        term_id = self._ids.get(key)
+        return self._names[term_id] if term_id is not None else key
+
+    def canonical(self, name):
+        """Canonical name of a skill; names without a term are only normalized."""
+        self.ensure_fresh()
+        return self._canonical(name)
+
+    def term_name(self, term_id, name):
+        """
+        Canonical name of a Skill/JobSkill row from its term id, or from its
+        name when the row is unlinked. Call ensure_fresh() before a batch of rows.
+        """
+        canonical = self._names.get(term_id)
+        return canonical if canonical is not None else self._canonical(name)
+
+    def known_ids(self, names):
+        """Ids of the terms the given names resolve to; names without a term are skipped."""
+        self.ensure_fresh()
+        keys = set(map(normalize_skill_name, names))
+        ids = {self._ids[key] for key in keys if key in self._ids}
+        # Terms created since the map was loaded
+        for chunk in _chunked(sorted(keys - self._ids.keys()), settings.MATCHING_BATCH_SIZE):
+            ids.update(SkillTerm.objects.filter(name__in=chunk).values_list('id', flat=True))
+        return ids
+
+    def canonical_ids(self, names):
+        """
+        Ids of the terms whose canonical name is one of `names`: the rows
+        term_name() would give one of those names, provided they are linked.
+        """
+        self.ensure_fresh()
+        keys = set(map(normalize_skill_name, names))
+        ids = set()
+        for key in keys & self._by_name.keys():
+            ids |= self._by_name[key]
+        # Terms created since the map was loaded are their own canonical name
+        for chunk in _chunked(sorted(keys - self._ids.keys()), settings.MATCHING_BATCH_SIZE):
+            ids.update(SkillTerm.objects.filter(name__in=chunk).values_list('id', flat=True))
+        return ids
+
+    def term_ids(self, names):
+        """
+        Map each name to its term id, creating terms for names not seen before.
+
+        Ids are read from the database rather than the map, so they are valid
+        in the caller's transaction whatever this process loaded earlier.
+        """
+        keys = {name: normalize_skill_name(name) for name in names}
+        wanted = sorted(set(keys.values()))
+        ids = {}
+        for chunk in _chunked(wanted, settings.MATCHING_BATCH_SIZE):
+            ids.update(SkillAlias.objects.filter(alias__in=chunk).values_list('alias', 'term_id'))
+        missing = [key for key in wanted if key not in ids]
+        for chunk in _chunked(missing, settings.MATCHING_BATCH_SIZE):
+            ids.update(SkillTerm.objects.filter(name__in=chunk).values_list('name', 'id'))
+        missing = [key for key in missing if key not in ids]
+        if missing:
+            SkillTerm.objects.bulk_create(
+                [SkillTerm(name=key) for key in missing],
+                batch_size=settings.MATCHING_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            for chunk in _chunked(missing, settings.MATCHING_BATCH_SIZE):
+                ids.update(SkillTerm.objects.filter(name__in=chunk).values_list('name', 'id'))
+        return {name: ids[key] for name, key in keys.items()}
+
+    def assign(self, rows, field):
+        """Set `term_id` on unsaved Skill/JobSkill instances from their `field` name, for bulk_create."""
+        rows = list(rows)
+        term_ids = self.term_ids({getattr(row, field) for row in rows})
+        for row in rows:
+            row.term_id = term_ids[getattr(row, field)]
+        return rows
+
+    def proficiencies(self, rows):
+        """
+        {canonical name: proficiency} from a user's (term id, name, proficiency)
+        rows; a skill listed under several spellings keeps its best proficiency.
+        """
+        self.ensure_fresh()
+        skills = {}
+        for term_id, name, proficiency in rows:
+            canonical = self.term_name(term_id, name)
+            current = skills.get(canonical)
+            if current is None or PROFICIENCY_WEIGHTS.get(proficiency, 0) > PROFICIENCY_WEIGHTS.get(current, 0):
+                skills[canonical] = proficiency
+        return skills
+
+
+skill_terms = SkillTermMap()
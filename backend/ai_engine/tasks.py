@@ -0,0 +1,127 @@
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from users.models import Skill
+from .instrumentation import collect
+from .models import ResumeParseTask
+from .resume_cache import cached_parse_resume
+from .skill_terms import skill_terms
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _init_process_worker():
+    """Give each pool process its own Django setup and database connections."""
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def get_executor():
+    """
+    Return the shared background executor, creating it on first use.
+
+    BACKGROUND_TASK_MODE selects 'thread' (default) or 'process'. Either way
+    the pool lives inside the web process, so no external broker is needed.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = settings.BACKGROUND_TASK_WORKERS
+            if settings.BACKGROUND_TASK_MODE == 'process':
+                _executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_process_worker)
+            else:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-engine')
+        return _executor
+
+
+def run_task(func, *args):
+    """Run a background task, logging failures and releasing its database connections."""
+    in_background = settings.BACKGROUND_TASK_MODE != 'sync'
+    if in_background:
+        close_old_connections()
+    try:
+        with collect():
+            func(*args)
+    except Exception as e:
+        logger.error(f"Background task {func.__name__} failed: {str(e)}")
+    finally:
+        if in_background:
+            # Worker threads hold their own connections; don't leak them
+            connections.close_all()
+
+
+def submit(func, *args):
+    """
+    Run `func(*args)` in the background once the current transaction commits.
+
+    With BACKGROUND_TASK_MODE = 'sync' the function runs inline instead, which
+    is what the test suite and single-process debugging use.
+    """
+    if settings.BACKGROUND_TASK_MODE == 'sync':
+        transaction.on_commit(lambda: run_task(func, *args))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(run_task, func, *args))
+
+
+def apply_parsed_resume(resume, parsed_data):
+    """Store parsed resume text and replace the user's resume-extracted skills."""
+    from .incremental import incremental_matching_suspended, schedule_user_rematch
+
+    with transaction.atomic(), incremental_matching_suspended():
+        resume.raw_text = parsed_data['raw_text']
+        resume.save(update_fields=['raw_text', 'updated_at'])
+
+        Skill.objects.filter(user=resume.user, extracted_from_resume=True).delete()
+        Skill.objects.bulk_create(
+            skill_terms.assign(
+                (
+                    Skill(
+                        user=resume.user,
+                        name=skill_name,
+                        proficiency='intermediate',
+                        extracted_from_resume=True
+                    )
+                    for skill_name in parsed_data['skills']
+                ),
+                'name'
+            ),
+            ignore_conflicts=True
+        )
+    # One full re-match instead of one per deleted/added skill
+    schedule_user_rematch(resume.user_id)
+
+
+def run_resume_parse(task_id):
+    """Parse the resume behind a ResumeParseTask and record the outcome on the task."""
+    task = ResumeParseTask.objects.select_related('resume__user').get(pk=task_id)
+    task.status = ResumeParseTask.STATUS_RUNNING
+    task.save(update_fields=['status', 'updated_at'])
+    try:
+        with task.resume.file.open('rb') as pdf_file:
+            parsed_data = cached_parse_resume(pdf_file)
+        apply_parsed_resume(task.resume, parsed_data)
+    except Exception as e:
+        logger.error(f"Error parsing resume for task {task_id}: {str(e)}")
+        task.status = ResumeParseTask.STATUS_FAILED
+        task.error = str(e)
+        task.save(update_fields=['status', 'error', 'updated_at'])
+        return
+
+    task.status = ResumeParseTask.STATUS_COMPLETED
+    task.skills = parsed_data['skills']
+    task.email = parsed_data['email']
+    task.phone = parsed_data['phone']
+    task.save(update_fields=['status', 'skills', 'email', 'phone', 'updated_at'])
+
+
+def enqueue_resume_parse(resume):
+    """Create a pending ResumeParseTask for `resume` and schedule it."""
+    task = ResumeParseTask.objects.create(user=resume.user, resume=resume)
+    submit(run_resume_parse, task.pk)
+    return task
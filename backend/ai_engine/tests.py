@@ -0,0 +1,1137 @@
+import io
+import math
+import os
+import random
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import Skill
+from jobs.models import Job, JobSkill
+from .models import MatchResult, ResumeParseTask, SkillAlias, SkillTerm
+from .skill_index import SkillIndex, skill_index
+from .skill_terms import skill_terms
+from .batch_matching import Checkpoint, changed_user_ids, rematch_all
+from .instrumentation import collect, registry, stage, timed_iter
+from .incremental import incremental_matching_suspended
+from .catalog_snapshot import CatalogSnapshot, catalog_snapshot, write_snapshot
+from .job_skills import backfill_auto_skills
+from .match_cache import bump_catalog_version, get_catalog_version, get_user_version
+from .matcher import (
+    get_match_settings,
+    iter_job_skills,
+    remember_match_settings,
+    score_jobs,
+    score_upper_bound,
+    skill_match_counts,
+    weighted_score_upper_bound,
+)
+from .resume_parser import iter_pdf_pages, parse_resume
+from .resume_cache import cached_parse_resume
+from . import nlp_utils
+from .pagination import decode_cursor, encode_cursor
+from .scoring import JobSkillMatrix
+from .nlp_utils import (
+    IMPORTANCE_WEIGHTS,
+    PROFICIENCY_WEIGHTS,
+    SKILL_SIMILARITY,
+    calculate_ai_match_score,
+    calculate_similarity_score,
+    calculate_skill_match,
+    calculate_weighted_match_score,
+    compile_skill_pattern,
+    extract_skills_from_text,
+    reload_skill_similarity,
+)
+
+
+def create_jobs(count, skills=('python', 'django', 'postgresql')):
+    """Create `count` jobs that all require the given skills, bumping the catalog version like ingest does."""
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        jobs = Job.objects.bulk_create(
+            Job(title=f'Job {i}', company='Acme', description='A job') for i in range(count)
+        )
+        JobSkill.objects.bulk_create(skill_terms.assign(
+            (JobSkill(job=job, skill_name=skill) for job in jobs for skill in skills), 'skill_name'
+        ))
+        bump_catalog_version()
+        skill_index.changed()
+    return jobs
+
+
+def create_version_stamps(user):
+    """Create the shared version counters up front, so query counts compare like with like."""
+    get_catalog_version()
+    get_user_version(user.id)
+    skill_terms.version()
+    skill_index.version()
+
+
+class RunMatchingQueryBudgetTest(TestCase):
+    def setUp(self):
+        skill_index.invalidate()
+        caches[settings.MATCH_CACHE].clear()
+        self.user = User.objects.create_user(username='matcher', password='secret-pass')
+        Skill.objects.create(user=self.user, name='Python')
+        skill_terms.ensure_fresh()
+        create_version_stamps(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def run_matching(self, **data):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/ai/matches/run_matching/', data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_is_independent_of_catalog_size(self):
+        create_jobs(3)
+        _, small = self.run_matching(min_score=101)
+        create_jobs(60)
+        _, large = self.run_matching(min_score=101)
+        self.assertEqual(small, large)
+
+    @override_settings(MATCHING_BATCH_SIZE=10)
+    def test_persisting_results_costs_one_upsert_per_batch(self):
+        create_jobs(3)
+        response, small = self.run_matching(page_size=1)
+        self.assertEqual(response.data['total_matches'], 3)
+        create_jobs(60)
+        response, large = self.run_matching(page_size=1)
+        self.assertEqual(response.data['total_matches'], 63)
+        # Everything else is fixed: the extra queries are the extra upsert batches
+        self.assertEqual(large - small, math.ceil(63 / 10) - math.ceil(3 / 10))
+
+    def test_job_skills_are_loaded_in_one_query(self):
+        create_jobs(25)
+        skill_index.ensure_fresh()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post('/api/ai/matches/run_matching/', {'min_score': 101}, format='json')
+        job_skill_queries = [
+            q for q in ctx.captured_queries
+            if 'jobs_jobskill' in q['sql'] and 'skill_name' in q['sql']
+        ]
+        self.assertEqual(len(job_skill_queries), 1)
+
+    def test_scores_match_per_job_results(self):
+        create_jobs(2)
+        response, _ = self.run_matching()
+        self.assertEqual(response.data['total_matches'], 2)
+        for match in response.data['matches']:
+            self.assertEqual(match['matched_skills'], ['python'])
+            self.assertAlmostEqual(match['match_score'], 50.0)
+
+    def test_rerun_upserts_and_removes_stale_matches(self):
+        kept, dropped = create_jobs(2)
+        self.run_matching()
+        kept_id = MatchResult.objects.get(user=self.user, job=kept).id
+
+        JobSkill.objects.filter(job=dropped).delete()
+        JobSkill.objects.create(job=dropped, skill_name='cobol')
+        response, _ = self.run_matching(min_score=1)
+
+        self.assertEqual(response.data['total_matches'], 1)
+        self.assertEqual(
+            list(MatchResult.objects.filter(user=self.user).values_list('id', flat=True)),
+            [kept_id],
+        )
+
+
+@override_settings(BACKGROUND_TASK_MODE='sync')
+class SkillIndexTest(TestCase):
+    def setUp(self):
+        skill_index.invalidate()
+
+    def test_candidates_include_related_skills_only(self):
+        python_job, = create_jobs(1, skills=('Python',))
+        django_job, = create_jobs(1, skills=('Django',))
+        create_jobs(1, skills=('COBOL',))
+
+        self.assertEqual(skill_index.candidate_job_ids(['python']), {python_job.id, django_job.id})
+
+    def test_add_skill_updates_index_in_place(self):
+        job, = create_jobs(1, skills=('cobol',))
+        self.assertEqual(skill_index.candidate_job_ids(['Rust']), set())
+
+        admin = User.objects.create_superuser(username='admin', password='secret-pass')
+        client = APIClient()
+        client.force_authenticate(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f'/api/jobs/{job.id}/add_skill/', {'skill_name': 'Rust'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        with mock.patch.object(skill_index, 'build') as build:
+            self.assertEqual(skill_index.candidate_job_ids(['rust']), {job.id})
+        build.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            JobSkill.objects.filter(job=job, skill_name='Rust').delete()
+        self.assertEqual(skill_index.candidate_job_ids(['rust']), set())
+
+    def test_renames_in_another_process_are_noticed(self):
+        job, = create_jobs(1, skills=('cobol',))
+        # The index of another process, which sees none of this one's signals
+        other = SkillIndex()
+        self.assertEqual(other.candidate_job_ids(['rust']), set())
+
+        job_skill = JobSkill.objects.get(job=job)
+        job_skill.skill_name = 'Rust'
+        with self.captureOnCommitCallbacks(execute=True):
+            job_skill.save()
+        self.assertEqual(other.candidate_job_ids(['rust']), {job.id})
+        self.assertEqual(other.candidate_job_ids(['cobol']), set())
+
+
+class JobSkillMatrixEquivalenceTest(SimpleTestCase):
+    # Cases from test_matching.py
+    CASES = [
+        (["Python", "Django", "PostgreSQL"], ["Python", "Django", "PostgreSQL"]),
+        (["Python", "JavaScript"], ["Python", "Django", "PostgreSQL"]),
+        (["Ruby", "PHP"], ["Python", "Django"]),
+        (["Python", "JavaScript", "SQL"], ["Python", "Django", "PostgreSQL"]),
+        (["python", "javascript", "react", "django", "rest api", "postgresql"], ["React", "Vue", "TypeScript"]),
+        (["Python"], ["Python", "python", "Flask"]),
+    ]
+
+    def assert_equivalent(self, user_skills, jobs):
+        matrix = JobSkillMatrix.from_job_skills(enumerate(jobs))
+        expected = []
+        for job_skills in jobs:
+            matched, missing = calculate_skill_match(user_skills, job_skills)
+            expected.append(calculate_ai_match_score(user_skills, job_skills, matched, missing))
+        self.assertEqual(matrix.score(user_skills), expected)
+
+    def test_matches_reference_formula_on_known_cases(self):
+        for user_skills, job_skills in self.CASES:
+            with self.subTest(user_skills=user_skills, job_skills=job_skills):
+                self.assert_equivalent(user_skills, [job_skills])
+
+    def test_matches_reference_formula_on_random_catalog(self):
+        rng = random.Random(42)
+        vocabulary = sorted({s for group in SKILL_SIMILARITY.values() for s in group} | {'ruby', 'cobol', 'go'})
+        vocabulary += [s.title() for s in vocabulary[:10]]
+        jobs = [rng.sample(vocabulary, rng.randint(1, 8)) for _ in range(300)]
+        for _ in range(20):
+            self.assert_equivalent(rng.sample(vocabulary, rng.randint(1, 6)), jobs)
+
+    def test_empty_matrix(self):
+        self.assertEqual(JobSkillMatrix.from_job_skills([]).score(['python']), [])
+
+    def test_weighted_scores_match_reference_formula(self):
+        rng = random.Random(7)
+        vocabulary = sorted({s for group in SKILL_SIMILARITY.values() for s in group} | {'ruby', 'cobol'})
+        vocabulary += [s.title() for s in vocabulary[:10]]
+        importances = list(IMPORTANCE_WEIGHTS)
+        jobs = []
+        for job_id in range(300):
+            skills = rng.sample(vocabulary, rng.randint(1, 8))
+            jobs.append((job_id, skills, [rng.choice(importances) for _ in skills]))
+        matrix = JobSkillMatrix.from_job_skills(jobs)
+        for _ in range(20):
+            user_skills = {skill: rng.choice(list(PROFICIENCY_WEIGHTS)) for skill in rng.sample(vocabulary, rng.randint(1, 6))}
+            expected = [
+                calculate_weighted_match_score(user_skills, list(zip(skills, levels)))
+                for _, skills, levels in jobs
+            ]
+            self.assertEqual(matrix.weighted_score(user_skills), expected)
+            for (_, skills, levels), score in zip(jobs, expected):
+                self.assertGreaterEqual(round(weighted_score_upper_bound(len(user_skills), skills, levels), 2), score)
+
+    def test_weighted_formula(self):
+        job = [('Python', 'required'), ('Docker', 'nice_to_have')]
+        self.assertEqual(calculate_weighted_match_score({'python': 'expert'}, job), round(1.0 / 1.3 * 100, 2))
+        self.assertEqual(calculate_weighted_match_score({'docker': 'expert'}, job), round(0.3 / 1.3 * 100, 2))
+        # Flask is related to Python: half credit at the user's proficiency
+        self.assertEqual(calculate_weighted_match_score({'flask': 'beginner'}, job[:1]), 30.0)
+
+
+class SkillSimilarityTest(TestCase):
+    def setUp(self):
+        self.original = {key: list(group) for key, group in SKILL_SIMILARITY.items()}
+
+    def tearDown(self):
+        reload_skill_similarity(self.original)
+
+    def test_similarity_cases(self):
+        # Cases from test_matching.py
+        for user_skill, job_skill, expected in [
+            ("python", "python", 1.0),
+            ("python", "django", 0.7),
+            ("javascript", "react", 0.7),
+            ("python", "javascript", 0.0),
+            ("Pandas", "NumPy", 0.7),
+        ]:
+            with self.subTest(user_skill=user_skill, job_skill=job_skill):
+                self.assertEqual(calculate_similarity_score(user_skill, job_skill), expected)
+
+    def test_reload_picks_up_taxonomy_changes(self):
+        self.assertEqual(calculate_similarity_score('rust', 'go'), 0.0)
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            reload_skill_similarity({**self.original, 'systems': ['rust', 'go', 'c++']})
+        self.assertEqual(calculate_similarity_score('Rust', 'go'), 0.7)
+        self.assertIn('systems', SKILL_SIMILARITY)
+        # Cached match responses scored with the old taxonomy are dropped
+        self.assertNotEqual(get_catalog_version(), version)
+
+
+class SkillExtractionTest(SimpleTestCase):
+    def test_word_boundaries_prevent_false_positives(self):
+        self.assertEqual(extract_skills_from_text('Good communicator, strong in JavaScript.'), ['javascript'])
+
+    def test_symbols_aliases_and_multi_word_skills(self):
+        text = 'C++ and C# developer.\nNode.js, golang, REST  API and Computer\nVision.'
+        self.assertEqual(
+            extract_skills_from_text(text),
+            ['c#', 'c++', 'computer vision', 'go', 'nodejs', 'rest api'],
+        )
+
+    def test_large_vocabulary(self):
+        vocabulary = [f'skill{i}' for i in range(5000)] + ['java', 'javascript']
+        pattern, canonical = compile_skill_pattern(vocabulary, {'js': 'javascript'})
+        found = {canonical.get(m.group(), m.group()) for m in pattern.finditer('skill42, skill4999 and js')}
+        self.assertEqual(found, {'skill42', 'skill4999', 'javascript'})
+
+
+@override_settings(BACKGROUND_TASK_MODE='sync', MEDIA_ROOT=tempfile.mkdtemp())
+class ResumeParseTaskTest(TestCase):
+    PARSED = {'raw_text': 'Python and Django', 'skills': ['django', 'python'], 'email': 'a@b.co', 'phone': None}
+
+    def setUp(self):
+        caches['resume_parse'].clear()
+        self.user = User.objects.create_user(username='uploader', password='secret-pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self):
+        upload = SimpleUploadedFile('resume.pdf', b'%PDF-1.4', content_type='application/pdf')
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/users/upload_resume/', {'file': upload}, format='multipart')
+
+    @mock.patch('ai_engine.resume_cache.parse_resume', return_value=PARSED)
+    def test_upload_enqueues_parse_and_status_reports_skills(self, parse_resume):
+        response = self.upload()
+        self.assertEqual(response.status_code, 201)
+
+        task = self.client.get(f"/api/ai/parse-tasks/{response.data['task_id']}/").data
+        self.assertEqual(task['status'], ResumeParseTask.STATUS_COMPLETED)
+        self.assertEqual(task['skills'], ['django', 'python'])
+        self.assertEqual(task['raw_text'], 'Python and Django')
+        self.assertEqual(
+            sorted(Skill.objects.filter(user=self.user, extracted_from_resume=True).values_list('name', flat=True)),
+            ['django', 'python'],
+        )
+
+    @mock.patch('ai_engine.resume_cache.parse_resume', side_effect=ValueError('corrupt PDF'))
+    def test_failed_parse_is_reported(self, parse_resume):
+        response = self.upload()
+        task = self.client.get(f"/api/ai/parse-tasks/{response.data['task_id']}/").data
+        self.assertEqual(task['status'], ResumeParseTask.STATUS_FAILED)
+        self.assertEqual(task['error'], 'corrupt PDF')
+
+    def test_unreadable_pdf_fails_and_keeps_existing_skills(self):
+        Skill.objects.create(user=self.user, name='Rust', extracted_from_resume=True)
+        with self.assertLogs('ai_engine', 'WARNING'):
+            response = self.upload()
+        task = self.client.get(f"/api/ai/parse-tasks/{response.data['task_id']}/").data
+        self.assertEqual(task['status'], ResumeParseTask.STATUS_FAILED)
+        self.assertIn('Could not read the PDF', task['error'])
+        self.assertEqual(list(Skill.objects.filter(user=self.user).values_list('name', flat=True)), ['Rust'])
+        with mock.patch('ai_engine.resume_cache.parse_resume', return_value=self.PARSED) as parse:
+            self.upload()
+        parse.assert_called_once()
+
+    def test_tasks_are_private_to_their_user(self):
+        other = User.objects.create_user(username='other', password='secret-pass')
+        with mock.patch('ai_engine.resume_cache.parse_resume', return_value=self.PARSED):
+            response = self.upload()
+        self.client.force_authenticate(other)
+        response = self.client.get(f"/api/ai/parse-tasks/{response.data['task_id']}/")
+        self.assertEqual(response.status_code, 404)
+
+
+class FakePage:
+    def __init__(self, text, log):
+        self.text = text
+        self.log = log
+
+    def extract_text(self):
+        self.log.append(self.text)
+        return self.text
+
+
+class StreamingPdfParserTest(SimpleTestCase):
+    def patch_pages(self, texts):
+        log = []
+        reader = mock.Mock(pages=[FakePage(text, log) for text in texts])
+        patcher = mock.patch('ai_engine.resume_parser.PyPDF2.PdfReader', return_value=reader)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return log
+
+    def test_stops_at_page_budget_without_reading_further_pages(self):
+        log = self.patch_pages([f'page {i} ' for i in range(200)])
+        self.assertEqual(len(list(iter_pdf_pages(None, max_pages=3))), 3)
+        self.assertEqual(len(log), 3)
+
+    def test_stops_at_character_budget(self):
+        log = self.patch_pages(['x' * 40] * 10)
+        self.assertEqual(''.join(iter_pdf_pages(None, max_chars=100)), 'x' * 100)
+        self.assertEqual(len(log), 3)
+
+    def test_parse_finds_values_split_across_pages(self):
+        self.patch_pages(['Skills: Python, Computer', ' Vision. Contact: jane@exa', 'mple.com'])
+        parsed = parse_resume(None)
+        self.assertEqual(parsed['raw_text'], 'Skills: Python, Computer Vision. Contact: jane@example.com')
+        self.assertEqual(parsed['skills'], ['computer vision', 'python'])
+        self.assertEqual(parsed['email'], 'jane@example.com')
+
+
+class ResumeParseCacheTest(SimpleTestCase):
+    PARSED = {'raw_text': 'Python', 'skills': ['python'], 'email': None, 'phone': None}
+
+    def setUp(self):
+        caches['resume_parse'].clear()
+
+    @mock.patch('ai_engine.resume_cache.parse_resume', return_value=PARSED)
+    def test_identical_files_hit_the_cache(self, parse_resume):
+        first = cached_parse_resume(SimpleUploadedFile('a.pdf', b'%PDF same bytes'))
+        second = cached_parse_resume(SimpleUploadedFile('b.pdf', b'%PDF same bytes'))
+        cached_parse_resume(SimpleUploadedFile('c.pdf', b'%PDF other bytes'))
+        self.assertEqual(first, second)
+        self.assertEqual(parse_resume.call_count, 2)
+
+    @mock.patch('ai_engine.resume_cache.parse_resume', return_value=PARSED)
+    def test_vocabulary_change_invalidates_entries(self, parse_resume):
+        cached_parse_resume(SimpleUploadedFile('a.pdf', b'%PDF same bytes'))
+        nlp_utils.COMMON_SKILLS['other'].append('cobol')
+        try:
+            nlp_utils.reload_skill_vocabulary()
+            cached_parse_resume(SimpleUploadedFile('a.pdf', b'%PDF same bytes'))
+        finally:
+            nlp_utils.COMMON_SKILLS['other'].remove('cobol')
+            nlp_utils.reload_skill_vocabulary()
+        self.assertEqual(parse_resume.call_count, 2)
+
+
+@override_settings(BACKGROUND_TASK_MODE='sync')
+class IncrementalMatchingTest(TestCase):
+    def setUp(self):
+        skill_index.invalidate()
+        self.user = User.objects.create_user(username='incremental', password='secret-pass')
+        self.other = User.objects.create_user(username='bystander', password='secret-pass')
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(user=self.user, name='Python')
+            Skill.objects.create(user=self.other, name='COBOL')
+
+    def score(self, job):
+        return MatchResult.objects.get(user=self.user, job=job).match_score
+
+    def test_job_skill_changes_rescore_affected_users_only(self):
+        job = Job.objects.create(title='Backend', company='Acme', description='')
+        with self.captureOnCommitCallbacks(execute=True):
+            JobSkill.objects.create(job=job, skill_name='Python')
+            JobSkill.objects.create(job=job, skill_name='Django')
+        self.assertEqual(self.score(job), 75.0)
+        self.assertFalse(MatchResult.objects.filter(user=self.other).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            JobSkill.objects.filter(job=job, skill_name='Python').delete()
+        self.assertEqual(self.score(job), 50.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            JobSkill.objects.filter(job=job).delete()
+        self.assertFalse(MatchResult.objects.filter(job=job).exists())
+
+    def test_user_skill_changes_rescore_reachable_jobs(self):
+        job, = create_jobs(1, skills=('Python', 'Django'))
+        unrelated, = create_jobs(1, skills=('COBOL',))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/api/users/skills/', {'name': 'Django'}, format='json')
+        self.assertEqual(self.score(job), 100.0)
+        self.assertFalse(MatchResult.objects.filter(user=self.user, job=unrelated).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.filter(user=self.user).delete()
+        self.assertFalse(MatchResult.objects.filter(user=self.user).exists())
+
+
+    def test_rematches_keep_the_users_scoring_mode(self):
+        job = Job.objects.create(title='Backend', company='Acme', description='')
+        with self.captureOnCommitCallbacks(execute=True):
+            JobSkill.objects.create(job=job, skill_name='Python', importance='preferred')
+            JobSkill.objects.create(job=job, skill_name='Docker', importance='nice_to_have')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/api/ai/matches/run_matching/', {'scoring': 'weighted', 'min_score': 50}, format='json')
+        # Python earns 0.6 * 0.8 of the 0.9 possible
+        self.assertEqual(self.score(job), 53.33)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.filter(user=self.user).update(proficiency='expert')
+            Skill.objects.get(user=self.user).save()
+        self.assertEqual(self.score(job), 66.67)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            JobSkill.objects.create(job=job, skill_name='Rust')
+        # Now below the user's min_score: dropped rather than stored on the legacy scale
+        self.assertFalse(MatchResult.objects.filter(user=self.user, job=job).exists())
+
+
+class MatchPaginationTest(TestCase):
+    def setUp(self):
+        caches[settings.MATCH_CACHE].clear()
+        self.user = User.objects.create_user(username='pager', password='secret-pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        jobs = create_jobs(25)
+        for i, job in enumerate(jobs):
+            job.salary_max = None if i % 5 == 0 else i * 1000
+            job.location = None if i % 7 == 0 else f'City {i % 3}'
+            job.save()
+        MatchResult.objects.bulk_create(
+            MatchResult(user=self.user, job=job, match_score=float(i % 4) * 25) for i, job in enumerate(jobs)
+        )
+
+    def walk(self, **params):
+        """Follow next_cursor through every page and return the match ids in order."""
+        ids, cursor, queries = [], None, []
+        while True:
+            query = {'page_size': 4, **params}
+            if cursor:
+                query['cursor'] = cursor
+            with CaptureQueriesContext(connection) as ctx:
+                data = self.client.get('/api/ai/matches/', query).data
+            queries.append(len(ctx.captured_queries))
+            ids += [match['id'] for match in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                return ids, data, queries
+
+    def test_cursor_walk_visits_every_match_once_in_order(self):
+        ids, data, queries = self.walk()
+        expected = list(
+            MatchResult.objects.filter(user=self.user).order_by('-match_score', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+        self.assertEqual(data['total_matches'], 25)
+        # Every full page after the first costs the same number of queries
+        self.assertEqual(len(set(queries[1:-1])), 1)
+
+    def test_nullable_sort_fields(self):
+        for sort_by in ('salary', 'location'):
+            with self.subTest(sort_by=sort_by):
+                ids, _, _ = self.walk(sort_by=sort_by)
+                self.assertEqual(sorted(ids), sorted(MatchResult.objects.values_list('id', flat=True)))
+
+    def test_random_order_is_seeded_and_stable(self):
+        first, data, _ = self.walk(sort_by='random', seed=7)
+        second, _, _ = self.walk(sort_by='random', seed=7)
+        self.assertEqual(first, second)
+        self.assertEqual(data['seed'], 7)
+        self.assertEqual(sorted(first), sorted(MatchResult.objects.values_list('id', flat=True)))
+
+    def test_tampered_cursors_fall_back_to_the_first_page(self):
+        first = self.client.get('/api/ai/matches/', {'page_size': 4}).data['results']
+        positions = [
+            {'v': 'x', 'id': 1}, {'v': 50, 'id': 'x'}, {'v': [1], 'id': 1}, {'v': 50, 'id': 2 ** 70},
+            {'o': 'x', 's': 1}, {'o': -4, 's': 1}, {'o': None}, [1, 2], 'junk',
+        ]
+        for position in positions:
+            with self.subTest(position=position):
+                cursor = encode_cursor(position)
+                for sort_by in ('score', 'location', 'random'):
+                    response = self.client.get('/api/ai/matches/', {'page_size': 4, 'sort_by': sort_by, 'cursor': cursor})
+                    self.assertEqual(response.status_code, 200)
+                response = self.client.get('/api/ai/matches/', {'page_size': 4, 'cursor': cursor})
+                self.assertEqual(response.data['results'], first)
+        self.assertIsNone(decode_cursor('not base64!'))
+
+    def test_page_number_fallback(self):
+        data = self.client.get('/api/ai/matches/', {'page': 7, 'page_size': 4}).data
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(data['total_pages'], 7)
+        self.assertFalse(data['has_next'])
+
+
+class TopKMatchingTest(TestCase):
+    def setUp(self):
+        skill_index.invalidate()
+        caches[settings.MATCH_CACHE].clear()
+        self.user = User.objects.create_user(username='topk', password='secret-pass')
+        for name in ('Python', 'Django'):
+            Skill.objects.create(user=self.user, name=name)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        create_jobs(5, skills=('python', 'django'))
+        create_jobs(5, skills=('python', 'django', 'react', 'docker'))
+        create_jobs(5, skills=('python', 'cobol', 'fortran', 'ada', 'lisp', 'perl'))
+
+    def test_top_k_matches_full_ranking(self):
+        full = score_jobs(self.user.id, ['Python', 'Django'])
+        ranked = sorted(full, key=lambda m: (m.match_score, m.job_id), reverse=True)
+        top = score_jobs(self.user.id, ['Python', 'Django'], top_k=7, chunk_size=3)
+        self.assertEqual([(m.job_id, m.match_score) for m in top], [(m.job_id, m.match_score) for m in ranked[:7]])
+
+    @override_settings(CATALOG_SNAPSHOT_ENABLED=False)
+    def test_upper_bound_prunes_jobs_before_scoring(self):
+        with mock.patch('ai_engine.matcher.JobSkillMatrix.from_job_skills', wraps=JobSkillMatrix.from_job_skills) as build:
+            matches = score_jobs(self.user.id, ['Python', 'Django'], min_score=70)
+        # Six-skill jobs can reach at most 66.67 and are never scored
+        scored_jobs = sum(len(call.args[0]) for call in build.call_args_list)
+        self.assertEqual(scored_jobs, 10)
+        self.assertEqual(len(matches), 5)
+
+    def test_upper_bound_is_never_below_actual_score(self):
+        for user_count in range(1, 6):
+            for job_count in range(1, 10):
+                self.assertGreaterEqual(score_upper_bound(user_count, job_count), 100 * min(user_count, job_count) / job_count)
+
+    def test_weighted_scoring_uses_importance_and_proficiency(self):
+        def run(scoring):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(
+                    '/api/ai/matches/run_matching/', {'top_k': 15, 'persist': False, 'scoring': scoring}, format='json'
+                )
+            self.assertEqual(response.data['scoring'], scoring)
+            return response.data['matches'], len(ctx.captured_queries)
+
+        JobSkill.objects.filter(skill_name__in=['react', 'docker']).update(importance='nice_to_have')
+        Skill.objects.filter(user=self.user, name='Django').update(proficiency='expert')
+        snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_dir.cleanup)
+        settings_override = override_settings(CATALOG_SNAPSHOT_DIR=snapshot_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(catalog_snapshot.invalidate)
+        skill_index.ensure_fresh()
+        catalog_snapshot.get(wait=True)
+        create_version_stamps(self.user)
+        legacy, legacy_queries = run('legacy')
+        weighted, weighted_queries = run('weighted')
+        self.assertEqual(weighted_queries, legacy_queries)
+        self.assertEqual(len([m for m in legacy if m['match_score'] == 50.0]), 5)
+        # Missing only nice-to-have skills now costs far less than half the score
+        self.assertEqual(
+            sorted({m['match_score'] for m in weighted}),
+            sorted({round(1.8 / 2 * 100, 2), round(1.8 / 2.6 * 100, 2), round(0.8 / 6 * 100, 2)}),
+        )
+        self.assertEqual(
+            self.client.post('/api/ai/matches/run_matching/', {'scoring': 'magic'}, format='json').status_code, 400
+        )
+
+    def test_invalid_min_score_is_rejected_before_scoring(self):
+        MatchResult.objects.create(user=self.user, job=Job.objects.first(), match_score=50.0)
+        for min_score in ('abc', 'nan', 'inf', None):
+            with self.subTest(min_score=min_score):
+                response = self.client.post('/api/ai/matches/run_matching/', {'min_score': min_score}, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(MatchResult.objects.filter(user=self.user).count(), 1)
+
+    def test_top_k_without_persisting(self):
+        response = self.client.post('/api/ai/matches/run_matching/', {'top_k': 3, 'persist': False}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['match_score'] for m in response.data['matches']], [100.0] * 3)
+        self.assertEqual(response.data['matches'][0]['job_title'], 'Job 4')
+        self.assertFalse(MatchResult.objects.filter(user=self.user).exists())
+
+
+@override_settings(BACKGROUND_TASK_MODE='sync')
+class MatchCacheTest(TestCase):
+    def setUp(self):
+        skill_index.invalidate()
+        caches[settings.MATCH_CACHE].clear()
+        self.user = User.objects.create_user(username='cached', password='secret-pass')
+        Skill.objects.create(user=self.user, name='Python')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.jobs = create_jobs(5)
+        MatchResult.objects.bulk_create(
+            MatchResult(user=self.user, job=job, match_score=50.0) for job in self.jobs
+        )
+
+    def list_matches(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get('/api/ai/matches/', {'page_size': 2}).data
+        return data, len(ctx.captured_queries)
+
+    def test_repeated_list_is_served_from_cache(self):
+        first, cold = self.list_matches()
+        second, warm = self.list_matches()
+        self.assertEqual(first, second)
+        self.assertLess(warm, cold)
+
+    def test_skill_change_invalidates(self):
+        self.list_matches()
+        Skill.objects.create(user=self.user, name='Django')
+        _, queries = self.list_matches()
+        _, warm = self.list_matches()
+        self.assertGreater(queries, warm)
+
+    def test_catalog_change_invalidates(self):
+        self.list_matches()
+        with incremental_matching_suspended(), self.captureOnCommitCallbacks(execute=True):
+            JobSkill.objects.create(job=self.jobs[0], skill_name='Django')
+        _, queries = self.list_matches()
+        _, warm = self.list_matches()
+        self.assertGreater(queries, warm)
+
+    def test_rewritten_results_invalidate(self):
+        self.list_matches()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/ai/matches/run_matching/', {'min_score': 101}, format='json')
+        self.assertEqual(response.data['total_matches'], 0)
+        data, _ = self.list_matches()
+        self.assertEqual(data['total_matches'], 0)
+
+
+class MatchSerializationTest(TestCase):
+    def setUp(self):
+        caches[settings.MATCH_CACHE].clear()
+        self.user = User.objects.create_user(username='serialized', password='secret-pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        MatchResult.objects.bulk_create(
+            MatchResult(user=self.user, job=job, match_score=50.0) for job in create_jobs(12)
+        )
+
+    def list_matches(self, **params):
+        caches[settings.MATCH_CACHE].clear()
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get('/api/ai/matches/', params).data
+        return data, ctx.captured_queries
+
+    def test_jobs_are_joined_not_queried_per_row(self):
+        _, small = self.list_matches(page_size=2)
+        _, large = self.list_matches(page_size=10)
+        self.assertEqual(len(small), len(large))
+        self.assertFalse([q for q in large if q['sql'].startswith('SELECT') and 'FROM "jobs_job"' in q['sql']])
+
+    def test_fields_parameter_drops_description(self):
+        data, queries = self.list_matches(fields='job_title,match_score')
+        self.assertEqual(set(data['results'][0]), {'id', 'job_title', 'match_score'})
+        page_query = next(q['sql'] for q in queries if 'ai_engine_matchresult' in q['sql'] and 'LIMIT' in q['sql'])
+        self.assertNotIn('"jobs_job"."description"', page_query)
+
+        full, _ = self.list_matches()
+        self.assertIn('job_description', full['results'][0])
+
+
+@override_settings(BACKGROUND_TASK_MODE='sync')
+class AutoJobSkillsTest(TestCase):
+    def setUp(self):
+        skill_index.invalidate()
+
+    def skills(self, job):
+        return sorted(JobSkill.objects.filter(job=job).values_list('skill_name', 'provenance'))
+
+    def test_saving_a_job_extracts_its_skills(self):
+        job = Job.objects.create(title='Backend', company='Acme', description='Python and Django APIs')
+        JobSkill.objects.create(job=job, skill_name='Python')
+        self.assertEqual(self.skills(job), [('Python', 'manual'), ('django', 'auto'), ('python', 'auto')])
+
+        job.description = 'Django, Docker and Python'
+        job.save()
+        # Manual rows win over extracted ones naming the same skill
+        self.assertEqual(self.skills(job), [('Python', 'manual'), ('django', 'auto'), ('docker', 'auto')])
+
+        job.title = 'Platform'
+        with self.assertNumQueries(1):
+            job.save(update_fields=['title'])
+
+    def test_extracted_skills_are_matched(self):
+        user = User.objects.create_user(username='auto', password='secret-pass')
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(user=user, name='Python')
+            job = Job.objects.create(title='Backend', company='Acme', description='We write Python.')
+        self.assertEqual(MatchResult.objects.get(user=user, job=job).match_score, 100.0)
+
+    def test_backfill_in_worker_processes(self):
+        jobs = Job.objects.bulk_create(
+            Job(title=f'Job {i}', company='Acme', description='React and Docker' if i % 2 else 'Go and Rust')
+            for i in range(7)
+        )
+        progress = []
+        done, changed = backfill_auto_skills(workers=2, batch_size=3, progress=lambda *args: progress.append(args))
+        self.assertEqual((done, changed), (7, 7))
+        self.assertEqual(progress[-1], (7, 7))
+        self.assertEqual([name for name, _ in self.skills(jobs[1])], ['docker', 'react'])
+        self.assertEqual(backfill_auto_skills(workers=1), (7, 0))
+
+    def test_backfill_bumps_the_catalog_version(self):
+        Job.objects.bulk_create(Job(title=f'Job {i}', company='Acme', description='React') for i in range(2))
+        before = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            backfill_auto_skills(workers=1)
+        self.assertNotEqual(get_catalog_version(), before)
+
+
+class RematchAllTest(TestCase):
+    def setUp(self):
+        caches[settings.MATCH_CACHE].clear()
+        skill_index.invalidate()
+        self.jobs = create_jobs(3)
+        JobSkill.objects.bulk_create(skill_terms.assign([
+            JobSkill(job=self.jobs[0], skill_name='react', importance='preferred'),
+            JobSkill(job=self.jobs[1], skill_name='docker', importance='nice_to_have'),
+        ], 'skill_name'))
+        self.users = []
+        for i, skills in enumerate([('Python',), ('django', 'React'), ('Go',), ('postgres', 'Docker')]):
+            user = User.objects.create(username=f'batch{i}')
+            Skill.objects.bulk_create(skill_terms.assign(
+                (Skill(user=user, name=name, proficiency='expert') for name in skills), 'name'
+            ))
+            self.users.append(user)
+
+    def stored(self):
+        return {
+            (match.user_id, match.job_id): (match.match_score, match.matched_skills, match.missing_skills)
+            for match in MatchResult.objects.all()
+        }
+
+    def expected(self, scoring):
+        expected = {}
+        for user in self.users:
+            proficiencies = skill_terms.proficiencies(
+                Skill.objects.filter(user=user).values_list('term_id', 'name', 'proficiency')
+            )
+            for match in score_jobs(user.id, list(proficiencies), scoring=scoring, proficiencies=proficiencies):
+                if match.match_score > 0:
+                    expected[(user.id, match.job_id)] = (match.match_score, match.matched_skills, match.missing_skills)
+        return expected
+
+    def test_results_match_score_jobs(self):
+        for scoring in ('legacy', 'weighted'):
+            stats = rematch_all(workers=1, batch_size=2, scoring=scoring)
+            self.assertEqual(stats.users, 4)
+            self.assertEqual(self.stored(), self.expected(scoring))
+
+    def test_users_keep_their_own_settings_unless_overridden(self):
+        weighted, strict = self.users[1].id, self.users[3].id
+        remember_match_settings([weighted], 'weighted', 0)
+        remember_match_settings([strict], 'legacy', 90)
+        rematch_all(workers=1, batch_size=2)
+        legacy = self.expected('legacy')
+        expected = {key: value for key, value in legacy.items() if key[0] not in (weighted, strict)}
+        expected.update((key, value) for key, value in self.expected('weighted').items() if key[0] == weighted)
+        expected.update((key, value) for key, value in legacy.items() if key[0] == strict and value[0] >= 90)
+        self.assertEqual(self.stored(), expected)
+        self.assertEqual(get_match_settings([weighted, strict]), {weighted: ('weighted', 0), strict: ('legacy', 90)})
+
+        rematch_all(workers=1, scoring='legacy')
+        self.assertEqual(get_match_settings([weighted, strict]), {weighted: ('legacy', 0), strict: ('legacy', 90)})
+
+    def test_stale_matches_are_removed(self):
+        rematch_all(workers=1)
+        Skill.objects.filter(user=self.users[0]).delete()
+        Skill.objects.create(user=self.users[0], name='Rust')
+        stale = MatchResult.objects.create(user=self.users[2], job=self.jobs[2], match_score=99)
+        rematch_all([self.users[0].id, self.users[2].id], workers=1)
+        self.assertFalse(MatchResult.objects.filter(user=self.users[0]).exists())
+        self.assertFalse(MatchResult.objects.filter(pk=stale.pk).exists())
+        self.assertTrue(MatchResult.objects.filter(user=self.users[1]).exists())
+
+    def test_resume_skips_finished_users(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'checkpoint')
+            Checkpoint(path, {'scoring': None}).save(self.users[1].id)
+            checkpoint = Checkpoint(path, {'scoring': None})
+            self.assertTrue(checkpoint.load())
+            self.assertFalse(Checkpoint(path, {'scoring': 'weighted'}).load())
+
+            stats = rematch_all(workers=1, batch_size=1, checkpoint=checkpoint)
+            self.assertEqual(stats.users, 2)
+            self.assertEqual(
+                set(MatchResult.objects.values_list('user_id', flat=True).distinct()),
+                {self.users[3].id},
+            )
+            self.assertFalse(os.path.exists(path))
+
+    def test_changed_user_ids(self):
+        since = timezone.now() + timedelta(seconds=1)
+        self.assertEqual(changed_user_ids(since), set())
+        Skill.objects.filter(user=self.users[2]).update(created_at=since)
+        Job.objects.filter(pk=self.jobs[1].pk).update(updated_at=since)
+        # Job 1 needs python, django, postgresql and docker
+        self.assertEqual(changed_user_ids(since), {u.id for u in self.users})
+        Job.objects.filter(pk=self.jobs[1].pk).update(updated_at=since - timedelta(days=1))
+        self.assertEqual(changed_user_ids(since), {self.users[2].id})
+
+    def test_management_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = io.StringIO()
+            call_command('rematch_all', workers=1, checkpoint=os.path.join(tmp, 'checkpoint'), stdout=out)
+            self.assertIn('Re-matched 4 users', out.getvalue())
+
+            out = io.StringIO()
+            call_command('rematch_all', since='2999-01-01', workers=1, checkpoint=os.path.join(tmp, 'checkpoint'), stdout=out)
+            self.assertIn('Re-matched 0 users', out.getvalue())
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        skill_index.invalidate()
+        caches[settings.MATCH_CACHE].clear()
+        registry.reset()
+        self.user = User.objects.create(username='timed')
+        Skill.objects.create(user=self.user, name='Python')
+        create_jobs(3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_collect_counts_queries_and_adds_up_stages(self):
+        with collect() as collection:
+            with stage('load_jobs'):
+                list(Job.objects.all())
+            for _ in timed_iter('load_jobs', Job.objects.values_list('id', flat=True).iterator()):
+                pass
+            with stage('score'):
+                pass
+        self.assertEqual(collection.queries, 2)
+        self.assertEqual(list(collection.stages), ['load_jobs', 'score'])
+        self.assertGreater(collection.query_seconds, 0)
+        # Counted once per collection, with its total
+        self.assertEqual(registry.stage_seconds['load_jobs'].count, 1)
+
+    @override_settings(SERVER_TIMING_HEADERS=True)
+    def test_server_timing_header(self):
+        response = self.client.post('/api/ai/matches/run_matching/', {}, format='json')
+        self.assertEqual(response.status_code, 200)
+        names = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        self.assertEqual(names, ['db', 'load_skills', 'load_jobs', 'score', 'persist', 'serialize', 'total'])
+
+    @override_settings(SERVER_TIMING_HEADERS=False)
+    def test_server_timing_header_is_optional(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/ai/matches/'))
+
+    def test_metrics_endpoint(self):
+        self.client.post('/api/ai/matches/run_matching/', {}, format='json')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('jobmatch_requests_total{view="match-run-matching",method="POST",status="200"} 1', body)
+        self.assertIn('jobmatch_stage_duration_seconds_count{stage="score"} 1', body)
+        self.assertIn('jobmatch_db_queries_total{view="match-run-matching"}', body)
+
+        with override_settings(METRICS_ALLOWED_IPS=['10.0.0.1']):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with override_settings(METRICS_ENABLED=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+@override_settings(BACKGROUND_TASK_MODE='sync')
+class CatalogSnapshotTest(TestCase):
+    def setUp(self):
+        skill_index.invalidate()
+        catalog_snapshot.invalidate()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings_override = override_settings(CATALOG_SNAPSHOT_DIR=self.tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(catalog_snapshot.invalidate)
+
+        create_jobs(3, skills=('Python', 'django', 'python'))
+        jobs = create_jobs(4, skills=('react', 'TypeScript', 'docker'))
+        JobSkill.objects.filter(job=jobs[0], skill_name='docker').update(importance='nice_to_have')
+        self.user = User.objects.create(username='snapshot')
+
+    def test_snapshot_round_trip(self):
+        rows = list(iter_job_skills(with_importance=True))
+        path = os.path.join(self.tmp.name, 'catalog.snap')
+        write_snapshot(path, ['stamp'], rows)
+        snapshot = CatalogSnapshot.open(path)
+        reference = JobSkillMatrix.from_job_skills(rows)
+
+        self.assertEqual(snapshot.stamp, ['stamp'])
+        self.assertEqual(list(snapshot.matrix.job_ids), reference.job_ids)
+        self.assertEqual(list(snapshot.matrix.job_skills), reference.job_skills)
+        for skills in (['python', 'Docker'], ['ReactJS'], ['cobol']):
+            self.assertEqual(snapshot.matrix.score(skills), reference.score(skills))
+            weighted = {skill: 'expert' for skill in skills}
+            self.assertEqual(snapshot.matrix.weighted_score(weighted), reference.weighted_score(weighted))
+
+        subset = snapshot.matrix.select(snapshot.positions({reference.job_ids[5], reference.job_ids[1], -1}))
+        self.assertEqual(subset.job_ids, [reference.job_ids[1], reference.job_ids[5]])
+        self.assertEqual(subset.score(['react']), [reference.score(['react'])[i] for i in (1, 5)])
+
+    def test_matching_from_snapshot_equals_database(self):
+        def run(**kwargs):
+            return [
+                (m.job_id, m.match_score, m.matched_skills, m.missing_skills)
+                for m in score_jobs(self.user.id, ['Python', 'React'], proficiencies={'React': 'beginner'}, **kwargs)
+            ]
+        catalog_snapshot.get(wait=True)
+        for kwargs in ({}, {'scoring': 'weighted'}, {'top_k': 4, 'chunk_size': 2}, {'min_score': 40}):
+            with mock.patch('ai_engine.matcher.iter_job_skills') as database:
+                from_snapshot = run(**kwargs)
+            database.assert_not_called()
+            self.assertTrue(from_snapshot)
+            with override_settings(CATALOG_SNAPSHOT_ENABLED=False):
+                self.assertEqual(from_snapshot, run(**kwargs))
+
+    def test_snapshot_is_rebuilt_in_the_background_when_the_catalog_changes(self):
+        first = catalog_snapshot.get(wait=True)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertIs(catalog_snapshot.get(), first)
+        # The stamp comes from the match cache, not from a scan of the catalog
+        self.assertFalse([q for q in ctx.captured_queries if 'jobs_' in q['sql']])
+
+        # Another process finds the file already written
+        catalog_snapshot.invalidate()
+        with mock.patch.object(catalog_snapshot, 'build', wraps=catalog_snapshot.build) as build:
+            self.assertEqual(catalog_snapshot.get().path, first.path)
+        build.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            JobSkill.objects.create(job=Job.objects.first(), skill_name='rust')
+        with self.captureOnCommitCallbacks() as callbacks:
+            # The stale snapshot is not served; matching reads the database meanwhile
+            self.assertIsNone(catalog_snapshot.get())
+            self.assertIsNone(catalog_snapshot.get())
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        with mock.patch.object(catalog_snapshot, 'build') as build:
+            second = catalog_snapshot.get()
+        build.assert_not_called()
+        self.assertNotEqual(second.path, first.path)
+        self.assertFalse(os.path.exists(first.path))
+        self.assertIn('rust', second.matrix.vocabulary)
+
+    def test_snapshot_follows_term_renames(self):
+        def run():
+            return [(m.job_id, m.match_score, m.matched_skills) for m in score_jobs(self.user.id, ['foozz'])]
+
+        catalog_snapshot.get(wait=True)
+        term = SkillTerm.objects.get(name='docker')
+        term.name = 'Foozz'
+        with self.captureOnCommitCallbacks(execute=True):
+            term.save()
+        self.assertIsNotNone(catalog_snapshot.get(wait=True))
+        from_snapshot = run()
+        self.assertEqual(len(from_snapshot), 4)
+        self.assertEqual(from_snapshot[0][1:], (33.33, ['foozz']))
+        with override_settings(CATALOG_SNAPSHOT_ENABLED=False):
+            self.assertEqual(from_snapshot, run())
+
+    def test_management_command(self):
+        out = io.StringIO()
+        call_command('build_catalog_snapshot', stdout=out)
+        self.assertIn('7 jobs, 21 job skills, 5 distinct skills', out.getvalue())
+
+
+@override_settings(BACKGROUND_TASK_MODE='sync')
+class SkillTermTest(TestCase):
+    def setUp(self):
+        caches[settings.MATCH_CACHE].clear()
+        skill_index.invalidate()
+        catalog_snapshot.invalidate()
+        self.user = User.objects.create_user(username='terms', password='secret-pass')
+        self.job = Job.objects.create(title='Backend', company='Acme', description='')
+
+    def test_spellings_resolve_to_one_term(self):
+        skill = Skill.objects.create(user=self.user, name='Node.js')
+        job_skill = JobSkill.objects.create(job=self.job, skill_name='NodeJS')
+        self.assertEqual(skill.term_id, job_skill.term_id)
+        self.assertEqual(SkillTerm.objects.get(pk=skill.term_id).name, 'nodejs')
+        self.assertEqual(skill_terms.canonical(' node  JS '), 'nodejs')
+        self.assertEqual(skill_index.candidate_job_ids(['node.js']), {self.job.id})
+
+    def test_matching_compares_terms(self):
+        Skill.objects.create(user=self.user, name='Node.js', proficiency='expert')
+        JobSkill.objects.create(job=self.job, skill_name='NodeJS')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for scoring in ('legacy', 'weighted'):
+            response = client.post('/api/ai/matches/run_matching/', {'scoring': scoring}, format='json')
+            match, = response.data['matches']
+            self.assertEqual((match['match_score'], match['matched_skills']), (100.0, ['nodejs']))
+
+    def test_new_alias_merges_existing_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            skill = Skill.objects.create(user=self.user, name='JS')
+            JobSkill.objects.create(job=self.job, skill_name='JavaScript')
+        self.assertFalse(MatchResult.objects.filter(user=self.user).exists())
+
+        javascript = SkillTerm.objects.get(name='javascript')
+        with self.captureOnCommitCallbacks(execute=True):
+            SkillAlias.objects.create(alias=' JS', term=javascript)
+        skill.refresh_from_db()
+        self.assertEqual(skill.term_id, javascript.id)
+        self.assertEqual(skill_terms.canonical('js'), 'javascript')
+        self.assertEqual(MatchResult.objects.get(user=self.user, job=self.job).match_score, 100.0)
+
+    def test_migration_links_existing_rows(self):
+        from importlib import import_module
+        from django.apps import apps
+        link_skill_terms = import_module('ai_engine.migrations.0005_link_skill_terms').link_skill_terms
+
+        Skill.objects.bulk_create([Skill(user=self.user, name='Golang')])
+        JobSkill.objects.bulk_create([JobSkill(job=self.job, skill_name='Go'), JobSkill(job=self.job, skill_name='Elixir')])
+        link_skill_terms(apps, None)
+        self.assertEqual(
+            set(JobSkill.objects.values_list('skill_name', 'term__name')),
+            {('Go', 'go'), ('Elixir', 'elixir')},
+        )
+        self.assertEqual(Skill.objects.get(user=self.user).term.name, 'go')
+
+
+class PushdownScoringTest(TestCase):
+    def setUp(self):
+        caches[settings.MATCH_CACHE].clear()
+        skill_index.invalidate()
+        catalog_snapshot.invalidate()
+        self.addCleanup(catalog_snapshot.invalidate)
+        create_jobs(3, skills=('Python', 'django', 'python'))
+        create_jobs(2, skills=('react', 'TypeScript', 'docker'))
+        create_jobs(2, skills=('NodeJS', 'postgresql', 'Flask', 'cobol'))
+        create_jobs(1, skills=('cobol',))
+        self.user = User.objects.create(username='pushdown')
+
+    def scored(self, skills, pushdown, **kwargs):
+        return [
+            (m.job_id, m.match_score, sorted(m.matched_skills), sorted(m.missing_skills))
+            for m in score_jobs(self.user.id, skills, scoring='legacy', pushdown=pushdown, **kwargs)
+        ]
+
+    def test_scores_equal_matrix_scoring(self):
+        job_ids = set(Job.objects.order_by('id').values_list('id', flat=True)[2:6])
+        for skills in (['python'], ['nodejs', 'django'], ['javascript'], ['flask', 'react', 'docker'], ['haskell']):
+            for kwargs in ({}, {'min_score': 40}, {'top_k': 3}, {'job_ids': job_ids}, {'top_k': 2, 'chunk_size': 1}):
+                self.assertEqual(self.scored(skills, True, **kwargs), self.scored(skills, False, **kwargs), (skills, kwargs))
+        self.assertEqual(len(self.scored(['python'], True)), 5)
+
+    def test_counts_come_from_one_grouped_query(self):
+        first = Job.objects.order_by('id').first()
+        counts = list(skill_match_counts(['python', 'nodejs']))
+        # Every Python job: 3 rows, 1 distinct exact skill, 'django' related
+        self.assertEqual(counts[0], (first.id, 3, 1, 1))
+        self.assertEqual(len(counts), 7)
+
+        def queries():
+            with CaptureQueriesContext(connection) as ctx:
+                matches = score_jobs(self.user.id, ['python'], top_k=5, pushdown=True)
+            self.assertEqual(len(matches), 5)
+            return len(ctx.captured_queries)
+
+        skill_terms.ensure_fresh()
+        small = queries()
+        create_jobs(40, skills=('Python', 'react'))
+        with mock.patch('ai_engine.matcher.iter_job_skills', wraps=iter_job_skills) as job_skills:
+            self.assertEqual(queries(), small)
+        # Only the returned jobs' skills are read
+        self.assertEqual(len(job_skills.call_args.args[0]), 5)
@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import MatchViewSet
+from .views import MatchViewSet, ResumeParseTaskViewSet
 
 router = DefaultRouter()
 router.register(r'matches', MatchViewSet, basename='match')
+router.register(r'parse-tasks', ResumeParseTaskViewSet, basename='parse-task')
 
 urlpatterns = [
     path('', include(router.urls)),
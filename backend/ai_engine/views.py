@@ -1,16 +1,22 @@
+import math
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db import transaction
 from django.db.models import Q
 from users.models import Resume, Skill
-from jobs.models import Job, JobSkill
-from .models import MatchResult
-from .serializers import MatchResultSerializer
-from .nlp_utils import calculate_skill_match, calculate_match_score, calculate_ai_match_score
-from .resume_parser import parse_resume
+from jobs.models import Job
+from .models import MatchResult, ResumeParseTask
+from .serializers import MatchResultSerializer, ResumeParseTaskSerializer
+from .tasks import enqueue_resume_parse
+from .matcher import persist_matches, remember_match_settings, score_jobs
+from .pagination import paginate_matches, parse_top_k
+from .match_cache import get_cached, match_cache_key, set_cached
+from .instrumentation import stage
+from .skill_terms import skill_terms
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,57 +28,81 @@ class MatchViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return MatchResult.objects.filter(user=self.request.user).order_by('-match_score', '-created_at')
+        return self.with_jobs(MatchResult.objects.filter(user=self.request.user)).order_by('-match_score', '-id')
+    
+    def requested_fields(self):
+        """Fields listed in the optional comma-separated `fields` parameter, or None for all."""
+        params = self.request.query_params if self.request.method == 'GET' else self.request.data
+        value = params.get('fields')
+        if not value:
+            return None
+        if isinstance(value, str):
+            value = value.split(',')
+        return [name.strip() for name in value if name.strip()]
+    
+    def with_jobs(self, queryset):
+        """Join each match's job in the same query, skipping the description when not requested."""
+        queryset = queryset.select_related('job')
+        fields = self.requested_fields()
+        if fields and 'job_description' not in fields:
+            queryset = queryset.defer('job__description')
+        return queryset
+    
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.requested_fields())
+        return super().get_serializer(*args, **kwargs)
     
     def list(self, request, *args, **kwargs):
-        """Override list to add pagination support."""
-        queryset = self.get_queryset()
-        
-        # Get pagination parameters
-        page = request.query_params.get('page', 1)
-        page_size = request.query_params.get('page_size', 10)
-        
-        try:
-            page_size = int(page_size)
-            if page_size < 1 or page_size > 100:
-                page_size = 10
-        except (ValueError, TypeError):
-            page_size = 10
-        
-        # Apply pagination
-        paginator = Paginator(queryset, page_size)
-        try:
-            page_obj = paginator.page(page)
-        except (PageNotAnInteger, EmptyPage):
-            page_obj = paginator.page(1)
-        
-        serializer = self.get_serializer(page_obj.object_list, many=True)
+        """Override list to add keyset (cursor) pagination and versioned caching."""
+        params = request.query_params.dict()
+        cacheable = not (params.get('sort_by') == 'random' and 'seed' not in params)
+        cache_key = match_cache_key('list', request.user.id, params) if cacheable else None
+        cached = get_cached(cache_key) if cacheable else None
+        if cached is not None:
+            return Response(cached)
         
-        return Response({
+        queryset = self.get_queryset()
+        rows, meta = paginate_matches(queryset, params, total=queryset.count())
+        serializer = self.get_serializer(rows, many=True)
+        data = {
             'results': serializer.data,
             'matches': serializer.data,
-            'total_matches': paginator.count,
-            'page': page_obj.number,
-            'page_size': page_size,
-            'total_pages': paginator.num_pages,
-            'has_next': page_obj.has_next(),
-            'has_previous': page_obj.has_previous()
-        })
+            **meta
+        }
+        if cacheable:
+            set_cached(cache_key, data)
+        
+        return Response(data)
 
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def run_matching(self, request):
         """Run job matching for current user using AI-based skill matching with pagination support."""
         try:
-            import random
-            
             user = request.user
-            page = request.data.get('page', 1)
-            page_size = request.data.get('page_size', 10)
-            sort_by = request.data.get('sort_by', 'score')  # 'score', 'salary', 'location', 'random'
-            min_score = request.data.get('min_score', 0)  # Minimum match score threshold
+            # Minimum match score threshold
+            try:
+                min_score = float(request.data.get('min_score', 0))
+            except (TypeError, ValueError):
+                min_score = math.nan
+            if not math.isfinite(min_score):
+                return Response(
+                    {'error': 'min_score must be a number.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
-            # Get user skills
-            user_skills = list(Skill.objects.filter(user=user).values_list('name', flat=True))
+            scoring = request.data.get('scoring', settings.MATCH_SCORING)
+            if scoring not in ('legacy', 'weighted'):
+                return Response(
+                    {'error': "scoring must be 'legacy' or 'weighted'."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Get user skills; proficiency is only used by weighted scoring
+            with stage('load_skills'):
+                proficiencies = skill_terms.proficiencies(
+                    Skill.objects.filter(user=user).values_list('term_id', 'name', 'proficiency')
+                )
+            user_skills = list(proficiencies)
             
             if not user_skills:
                 return Response(
@@ -80,77 +110,77 @@ class MatchViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Get all jobs
-            jobs = Job.objects.all()
-            
-            if not jobs.exists():
+            if not Job.objects.exists():
                 return Response(
                     {'error': 'No jobs available for matching.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Clear previous matches for fresh results
-            MatchResult.objects.filter(user=user).delete()
+            # Optional top-K mode: keep only the best K matches, optionally without storing them
+            top_k = parse_top_k(request.data.get('top_k'))
+            persist = str(request.data.get('persist', True)).lower() not in ('false', '0', 'no')
             
-            matches = []
-            for job in jobs:
-                try:
-                    job_skills = list(JobSkill.objects.filter(job=job).values_list('skill_name', flat=True))
-                    
-                    if not job_skills:
-                        continue
-                    
-                    # Use AI-enhanced matching
-                    matched, missing = calculate_skill_match(user_skills, job_skills)
-                    score = calculate_ai_match_score(user_skills, job_skills, matched, missing)
-                    
-                    # Filter by minimum score threshold
-                    if score >= min_score:
-                        match = MatchResult.objects.create(
-                            user=user,
-                            job=job,
-                            match_score=score,
-                            matched_skills=matched,
-                            missing_skills=missing
-                        )
-                        matches.append(match)
-                except Exception as e:
-                    logger.error(f"Error processing job {job.id}: {str(e)}")
-                    continue
+            # Identical requests against unchanged skills, catalog and results are served from cache
+            params = dict(request.data.items())
+            cacheable = not (params.get('sort_by') == 'random' and 'seed' not in params)
+            if cacheable:
+                cached = get_cached(match_cache_key('run', user.id, params))
+                if cached is not None:
+                    return Response(cached, status=status.HTTP_200_OK)
             
-            # Get all matches with appropriate sorting
-            all_matches = MatchResult.objects.filter(user=user)
-            
-            # Apply sorting based on sort_by parameter
-            if sort_by == 'salary':
-                all_matches = all_matches.order_by('-job__salary_max', '-match_score')
-            elif sort_by == 'location':
-                all_matches = all_matches.order_by('job__location', '-match_score')
-            elif sort_by == 'random':
-                all_matches = all_matches.order_by('?')  # Random ordering
-            else:  # Default: score
-                all_matches = all_matches.order_by('-match_score', '-created_at')
-            
-            # Apply pagination
-            paginator = Paginator(all_matches, page_size)
-            try:
-                page_obj = paginator.page(page)
-            except Exception as e:
-                logger.error(f"Pagination error: {str(e)}")
-                page_obj = paginator.page(1)
+            matches = score_jobs(
+                user.id, user_skills, min_score=min_score, top_k=top_k,
+                scoring=scoring, proficiencies=proficiencies
+            )
             
-            serializer = self.get_serializer(page_obj.object_list, many=True)
+            if top_k and not persist:
+                # Already ranked best first; attach jobs in one query for serialization
+                jobs = Job.objects.all()
+                fields = self.requested_fields()
+                if fields and 'job_description' not in fields:
+                    jobs = jobs.defer('description')
+                with stage('load_jobs'):
+                    jobs = jobs.in_bulk([match.job_id for match in matches])
+                for match in matches:
+                    match.job = jobs[match.job_id]
+                with stage('serialize'):
+                    matches_data = self.get_serializer(matches, many=True).data
+                data = {
+                    'message': f'Matching completed. Showing the top {len(matches)} matching jobs.',
+                    'scoring': scoring,
+                    'matches': matches_data,
+                    'total_matches': len(matches),
+                    'page': 1,
+                    'page_size': top_k,
+                    'total_pages': 1,
+                    'has_next': False,
+                    'has_previous': False,
+                    'next_cursor': None
+                }
+            else:
+                # Swap in the new results atomically, dropping jobs that no longer match
+                with stage('persist'), transaction.atomic():
+                    persist_matches(user, matches)
+                    # Incremental re-matching keeps the stored list on this scale
+                    remember_match_settings([user.id], scoring, min_score)
+                
+                # Page through the stored results; the total is already known from scoring
+                with stage('serialize'):
+                    rows, meta = paginate_matches(
+                        self.with_jobs(MatchResult.objects.filter(user=user)), request.data, total=len(matches)
+                    )
+                    matches_data = self.get_serializer(rows, many=True).data
+                data = {
+                    'message': f'Matching completed. Found {len(matches)} matching jobs.',
+                    'scoring': scoring,
+                    'matches': matches_data,
+                    **meta
+                }
             
-            return Response({
-                'message': f'Matching completed. Found {len(matches)} matching jobs.',
-                'matches': serializer.data,
-                'total_matches': len(matches),
-                'page': page,
-                'page_size': page_size,
-                'total_pages': paginator.num_pages,
-                'has_next': page_obj.has_next(),
-                'has_previous': page_obj.has_previous()
-            }, status=status.HTTP_200_OK)
+            if cacheable:
+                # Keyed after persisting, so it reflects the results version just written
+                set_cached(match_cache_key('run', user.id, params), data)
+            return Response(data, status=status.HTTP_200_OK)
         
         except Exception as e:
             logger.error(f"Error in run_matching: {str(e)}")
@@ -161,7 +191,7 @@ class MatchViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def parse_and_extract(self, request):
-        """Parse resume and extract skills."""
+        """Queue the user's resume for parsing and skill extraction."""
         user = request.user
         
         try:
@@ -172,29 +202,20 @@ class MatchViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Parse resume
-        parsed_data = parse_resume(resume.file)
-        
-        # Update resume raw text
-        resume.raw_text = parsed_data['raw_text']
-        resume.save()
-        
-        # Clear existing extracted skills
-        Skill.objects.filter(user=user, extracted_from_resume=True).delete()
-        
-        # Add extracted skills
-        for skill_name in parsed_data['skills']:
-            Skill.objects.create(
-                user=user,
-                name=skill_name,
-                proficiency='intermediate',
-                extracted_from_resume=True
-            )
+        # Parsing runs on the background pool; poll parse-tasks/<task_id>/ for the result
+        task = enqueue_resume_parse(resume)
         
         return Response({
-            'message': 'Resume parsed successfully.',
-            'skills': parsed_data['skills'],
-            'email': parsed_data['email'],
-            'phone': parsed_data['phone'],
-            'raw_text': parsed_data['raw_text']
-        }, status=status.HTTP_200_OK)
+            'message': 'Resume queued for parsing.',
+            'task_id': str(task.id),
+            'status': task.status
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class ResumeParseTaskViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status and results of the current user's resume parse tasks."""
+    serializer_class = ResumeParseTaskSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ResumeParseTask.objects.filter(user=self.request.user).select_related('resume')
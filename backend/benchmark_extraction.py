@@ -0,0 +1,76 @@
+"""
+Benchmark for resume/job description skill extraction
+Compares the compiled single-pass extractor with the old per-skill substring scan
+"""
+
+import random
+import time
+
+from ai_engine.nlp_utils import COMMON_SKILLS, SKILL_ALIASES, compile_skill_pattern, extract_skills_from_text
+
+
+RESUME_PARAGRAPH = (
+    "Senior software engineer with 8 years of experience building good, reliable "
+    "backend services in Python and Django, REST APIs with FastAPI, and frontends in "
+    "React and TypeScript. Deployed microservices on AWS and Kubernetes using Docker, "
+    "Terraform and Jenkins. Worked with PostgreSQL, Redis and Elasticsearch, and trained "
+    "deep learning models with PyTorch for computer vision projects. Agile/Scrum team lead. "
+)
+
+
+def legacy_extract_skills_from_text(text, skills):
+    """The original extractor: one substring scan of the whole text per skill."""
+    text_lower = text.lower()
+    return sorted({skill for skill in skills if skill in text_lower})
+
+
+def compiled_extract(pattern, canonical, text):
+    return sorted({canonical.get(m.group(), m.group()) for m in pattern.finditer(text.lower())})
+
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def synthetic_vocabulary(size, seed=7):
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return {''.join(rng.choice(letters) for _ in range(rng.randint(4, 12))) for _ in range(size)}
+
+
+def run_benchmark():
+    common_skills = [skill for group in COMMON_SKILLS.values() for skill in group]
+
+    print("\n" + "="*60)
+    print("SKILL EXTRACTION BENCHMARK")
+    print("="*60)
+
+    for pages in (1, 20, 200):
+        text = RESUME_PARAGRAPH * (pages * 8)
+        legacy = best_of(lambda: legacy_extract_skills_from_text(text, common_skills))
+        compiled = best_of(lambda: extract_skills_from_text(text))
+        print(f"{pages:>4} pages ({len(text):>8} chars): legacy {legacy*1000:8.2f} ms | "
+              f"compiled {compiled*1000:8.2f} ms | speedup {legacy/compiled:5.1f}x")
+
+    text = RESUME_PARAGRAPH * 160
+    for size in (100, 1000, 5000):
+        vocabulary = set(common_skills) | synthetic_vocabulary(size)
+        pattern, canonical = compile_skill_pattern(vocabulary, SKILL_ALIASES)
+        legacy = best_of(lambda: legacy_extract_skills_from_text(text, vocabulary), repeat=3)
+        compiled = best_of(lambda: compiled_extract(pattern, canonical, text), repeat=3)
+        print(f"{len(vocabulary):>5} skills: legacy {legacy*1000:8.2f} ms | "
+              f"compiled {compiled*1000:8.2f} ms | speedup {legacy/compiled:5.1f}x")
+
+    sample = "Good communicator, strong in JavaScript."
+    print(f"\nFalse positives on {sample!r}:")
+    print(f"  legacy:   {legacy_extract_skills_from_text(sample, common_skills)}")
+    print(f"  compiled: {extract_skills_from_text(sample)}")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -0,0 +1,406 @@
+"""
+Benchmark suite for the matching pipeline
+Generates a synthetic catalog (users, jobs, skills) into a temporary SQLite
+database and times run_matching end to end and per stage, plus the scoring,
+extraction and resume parsing functions. Results are emitted as JSON so runs
+can be compared between commits:
+
+    python benchmark_matching.py --jobs 10000 --output before.json
+    python benchmark_matching.py --jobs 10000 --compare before.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+PROFICIENCIES = ['beginner', 'intermediate', 'expert']
+IMPORTANCES = ['required', 'required', 'preferred', 'nice_to_have']
+FILLER = (
+    "We are looking for an engineer to join a growing team. You will design, build and "
+    "operate services used by thousands of customers, review code and mentor others. "
+)
+
+
+def use_temporary_database(path):
+    """Point Django at a fresh SQLite file before anything opens a connection."""
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = path
+    # Catalog snapshots go next to the database, so they are removed with it
+    settings.CATALOG_SNAPSHOT_DIR = os.path.join(os.path.dirname(path), 'snapshots')
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+# Synthetic catalog
+
+def synthetic_vocabulary(size, rng):
+    """The real skill list first (so aliases and related skills matter), then made-up skills."""
+    from ai_engine.nlp_utils import COMMON_SKILLS
+    vocabulary = [skill for group in COMMON_SKILLS.values() for skill in group]
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    seen = set(vocabulary)
+    while len(vocabulary) < size:
+        word = ''.join(rng.choice(letters) for _ in range(rng.randint(5, 10)))
+        if word not in seen:
+            seen.add(word)
+            vocabulary.append(word)
+    return vocabulary
+
+
+def job_description(skills, rng):
+    sentences = [FILLER] + [f"Experience with {skill} is a plus. " for skill in skills]
+    rng.shuffle(sentences)
+    return ''.join(sentences)
+
+
+def generate_catalog(job_count, user_count, vocabulary, skills_per_job, skills_per_user, rng, batch_size=5000):
+    """Bulk-insert jobs with JobSkills and users with Skills; returns the user ids."""
+    from django.contrib.auth.models import User
+    from ai_engine.match_cache import bump_catalog_version
+    from ai_engine.skill_index import skill_index
+    from ai_engine.skill_terms import skill_terms
+    from jobs.models import Job, JobSkill
+    from users.models import Skill
+
+    # Frequently used skills are drawn more often, like a real catalog
+    weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(vocabulary))]
+
+    def draw(count):
+        picked = set()
+        while len(picked) < count:
+            picked.update(rng.choices(vocabulary, weights=weights, k=count - len(picked)))
+        return list(picked)
+
+    for start in range(0, job_count, batch_size):
+        size = min(batch_size, job_count - start)
+        skill_sets = [draw(rng.randint(*skills_per_job)) for _ in range(size)]
+        jobs = Job.objects.bulk_create(
+            Job(
+                title=f'Engineer {start + i}',
+                company=f'Company {rng.randint(1, 500)}',
+                description=job_description(skills, rng),
+                location=rng.choice(['Berlin', 'London', 'Remote', None]),
+                salary_min=rng.randrange(30000, 90000, 1000),
+                salary_max=rng.randrange(90000, 200000, 1000),
+                url=f'https://jobs.example.com/{start + i}',
+                source='benchmark',
+            )
+            for i, skills in enumerate(skill_sets)
+        )
+        JobSkill.objects.bulk_create(skill_terms.assign(
+            (
+                JobSkill(job=job, skill_name=skill, importance=rng.choice(IMPORTANCES))
+                for job, skills in zip(jobs, skill_sets) for skill in skills
+            ),
+            'skill_name',
+        ))
+    bump_catalog_version()
+    skill_index.changed()
+
+    users = User.objects.bulk_create(User(username=f'bench-{i}') for i in range(user_count))
+    Skill.objects.bulk_create(skill_terms.assign(
+        (
+            Skill(user=user, name=skill, proficiency=rng.choice(PROFICIENCIES))
+            for user in users for skill in draw(rng.randint(*skills_per_user))
+        ),
+        'name',
+    ))
+    return [user.id for user in users]
+
+
+def make_pdf(pages):
+    """A minimal PDF with one text page per item of `pages` (lists of lines)."""
+    def escape(line):
+        return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    page_ids = []
+    for lines in pages:
+        stream = 'BT /F1 9 Tf 40 800 Td 11 TL ' + ' '.join(f'({escape(line)}) Tj T*' for line in lines) + ' ET'
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>'
+        )
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1'))
+    xref = out.tell()
+    out.write(f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode())
+    for offset in offsets:
+        out.write(f'{offset:010d} 00000 n \n'.encode())
+    out.write(f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode())
+    return out.getvalue()
+
+
+# Measurement helpers
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'runs': len(timings),
+        'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+        'median_ms': round(statistics.median(timings) * 1000, 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+        'min_ms': round(timings[0] * 1000, 3),
+    }
+
+
+class Recorder:
+    """Collects wall time and query count per named stage."""
+
+    def __init__(self):
+        self.timings = {}
+        self.queries = {}
+
+    def measure(self, name, func, *args, **kwargs):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+        self.timings.setdefault(name, []).append(elapsed)
+        self.queries.setdefault(name, []).append(len(ctx.captured_queries))
+        return result
+
+    def report(self):
+        return {
+            name: {**summarize(timings), 'queries_per_run': round(statistics.fmean(self.queries[name]), 2)}
+            for name, timings in self.timings.items()
+        }
+
+
+# Benchmarks
+
+def bench_run_matching(user_ids, scoring):
+    """POST run_matching for each user (cache cleared), timing it end to end and per stage."""
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.cache import caches
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from ai_engine.matcher import iter_job_skills, persist_matches, score_jobs
+    from ai_engine.scoring import JobSkillMatrix
+    from ai_engine.skill_index import skill_index
+    from ai_engine.skill_terms import skill_terms
+    from ai_engine.views import MatchViewSet
+    from users.models import Skill
+
+    recorder = Recorder()
+    view = MatchViewSet.as_view({'post': 'run_matching'})
+    factory = APIRequestFactory()
+    recorder.measure('index_build', skill_index.build)
+
+    for user in User.objects.filter(id__in=user_ids):
+        proficiencies = skill_terms.proficiencies(
+            Skill.objects.filter(user=user).values_list('term_id', 'name', 'proficiency')
+        )
+        skills = list(proficiencies)
+        weighted = scoring == 'weighted'
+
+        candidates = recorder.measure('candidates', skill_index.candidate_job_ids, skills)
+        rows = recorder.measure('load_job_skills', lambda: list(iter_job_skills(candidates, with_importance=weighted)))
+        matrix = recorder.measure('build_matrix', JobSkillMatrix.from_job_skills, rows)
+        if weighted:
+            recorder.measure('score', matrix.weighted_score, proficiencies)
+        else:
+            recorder.measure('score', matrix.score, skills)
+        matches = recorder.measure(
+            'score_jobs', score_jobs, user.id, skills, scoring=scoring, proficiencies=proficiencies, pushdown=False
+        )
+        if not weighted:
+            recorder.measure('score_jobs_sql', score_jobs, user.id, skills, scoring=scoring, pushdown=True)
+        recorder.measure('persist', persist_matches, user, matches)
+
+        caches[settings.MATCH_CACHE].clear()
+        request = factory.post('/api/ai/matches/run_matching/', {'scoring': scoring}, format='json')
+        force_authenticate(request, user=user)
+        response = recorder.measure('run_matching', view, request)
+        if response.status_code != 200:
+            raise RuntimeError(f'run_matching failed for user {user.id}: {response.data}')
+    return recorder.report()
+
+
+def bench_match_score(pair_count, rng):
+    """calculate_ai_match_score over random (user, job) pairs from the catalog."""
+    from ai_engine.nlp_utils import calculate_ai_match_score, calculate_skill_match
+    from ai_engine.matcher import iter_job_skills
+    from users.models import Skill
+
+    jobs = [skills for _, skills in iter_job_skills()]
+    users = {}
+    for user_id, name in Skill.objects.values_list('user_id', 'name'):
+        users.setdefault(user_id, []).append(name)
+    users = list(users.values())
+    pairs = [(rng.choice(users), rng.choice(jobs)) for _ in range(pair_count)]
+
+    start = time.perf_counter()
+    for user_skills, job_skills in pairs:
+        matched, missing = calculate_skill_match(user_skills, job_skills)
+        calculate_ai_match_score(user_skills, job_skills, matched, missing)
+    elapsed = time.perf_counter() - start
+    return {'pairs': pair_count, 'total_ms': round(elapsed * 1000, 3), 'us_per_pair': round(elapsed / pair_count * 1e6, 3)}
+
+
+def bench_extraction(sample_size, repeat):
+    """extract_skills_from_text over a sample of job descriptions."""
+    from ai_engine.nlp_utils import extract_skills_from_text
+    from jobs.models import Job
+
+    descriptions = list(Job.objects.values_list('description', flat=True)[:sample_size])
+    chars = sum(len(text) for text in descriptions)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in descriptions:
+            extract_skills_from_text(text)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        **summarize(timings),
+        'documents': len(descriptions),
+        'chars_per_second': round(chars / best) if best else None,
+    }
+
+
+def bench_parse_resume(page_counts, vocabulary, repeat, rng):
+    """parse_resume on generated PDFs of increasing length."""
+    from ai_engine.resume_parser import parse_resume
+
+    results = {}
+    for page_count in page_counts:
+        pages = [
+            [f'Worked with {", ".join(rng.sample(vocabulary, 4))} on production systems.' for _ in range(40)]
+            for _ in range(page_count)
+        ]
+        pdf = make_pdf(pages)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parsed = parse_resume(io.BytesIO(pdf))
+            timings.append(time.perf_counter() - start)
+        results[f'{page_count}_pages'] = {**summarize(timings), 'bytes': len(pdf), 'skills_found': len(parsed['skills'])}
+    return results
+
+
+# Reporting
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import numpy
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def flatten(results, prefix=''):
+    """{'a': {'b': {'median_ms': 1}}} -> {'a.b.median_ms': 1}"""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline_path):
+    """Print timing and query-count changes against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before, after = flatten(baseline['results']), flatten(current['results'])
+    print(f"\nCompared with {baseline_path} (commit {baseline['environment'].get('commit')}):", file=sys.stderr)
+    for name in sorted(before.keys() & after.keys()):
+        if not name.endswith(('median_ms', 'queries_per_run', 'us_per_pair')) or not before[name]:
+            continue
+        change = (after[name] - before[name]) / before[name] * 100
+        print(f'  {name:<55} {before[name]:>12} -> {after[name]:>12}  ({change:+.1f}%)', file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=10000, help='Jobs in the synthetic catalog (default 10000)')
+    parser.add_argument('--users', type=int, default=200, help='Users in the synthetic catalog (default 200)')
+    parser.add_argument('--vocabulary', type=int, default=500, help='Distinct skills (default 500)')
+    parser.add_argument('--sample-users', type=int, default=20, help='Users to run matching for (default 20)')
+    parser.add_argument('--scoring', choices=['legacy', 'weighted'], default='legacy')
+    parser.add_argument('--repeat', type=int, default=5, help='Repetitions for micro-benchmarks (default 5)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write JSON results here instead of stdout')
+    parser.add_argument('--compare', metavar='BASELINE', help='Print changes against an earlier JSON result')
+    parser.add_argument('--keep-db', action='store_true', help='Keep the temporary database and print its path')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    db_dir = tempfile.mkdtemp(prefix='matching-bench-')
+    db_path = os.path.join(db_dir, 'bench.sqlite3')
+    use_temporary_database(db_path)
+    try:
+        vocabulary = synthetic_vocabulary(args.vocabulary, rng)
+        start = time.perf_counter()
+        user_ids = generate_catalog(args.jobs, args.users, vocabulary, (3, 10), (3, 12), rng)
+        generation_seconds = time.perf_counter() - start
+
+        results = {
+            'run_matching': bench_run_matching(rng.sample(user_ids, min(args.sample_users, len(user_ids))), args.scoring),
+            'calculate_ai_match_score': bench_match_score(20000, rng),
+            'extract_skills_from_text': bench_extraction(2000, args.repeat),
+            'parse_resume': bench_parse_resume((1, 10, 50), vocabulary, args.repeat, rng),
+        }
+        report = {
+            'environment': environment(),
+            'parameters': {**vars(args), 'generation_seconds': round(generation_seconds, 2)},
+            'results': results,
+        }
+    finally:
+        from django.db import connections
+        connections.close_all()
+        if args.keep_db:
+            print(f'Database kept at {db_path}', file=sys.stderr)
+        else:
+            shutil.rmtree(db_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
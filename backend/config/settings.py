@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 from decouple import config
@@ -24,6 +25,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ai_engine.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -113,3 +115,75 @@ EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.conso
 
 # OpenAI API Key
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
+
+# Matching engine
+MATCHING_CHUNK_SIZE = config('MATCHING_CHUNK_SIZE', default=2000, cast=int)
+MATCHING_BATCH_SIZE = config('MATCHING_BATCH_SIZE', default=500, cast=int)
+# Recompute affected matches in the background whenever skills or job skills change
+INCREMENTAL_MATCHING = config('INCREMENTAL_MATCHING', default=True, cast=bool)
+
+# Background tasks (resume parsing): 'thread', 'process' or 'sync' (inline, for tests/debugging)
+BACKGROUND_TASK_MODE = config('BACKGROUND_TASK_MODE', default='thread')
+BACKGROUND_TASK_WORKERS = config('BACKGROUND_TASK_WORKERS', default=2, cast=int)
+
+# Resume parsing limits: stop reading a PDF after this many pages or characters
+RESUME_MAX_PAGES = config('RESUME_MAX_PAGES', default=50, cast=int)
+RESUME_MAX_CHARS = config('RESUME_MAX_CHARS', default=200000, cast=int)
+
+# Parsed resumes are cached by file content. The local-memory backend evicts
+# least-recently-used entries once MAX_ENTRIES is reached; point the backend at
+# e.g. django.core.cache.backends.filebased.FileBasedCache to share it on disk.
+RESUME_PARSE_CACHE = 'resume_parse'
+
+# Ranked match lists are cached per user and invalidated by version stamps, not a
+# TTL. The stamps (and those of the skill index, skill term map and catalog
+# snapshot) must be seen by every process that writes the catalog -- web workers,
+# background processes, import_jobs and rematch_all -- so this cache is shared:
+# a database table by default (created by a migration), or e.g. Redis/Memcached.
+MATCH_CACHE = 'matches'
+MATCH_CACHE_TIMEOUT = None
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    MATCH_CACHE: {
+        'BACKEND': config('MATCH_CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('MATCH_CACHE_LOCATION', default='ai_engine_match_cache'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': config('MATCH_CACHE_MAX_ENTRIES', default=20000, cast=int)},
+    },
+    RESUME_PARSE_CACHE: {
+        'BACKEND': config('RESUME_PARSE_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('RESUME_PARSE_CACHE_LOCATION', default='resume-parse'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': config('RESUME_PARSE_CACHE_MAX_ENTRIES', default=1000, cast=int)},
+    },
+}
+
+# Bulk job import (jobs/ingest.py): rows written per batch
+JOB_IMPORT_BATCH_SIZE = config('JOB_IMPORT_BATCH_SIZE', default=1000, cast=int)
+
+# Extract skills from job descriptions into 'auto' JobSkill rows whenever a job is saved
+AUTO_EXTRACT_JOB_SKILLS = config('AUTO_EXTRACT_JOB_SKILLS', default=True, cast=bool)
+
+# Default match scoring: 'legacy' (skill coverage) or 'weighted' (JobSkill.importance
+# and Skill.proficiency); run_matching can choose per request with `scoring`
+MATCH_SCORING = config('MATCH_SCORING', default='legacy')
+
+# Request instrumentation (ai_engine/instrumentation.py): Prometheus text metrics at
+# /metrics for the listed client addresses, and optional Server-Timing headers
+# with per-request query time and stage timings
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1').split(',')
+SERVER_TIMING_HEADERS = config('SERVER_TIMING_HEADERS', default=DEBUG, cast=bool)
+
+# Matching reads job skills from a memory-mapped snapshot of the catalog
+# (ai_engine/catalog_snapshot.py), shared by every worker process on the host
+# and rewritten in the background whenever the catalog changes
+CATALOG_SNAPSHOT_ENABLED = config('CATALOG_SNAPSHOT_ENABLED', default=True, cast=bool)
+CATALOG_SNAPSHOT_DIR = config('CATALOG_SNAPSHOT_DIR', default=os.path.join(tempfile.gettempdir(), 'jobmatch-catalog'))
+
+# Legacy scoring counts each job's exact and related skill matches in one SQL
+# GROUP BY over JobSkill (by SkillTerm id) instead of reading every candidate's
+# skills into the matcher; unlinked JobSkill rows then never match
+MATCH_SQL_PUSHDOWN = config('MATCH_SQL_PUSHDOWN', default=False, cast=bool)
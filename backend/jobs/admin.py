@@ -9,6 +9,6 @@ class JobAdmin(admin.ModelAdmin):
 
 @admin.register(JobSkill)
 class JobSkillAdmin(admin.ModelAdmin):
-    list_display = ['job', 'skill_name', 'importance']
+    list_display = ['job', 'skill_name', 'importance', 'provenance']
     search_fields = ['job__title', 'skill_name']
-    list_filter = ['importance']
+    list_filter = ['importance', 'provenance']
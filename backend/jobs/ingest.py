@@ -0,0 +1,267 @@
+import csv
+import io
+import json
+import time
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from ai_engine.job_skills import apply_auto_skills
+from ai_engine.match_cache import bump_catalog_version
+from ai_engine.nlp_utils import extract_skills_from_text
+from ai_engine.skill_index import skill_index
+from ai_engine.skill_terms import skill_terms
+from .models import Job, JobSkill
+
+# Bulk job ingestion from JSONL or CSV feeds.
+#
+# Records are streamed and written in batches: each batch looks up the jobs
+# it already has by (source, url) in one query, rewrites only those whose
+# fields changed, and bulk-creates the new jobs and their JobSkills. Bulk writes skip model
+# signals: the search index follows them through its triggers, and each batch
+# that inserts JobSkills marks the skill index (and so the catalog snapshot)
+# changed, and bumps the match cache's catalog version when it writes a job
+# or a JobSkill.
+
+JOB_FIELDS = ['title', 'company', 'description', 'location', 'salary_min', 'salary_max', 'job_type', 'url', 'source']
+TEXT_FIELDS = ['title', 'company', 'description', 'location', 'job_type', 'url', 'source']
+JOB_TYPES = {choice for choice, _ in Job._meta.get_field('job_type').choices}
+MAX_REPORTED_ERRORS = 20
+
+
+class ImportStats:
+    """Running totals for one import, reported to the progress callback after every batch."""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.skills = 0
+        self.errors = []
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def skip(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'line {line}: {message}')
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'skipped': self.skipped,
+            'skills': self.skills,
+            'errors': self.errors,
+            'seconds': round(self.elapsed, 2),
+            'rows_per_second': round(self.rate, 1),
+        }
+
+
+def detect_format(name):
+    return 'csv' if name.lower().endswith('.csv') else 'jsonl'
+
+
+def iter_records(file, fmt='jsonl'):
+    """
+    Yield (line number, record dict) from a JSONL or CSV file, one row at a time.
+
+    `file` may be opened in text or binary mode. Rows that cannot be decoded
+    are yielded as (line number, None).
+    """
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(file, encoding='utf-8', newline='')
+
+    if fmt == 'csv':
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record if isinstance(record, dict) else None
+
+
+def _int_or_none(value):
+    if value in (None, ''):
+        return None
+    return int(value)
+
+
+def parse_skills(value):
+    """Skills come as a JSON list or, in CSV, a string separated by commas or semicolons."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.replace(';', ',').split(',')
+    elif not isinstance(value, list):
+        raise ValueError('skills must be a list or a comma-separated string')
+    return [str(skill).strip() for skill in value if str(skill).strip()]
+
+
+def clean_record(record):
+    """Validate one feed record; returns (job field values, skill names) or raises ValueError."""
+    values = {field: record.get(field) for field in JOB_FIELDS}
+    for field in TEXT_FIELDS:
+        if values[field] is not None and not isinstance(values[field], str):
+            raise ValueError(f'{field} must be a string')
+    for field in ('title', 'company'):
+        if not (values[field] or '').strip():
+            raise ValueError(f'{field} is required')
+    values['description'] = values['description'] or ''
+    values['source'] = values['source'] or 'internal'
+    values['url'] = values['url'] or None
+    values['location'] = values['location'] or None
+    values['job_type'] = values['job_type'] or 'full-time'
+    if values['job_type'] not in JOB_TYPES:
+        raise ValueError(f"unknown job_type {values['job_type']!r}")
+    try:
+        values['salary_min'] = _int_or_none(values['salary_min'])
+        values['salary_max'] = _int_or_none(values['salary_max'])
+    except (TypeError, ValueError):
+        raise ValueError('salary_min and salary_max must be integers')
+    return values, parse_skills(record.get('skills'))
+
+
+def _write_batch(batch, extract, stats):
+    """Upsert one batch of (values, skills) pairs keyed by (source, url)."""
+    keyed = {}
+    unkeyed = []
+    for values, skills in batch:
+        if values['url']:
+            # A feed repeating a posting within a batch: the last copy wins
+            keyed[(values['source'], values['url'])] = (values, skills)
+        else:
+            unkeyed.append((values, skills))
+
+    existing = {}
+    if keyed:
+        sources = {source for source, _ in keyed}
+        urls = [url for _, url in keyed]
+        for job in Job.objects.filter(source__in=sources, url__in=urls):
+            existing[(job.source, job.url)] = job
+
+    now = timezone.now()
+    to_update, to_create, unchanged, skills_for = [], [], [], []
+    for key, (values, skills) in keyed.items():
+        job = existing.get(key)
+        if job is None:
+            job = Job(**values)
+            to_create.append(job)
+        elif any(getattr(job, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(job, field, value)
+            job.updated_at = now
+            to_update.append(job)
+        else:
+            # Unchanged postings are not rewritten, so their updated_at/ETag stay put
+            unchanged.append(job)
+        skills_for.append((job, values['description'], skills))
+    for values, skills in unkeyed:
+        job = Job(**values)
+        to_create.append(job)
+        skills_for.append((job, values['description'], skills))
+
+    with transaction.atomic():
+        # One plain UPDATE per changed job: on SQLite this is several times
+        # faster than bulk_update, whose per-field CASE expressions are costly
+        # to build
+        for job in to_update:
+            Job.objects.filter(pk=job.pk).update(
+                updated_at=job.updated_at, **{field: getattr(job, field) for field in JOB_FIELDS}
+            )
+        Job.objects.bulk_create(to_create)
+
+        # Listed skills the job already has are left out, so the rows that
+        # remain are the ones actually inserted
+        present = set()
+        if existing:
+            present.update(JobSkill.objects.filter(
+                job_id__in=[job.pk for job in existing.values()]
+            ).values_list('job_id', 'skill_name'))
+        job_skills = []
+        for job, description, skills in skills_for:
+            names = {skill.lower(): skill for skill in skills}
+            job_skills.extend(
+                JobSkill(job=job, skill_name=name) for name in names.values() if (job.pk, name) not in present
+            )
+        skill_terms.assign(job_skills, 'skill_name')
+        JobSkill.objects.bulk_create(job_skills, ignore_conflicts=True)
+        if job_skills:
+            skill_index.changed()
+
+        skills_changed = {job_skill.job.pk for job_skill in job_skills}
+        # New jobs and rewritten ones already carry a fresh updated_at; touch
+        # the others that gained skills so the job list's ETag moves
+        touched = [job.pk for job in unchanged if job.pk in skills_changed]
+        if touched:
+            Job.objects.filter(pk__in=touched).update(updated_at=now)
+        if extract:
+            # Stored as 'auto' rows; an updated description replaces the old ones
+            skills_changed |= apply_auto_skills({
+                job.pk: extract_skills_from_text(description) for job, description, _ in skills_for
+            })
+
+        if to_update or to_create or skills_changed:
+            # Cached match lists embed job details and skills
+            bump_catalog_version()
+
+    # A posting whose only change is new skills counts as updated
+    skills_only = sum(1 for job in unchanged if job.pk in skills_changed)
+    stats.created += len(to_create)
+    stats.updated += len(to_update) + skills_only
+    stats.unchanged += len(unchanged) - skills_only
+    stats.skills += len(job_skills)
+
+
+def import_jobs(file, fmt='jsonl', batch_size=None, extract=True, progress=None):
+    """
+    Stream jobs from a JSONL/CSV file into the catalog and return ImportStats.
+
+    Jobs with a url are upserted by (source, url); the others are always
+    created. Listed skills are added to the job; with `extract` set, the
+    skills found in its description are stored as 'auto' JobSkills. Invalid
+    rows are skipped and counted. `progress` is called with the stats after
+    every batch.
+    """
+    batch_size = batch_size or settings.JOB_IMPORT_BATCH_SIZE
+    stats = ImportStats()
+    batch = []
+
+    for line_number, record in iter_records(file, fmt):
+        stats.rows += 1
+        if record is None:
+            stats.skip(line_number, 'not a JSON object')
+            continue
+        try:
+            batch.append(clean_record(record))
+        except ValueError as e:
+            stats.skip(line_number, str(e))
+            continue
+        if len(batch) >= batch_size:
+            _write_batch(batch, extract, stats)
+            batch = []
+            if progress:
+                progress(stats)
+
+    if batch:
+        _write_batch(batch, extract, stats)
+    if progress:
+        progress(stats)
+    return stats
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from jobs.ingest import detect_format, import_jobs
+
+
+class Command(BaseCommand):
+    help = 'Import jobs from a JSONL or CSV file, upserting by (source, url).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSONL or CSV file to import')
+        parser.add_argument('--format', choices=['jsonl', 'csv'], help='File format (default: from the extension)')
+        parser.add_argument('--batch-size', type=int, help='Rows written per batch (default: JOB_IMPORT_BATCH_SIZE)')
+        parser.add_argument('--no-extract', action='store_true', help='Do not extract skills from descriptions')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+        try:
+            file = open(path, encoding='utf-8', newline='')
+        except OSError as e:
+            raise CommandError(f'Cannot open {path}: {e}')
+
+        with file:
+            stats = import_jobs(
+                file,
+                fmt=fmt,
+                batch_size=options['batch_size'],
+                extract=not options['no_extract'],
+                progress=self.report,
+            )
+
+        for error in stats.errors:
+            self.stderr.write(f'Skipped {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {stats.rows} rows in {stats.elapsed:.1f}s: {stats.created} created, '
+            f'{stats.updated} updated, {stats.unchanged} unchanged, {stats.skipped} skipped, {stats.skills} skills'
+        ))
+
+    def report(self, stats):
+        self.stdout.write(
+            f'{stats.rows} rows  {stats.created} created  {stats.updated} updated  '
+            f'{stats.unchanged} unchanged  {stats.skipped} skipped  {stats.rate:.0f} rows/s'
+        )
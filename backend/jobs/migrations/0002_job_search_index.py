@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# SQLite FTS5 index over job title, company and description. It is an
+# external-content table, so it stores only the index; triggers keep it in
+# step with jobs_job for every write, including bulk inserts and updates
+# that never send model signals. Other database backends skip it and search
+# falls back to plain filtering.
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE jobs_job_fts USING fts5(
+        title, company, description,
+        content='jobs_job', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER jobs_job_fts_insert AFTER INSERT ON jobs_job BEGIN
+        INSERT INTO jobs_job_fts(rowid, title, company, description)
+        VALUES (new.id, new.title, new.company, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER jobs_job_fts_delete AFTER DELETE ON jobs_job BEGIN
+        INSERT INTO jobs_job_fts(jobs_job_fts, rowid, title, company, description)
+        VALUES ('delete', old.id, old.title, old.company, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER jobs_job_fts_update AFTER UPDATE OF title, company, description ON jobs_job BEGIN
+        INSERT INTO jobs_job_fts(jobs_job_fts, rowid, title, company, description)
+        VALUES ('delete', old.id, old.title, old.company, old.description);
+        INSERT INTO jobs_job_fts(rowid, title, company, description)
+        VALUES (new.id, new.title, new.company, new.description);
+    END
+    """,
+    # Index the jobs that already exist
+    "INSERT INTO jobs_job_fts(jobs_job_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS jobs_job_fts_update',
+    'DROP TRIGGER IF EXISTS jobs_job_fts_delete',
+    'DROP TRIGGER IF EXISTS jobs_job_fts_insert',
+    'DROP TABLE IF EXISTS jobs_job_fts',
+]
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
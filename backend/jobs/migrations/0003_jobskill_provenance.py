@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_job_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobskill',
+            name='provenance',
+            field=models.CharField(choices=[('manual', 'Manual'), ('auto', 'Auto-extracted')], default='manual', max_length=20),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0004_skillterm_skillalias'),
+        ('jobs', '0003_jobskill_provenance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobskill',
+            name='term',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='job_skills', to='ai_engine.skillterm'),
+        ),
+    ]
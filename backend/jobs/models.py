@@ -28,11 +28,22 @@ class Job(models.Model):
 class JobSkill(models.Model):
     job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='required_skills')
     skill_name = models.CharField(max_length=255)
+    # Canonical skill, resolved from skill_name when the row is saved
+    term = models.ForeignKey(
+        'ai_engine.SkillTerm', on_delete=models.SET_NULL, null=True, blank=True, related_name='job_skills'
+    )
     importance = models.CharField(
         max_length=20,
         choices=[('required', 'Required'), ('preferred', 'Preferred'), ('nice_to_have', 'Nice to have')],
         default='required'
     )
+    # 'auto' rows are extracted from the job description and are replaced
+    # whenever it changes; 'manual' rows were listed explicitly
+    provenance = models.CharField(
+        max_length=20,
+        choices=[('manual', 'Manual'), ('auto', 'Auto-extracted')],
+        default='manual'
+    )
 
     class Meta:
         unique_together = ('job', 'skill_name')
@@ -0,0 +1,86 @@
+import re
+from django.db import connection
+from django.db.models import Q
+from .models import Job
+
+# Column weights for bm25(): a hit in the title counts most, then company
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled():
+    """The FTS5 index exists only on SQLite (see migration 0002_job_search_index)."""
+    return connection.vendor == 'sqlite'
+
+
+def fts_query(query):
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word must match; the last one also matches as a prefix so partial
+    input still finds results. FTS5 operators in the input are treated as
+    plain words.
+    """
+    terms = TOKEN_RE.findall(query)
+    if not terms:
+        return ''
+    phrases = [f'"{term}"' for term in terms]
+    phrases[-1] += '*'
+    return ' '.join(phrases)
+
+
+def filter_jobs(queryset, params):
+    """
+    Apply the optional location, job_type, min_salary and max_salary filters.
+
+    Raises ValueError if a salary bound is not an integer.
+    """
+    location = params.get('location')
+    if location:
+        queryset = queryset.filter(location__icontains=location)
+    job_type = params.get('job_type')
+    if job_type:
+        queryset = queryset.filter(job_type=job_type)
+    if params.get('min_salary'):
+        # A job qualifies if its range reaches the requested minimum
+        min_salary = int(params['min_salary'])
+        queryset = queryset.filter(
+            Q(salary_max__gte=min_salary) | Q(salary_max__isnull=True, salary_min__gte=min_salary)
+        )
+    if params.get('max_salary'):
+        queryset = queryset.filter(salary_min__lte=int(params['max_salary']))
+    return queryset
+
+
+def search_jobs(query, params=None, queryset=None):
+    """
+    Jobs matching `query`, best first, narrowed by the filters in `params`.
+
+    Uses the FTS5 index with bm25 ranking when available; elsewhere every
+    word must appear in the title, company or description, newest first.
+    An empty query returns all jobs that pass the filters.
+    """
+    queryset = Job.objects.all() if queryset is None else queryset
+    queryset = filter_jobs(queryset, params or {})
+
+    if not query.strip():
+        return queryset
+
+    if fts_enabled():
+        match = fts_query(query)
+        if not match:
+            return queryset.none()
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        return queryset.extra(
+            tables=['jobs_job_fts'],
+            where=['jobs_job_fts.rowid = jobs_job.id', 'jobs_job_fts MATCH %s'],
+            params=[match],
+            select={'rank': f'bm25(jobs_job_fts, {weights})'},
+        ).order_by('rank', '-id')
+
+    for term in TOKEN_RE.findall(query):
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(company__icontains=term) | Q(description__icontains=term)
+        )
+    return queryset
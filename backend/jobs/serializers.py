@@ -5,8 +5,8 @@ from .models import Job, JobSkill
 class JobSkillSerializer(serializers.ModelSerializer):
     class Meta:
         model = JobSkill
-        fields = ['id', 'skill_name', 'importance']
-        read_only_fields = ['id']
+        fields = ['id', 'skill_name', 'importance', 'provenance']
+        read_only_fields = ['id', 'provenance']
 
 
 class JobSerializer(serializers.ModelSerializer):
@@ -17,3 +17,14 @@ class JobSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'company', 'description', 'location', 'salary_min', 'salary_max', 
                   'job_type', 'url', 'source', 'posted_date', 'required_skills', 'created_at', 'updated_at']
         read_only_fields = ['id', 'posted_date', 'created_at', 'updated_at']
+
+
+class JobListSerializer(serializers.ModelSerializer):
+    """Compact job representation for listings: no description, skills as names."""
+    skills = serializers.SlugRelatedField(source='required_skills', slug_field='skill_name', many=True, read_only=True)
+
+    class Meta:
+        model = Job
+        fields = ['id', 'title', 'company', 'location', 'salary_min', 'salary_max', 
+                  'job_type', 'posted_date', 'skills', 'updated_at']
+        read_only_fields = fields
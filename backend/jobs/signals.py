@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Job, JobSkill
+
+
+@receiver(post_save, sender=JobSkill)
+@receiver(post_delete, sender=JobSkill)
+def touch_job(sender, instance, **kwargs):
+    # A job's skills are part of its representation, so they move updated_at
+    # too; ETag/Last-Modified on the jobs API are derived from it
+    Job.objects.filter(pk=instance.job_id).update(updated_at=timezone.now())
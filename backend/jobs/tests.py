@@ -0,0 +1,245 @@
+import io
+import json
+import tempfile
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from ai_engine.job_skills import backfill_auto_skills
+from ai_engine.match_cache import get_catalog_version
+from .models import Job, JobSkill
+from .ingest import import_jobs
+from .search import fts_query, search_jobs
+
+
+class JobSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='searcher', password='secret-pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.backend = Job.objects.create(
+            title='Python Developer', company='Acme', description='Build APIs with Django.',
+            location='Berlin', job_type='full-time', salary_min=50000, salary_max=70000,
+        )
+        self.data = Job.objects.create(
+            title='Data Engineer', company='Initech', description='Python pipelines and SQL.',
+            location='Remote', job_type='contract', salary_min=80000, salary_max=90000,
+        )
+        self.frontend = Job.objects.create(
+            title='Frontend Developer', company='Globex', description='React and TypeScript.',
+            location='Berlin', job_type='full-time',
+        )
+
+    def search(self, **params):
+        response = self.client.get('/api/jobs/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [job['id'] for job in response.data['results']]
+
+    def test_title_hits_rank_first(self):
+        self.assertEqual(self.search(q='python'), [self.backend.id, self.data.id])
+
+    def test_all_words_must_match_and_last_is_a_prefix(self):
+        self.assertEqual(self.search(q='python pipe'), [self.data.id])
+        self.assertEqual(set(self.search(q='developers')), {self.backend.id, self.frontend.id})
+
+    def test_index_follows_updates_and_deletes(self):
+        self.frontend.description = 'React, TypeScript and some Python.'
+        self.frontend.save()
+        self.assertIn(self.frontend.id, self.search(q='python'))
+        self.backend.delete()
+        self.assertNotIn(self.backend.id, self.search(q='python'))
+
+    def test_bulk_created_jobs_are_indexed(self):
+        Job.objects.bulk_create([Job(title='Rust Engineer', company='Hooli', description='Systems work.')])
+        self.assertEqual(self.search(q='rust'), [Job.objects.get(title='Rust Engineer').id])
+
+    def test_filters(self):
+        self.assertEqual(set(self.search(location='berlin', job_type='full-time')), {self.backend.id, self.frontend.id})
+        self.assertEqual(self.search(q='python', min_salary=75000), [self.data.id])
+        self.assertEqual(self.search(q='python', max_salary=60000), [self.backend.id])
+        response = self.client.get('/api/jobs/search/', {'q': 'python', 'min_salary': 'lots'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_results_are_paginated(self):
+        Job.objects.bulk_create(
+            Job(title=f'Python Role {i}', company='Acme', description='') for i in range(25)
+        )
+        response = self.client.get('/api/jobs/search/', {'q': 'python'})
+        self.assertEqual(response.data['count'], 27)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(fts_query('c++ OR "NEAR('), '"c" "OR" "NEAR"*')
+        self.assertEqual(list(search_jobs('"*')), list(Job.objects.none()))
+
+
+class JobListingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='poller', password='secret-pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.create_jobs(3)
+
+    def create_jobs(self, count):
+        jobs = [Job.objects.create(title=f'Job {i}', company='Acme', description='Long text') for i in range(count)]
+        JobSkill.objects.bulk_create(
+            JobSkill(job=job, skill_name=skill) for job in jobs for skill in ('python', 'django')
+        )
+        return jobs
+
+    def count_queries(self, path, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_skills_are_prefetched(self):
+        small = self.count_queries('/api/jobs/')
+        self.create_jobs(10)
+        self.assertEqual(self.count_queries('/api/jobs/'), small)
+        self.assertEqual(self.count_queries('/api/jobs/search/', q='job'), self.count_queries('/api/jobs/search/', q='job 1'))
+
+    def test_compact_representation(self):
+        job = self.client.get('/api/jobs/', {'compact': 'true'}).data['results'][0]
+        self.assertNotIn('description', job)
+        self.assertEqual(sorted(job['skills']), ['django', 'python'])
+        self.assertIn('description', self.client.get('/api/jobs/').data['results'][0])
+
+    def test_unchanged_catalog_returns_not_modified(self):
+        response = self.client.get('/api/jobs/')
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.client.get('/api/jobs/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/api/jobs/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get('/api/jobs/', {'page': 1}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_bulk_skill_writes_produce_a_new_etag(self):
+        job = Job.objects.create(title='Backend', company='Acme', description='Rust services')
+        feed = json.dumps({'title': 'Job', 'company': 'Acme', 'url': 'https://example.com/x', 'skills': ['go']})
+        import_jobs(io.StringIO(feed + '\n'), extract=False)
+        list_etag = self.client.get('/api/jobs/')['ETag']
+
+        import_jobs(io.StringIO(feed.replace('["go"]', '["go", "rust"]') + '\n'), extract=False)
+        self.assertEqual(self.client.get('/api/jobs/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+        JobSkill.objects.filter(job=job).delete()
+        list_etag = self.client.get('/api/jobs/')['ETag']
+        job_etag = self.client.get(f'/api/jobs/{job.id}/')['ETag']
+        backfill_auto_skills(Job.objects.filter(pk=job.pk), workers=1)
+        self.assertEqual(self.client.get('/api/jobs/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+        self.assertEqual(self.client.get(f'/api/jobs/{job.id}/', HTTP_IF_NONE_MATCH=job_etag).status_code, 200)
+
+    def test_changes_produce_a_new_etag(self):
+        job = Job.objects.first()
+        list_etag = self.client.get('/api/jobs/')['ETag']
+        job_etag = self.client.get(f'/api/jobs/{job.id}/')['ETag']
+        self.assertEqual(self.client.get(f'/api/jobs/{job.id}/', HTTP_IF_NONE_MATCH=job_etag).status_code, 304)
+
+        JobSkill.objects.create(job=job, skill_name='react')
+        self.assertEqual(self.client.get('/api/jobs/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+        self.assertEqual(self.client.get(f'/api/jobs/{job.id}/', HTTP_IF_NONE_MATCH=job_etag).status_code, 200)
+
+        list_etag = self.client.get('/api/jobs/')['ETag']
+        Job.objects.last().delete()
+        self.assertEqual(self.client.get('/api/jobs/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+
+class JobImportTest(TestCase):
+    ROWS = [
+        {'title': 'Python Developer', 'company': 'Acme', 'description': 'Django and Docker.',
+         'url': 'https://example.com/1', 'source': 'feed', 'skills': ['PostgreSQL']},
+        {'title': 'Data Engineer', 'company': 'Initech', 'description': 'Spark pipelines.',
+         'url': 'https://example.com/2', 'source': 'feed', 'salary_max': 90000},
+        {'title': 'Missing company', 'description': ''},
+    ]
+
+    def jsonl(self, rows):
+        return '\n'.join(json.dumps(row) for row in rows) + '\n'
+
+    def skills(self, url):
+        return sorted(JobSkill.objects.filter(job__url=url).values_list('skill_name', flat=True))
+
+    def test_import_upserts_by_source_and_url(self):
+        stats = import_jobs(io.StringIO(self.jsonl(self.ROWS)), batch_size=2)
+        self.assertEqual((stats.rows, stats.created, stats.updated, stats.skipped), (3, 2, 0, 1))
+        self.assertEqual(self.skills('https://example.com/1'), ['PostgreSQL', 'django', 'docker'])
+
+        stats = import_jobs(io.StringIO(self.jsonl(self.ROWS[:2])))
+        self.assertEqual((stats.created, stats.updated, stats.unchanged), (0, 0, 2))
+
+        changed = dict(self.ROWS[0], title='Senior Python Developer')
+        stats = import_jobs(io.StringIO(self.jsonl([changed])))
+        self.assertEqual((stats.created, stats.updated), (0, 1))
+        self.assertEqual(Job.objects.get(url='https://example.com/1').title, 'Senior Python Developer')
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_updates_invalidate_cached_match_lists(self):
+        import_jobs(io.StringIO(self.jsonl(self.ROWS[:1])))
+        before = get_catalog_version()
+        changed = dict(self.ROWS[0], title='Senior Python Developer')
+        with self.captureOnCommitCallbacks(execute=True):
+            import_jobs(io.StringIO(self.jsonl([changed])))
+        self.assertNotEqual(get_catalog_version(), before)
+
+    def test_skill_only_changes_count_as_updates(self):
+        import_jobs(io.StringIO(self.jsonl(self.ROWS[:1])), extract=False)
+        before = get_catalog_version()
+        changed = dict(self.ROWS[0], skills=['PostgreSQL', 'Rust'])
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = import_jobs(io.StringIO(self.jsonl([changed])), extract=False)
+        self.assertEqual((stats.updated, stats.unchanged, stats.skills), (1, 0, 1))
+        self.assertNotEqual(get_catalog_version(), before)
+        self.assertEqual(self.skills('https://example.com/1'), ['PostgreSQL', 'Rust'])
+
+    def test_fields_of_the_wrong_type_are_skipped(self):
+        rows = [
+            {'title': 123, 'company': 'Acme'},
+            {'title': 'QA', 'company': 'Acme', 'job_type': ['contract']},
+            {'title': 'QA', 'company': 'Acme', 'skills': {'name': 'Jest'}},
+            self.ROWS[1],
+        ]
+        stats = import_jobs(io.StringIO(self.jsonl(rows)))
+        self.assertEqual((stats.created, stats.skipped), (1, 3))
+        self.assertIn('title must be a string', stats.errors[0])
+
+    def test_batches_use_a_fixed_number_of_queries(self):
+        def run(count):
+            rows = [dict(self.ROWS[0], url=f'https://example.com/{count}/{i}') for i in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                import_jobs(io.StringIO(self.jsonl(rows)), batch_size=count)
+            return len(ctx.captured_queries)
+        # The first import also creates the skills' terms
+        run(1)
+        self.assertEqual(run(5), run(50))
+
+    def test_csv_and_progress(self):
+        data = 'title,company,description,skills,salary_min\nQA,Acme,Selenium tests,Jest;Cypress,50000\nBad,Acme,,,lots\n'
+        seen = []
+        stats = import_jobs(io.BytesIO(data.encode()), fmt='csv', extract=False, progress=lambda s: seen.append(s.rows))
+        self.assertEqual((stats.created, stats.skipped), (1, 1))
+        self.assertIn('line 3', stats.errors[0])
+        self.assertEqual(seen, [2])
+        self.assertEqual(sorted(JobSkill.objects.values_list('skill_name', flat=True)), ['Cypress', 'Jest'])
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as feed:
+            feed.write(self.jsonl(self.ROWS))
+            feed.flush()
+            out = io.StringIO()
+            call_command('import_jobs', feed.name, stdout=out, stderr=io.StringIO())
+        self.assertIn('2 created', out.getvalue())
+
+    def test_bulk_import_endpoint_is_admin_only(self):
+        client = APIClient()
+        upload = SimpleUploadedFile('feed.jsonl', self.jsonl(self.ROWS).encode())
+        client.force_authenticate(User.objects.create_user(username='member', password='secret-pass'))
+        self.assertEqual(client.post('/api/jobs/bulk_import/', {'file': upload}).status_code, 403)
+
+        upload.seek(0)
+        client.force_authenticate(User.objects.create_superuser(username='admin', password='secret-pass'))
+        response = client.post('/api/jobs/bulk_import/', {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
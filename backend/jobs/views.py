@@ -1,17 +1,70 @@
+import hashlib
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .ingest import detect_format, import_jobs
 from .models import Job, JobSkill
-from .serializers import JobSerializer, JobSkillSerializer
+from .search import search_jobs
+from .serializers import JobListSerializer, JobSerializer, JobSkillSerializer
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def conditional(request, etag_source, last_modified, respond):
+    """
+    Answer a GET with 304 when the client's ETag/Last-Modified are still current.
+
+    `respond` builds the full response only when it is actually needed.
+    """
+    etag = quote_etag(hashlib.sha256(etag_source.encode()).hexdigest()[:32])
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = respond()
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    return response
 
 
 class JobViewSet(viewsets.ModelViewSet):
-    queryset = Job.objects.all()
+    # Skills are serialized for every job, so load them in one extra query per page
+    queryset = Job.objects.prefetch_related('required_skills')
     serializer_class = JobSerializer
 
+    def get_serializer_class(self):
+        compact = self.request.query_params.get('compact', '').lower() in ('1', 'true', 'yes')
+        if compact and self.action in ('list', 'search'):
+            return JobListSerializer
+        return super().get_serializer_class()
+
+    def list(self, request, *args, **kwargs):
+        # Validators cover every job in the catalog: row count for deletions,
+        # newest updated_at for inserts and edits (JobSkill writes, bulk ones
+        # included, touch their job), and the query string for the page and
+        # representation
+        stats = self.get_queryset().aggregate(count=Count('id'), last_modified=Max('updated_at'))
+        etag_source = f"list:{stats['count']}:{stats['last_modified']}:{request.query_params.urlencode()}"
+        return conditional(
+            request, etag_source, stats['last_modified'],
+            lambda: super(JobViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        job = self.get_object()
+        etag_source = f'job:{job.pk}:{job.updated_at}'
+        return conditional(
+            request, etag_source, job.updated_at,
+            lambda: Response(self.get_serializer(job).data)
+        )
+
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'bulk_import']:
             permission_classes = [IsAdminUser]
         else:
             permission_classes = [IsAuthenticated]
@@ -19,16 +72,18 @@ class JobViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def search(self, request):
+        """Ranked full-text search with location, job_type and salary filters, paginated."""
         query = request.query_params.get('q', '')
-        jobs = Job.objects.filter(
-            title__icontains=query
-        ) | Job.objects.filter(
-            description__icontains=query
-        ) | Job.objects.filter(
-            company__icontains=query
-        )
-        serializer = self.get_serializer(jobs, many=True)
-        return Response(serializer.data)
+        try:
+            jobs = search_jobs(query, request.query_params, queryset=self.get_queryset())
+        except ValueError:
+            return Response(
+                {'error': 'min_salary and max_salary must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        page = self.paginate_queryset(jobs)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
     def add_skill(self, request, pk=None):
@@ -46,3 +101,20 @@ class JobViewSet(viewsets.ModelViewSet):
         )
         serializer = JobSkillSerializer(job_skill)
         return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk_import(self, request):
+        """Import an uploaded JSONL/CSV feed; jobs are upserted by (source, url)."""
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('format') or detect_format(upload.name)
+        if fmt not in ('jsonl', 'csv'):
+            return Response({'error': 'format must be jsonl or csv'}, status=status.HTTP_400_BAD_REQUEST)
+        extract = str(request.data.get('extract', True)).lower() not in ('false', '0', 'no')
+        
+        def report(stats):
+            logger.info(f'Job import {upload.name}: {stats.rows} rows, {stats.rate:.0f} rows/s')
+        
+        stats = import_jobs(upload.file, fmt=fmt, extract=extract, progress=report)
+        return Response(stats.as_dict(), status=status.HTTP_200_OK)
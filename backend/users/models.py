@@ -27,6 +27,10 @@ class Resume(models.Model):
 class Skill(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='skills')
     name = models.CharField(max_length=255)
+    # Canonical skill, resolved from name when the row is saved
+    term = models.ForeignKey(
+        'ai_engine.SkillTerm', on_delete=models.SET_NULL, null=True, blank=True, related_name='user_skills'
+    )
     proficiency = models.CharField(
         max_length=20,
         choices=[('beginner', 'Beginner'), ('intermediate', 'Intermediate'), ('expert', 'Expert')],
@@ -5,6 +5,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth.models import User
 from .models import UserProfile, Resume, Skill
 from .serializers import UserSerializer, UserRegisterSerializer, SkillSerializer, ResumeSerializer
+from ai_engine.tasks import enqueue_resume_parse
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -49,8 +50,12 @@ class UserViewSet(viewsets.ModelViewSet):
         resume.file = file
         resume.save()
         
-        serializer = ResumeSerializer(resume)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        # Parse in the background; the client polls /api/ai/parse-tasks/<task_id>/
+        task = enqueue_resume_parse(resume)
+        
+        data = ResumeSerializer(resume).data
+        data['task_id'] = str(task.id)
+        return Response(data, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def resume(self, request):
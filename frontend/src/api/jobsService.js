@@ -1,13 +1,15 @@
 import apiClient from './apiClient';
 
 const jobsService = {
-  getJobs: async (page = 1) => {
-    const response = await apiClient.get('/jobs/', { params: { page } });
+  getJobs: async (page = 1, { compact = false } = {}) => {
+    // compact listings omit descriptions and return skills as plain names
+    const response = await apiClient.get('/jobs/', { params: compact ? { page, compact: true } : { page } });
     return response.data;
   },
 
-  searchJobs: async (query) => {
-    const response = await apiClient.get('/jobs/search/', { params: { q: query } });
+  searchJobs: async (query, filters = {}, page = 1) => {
+    // filters: location, job_type, min_salary, max_salary; results are ranked and paginated
+    const response = await apiClient.get('/jobs/search/', { params: { q: query, page, ...filters } });
     return response.data;
   },
 
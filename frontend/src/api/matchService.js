@@ -1,12 +1,16 @@
 import apiClient from './apiClient';
 
 const matchService = {
-  getMatches: async (page = 1, pageSize = 10) => {
+  getMatches: async (page = 1, pageSize = 10, options = {}) => {
     try {
+      const { cursor, sort_by, seed } = options;
       const response = await apiClient.get('/ai/matches/', { 
         params: { 
           page, 
-          page_size: pageSize 
+          page_size: pageSize,
+          cursor,
+          sort_by,
+          seed
         } 
       });
       return response.data;
@@ -18,12 +22,14 @@ const matchService = {
 
   runMatching: async (options = {}) => {
     try {
-      const { page = 1, page_size = 10, sort_by = 'score', min_score = 0 } = options;
+      const { page = 1, page_size = 10, sort_by = 'score', min_score = 0, scoring } = options;
+      // scoring: 'legacy' or 'weighted' (importance/proficiency); omitted uses the server default
       const response = await apiClient.post('/ai/matches/run_matching/', {
         page,
         page_size,
         sort_by,
-        min_score
+        min_score,
+        ...(scoring ? { scoring } : {})
       });
       return response.data;
     } catch (error) {
@@ -37,6 +43,23 @@ const matchService = {
     return response.data;
   },
 
+  getParseTask: async (taskId) => {
+    const response = await apiClient.get(`/ai/parse-tasks/${taskId}/`);
+    return response.data;
+  },
+
+  waitForParseTask: async (taskId, { interval = 1000, timeout = 120000 } = {}) => {
+    const deadline = Date.now() + timeout;
+    while (Date.now() < deadline) {
+      const task = await matchService.getParseTask(taskId);
+      if (task.status === 'completed' || task.status === 'failed') {
+        return task;
+      }
+      await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+    throw new Error('Resume parsing timed out.');
+  },
+
   uploadResume: async (file) => {
     const formData = new FormData();
     formData.append('file', file);
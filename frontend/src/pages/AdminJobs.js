@@ -25,7 +25,7 @@ function AdminJobs() {
 
   const fetchJobs = async () => {
     try {
-      const data = await jobsService.getJobs();
+      const data = await jobsService.getJobs(1, { compact: true });
       setJobs(data.results || []);
     } catch (err) {
       setError('Failed to load jobs.');
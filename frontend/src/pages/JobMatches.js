@@ -16,6 +16,15 @@ function JobMatches() {
   const [sortBy, setSortBy] = useState('score');
   const [minScore, setMinScore] = useState(0);
   const [refreshCount, setRefreshCount] = useState(0);
+  // cursors[n] fetches page n + 1; pages are walked with the server's next_cursor
+  const [cursors, setCursors] = useState([null]);
+  const [listSort, setListSort] = useState({ sort_by: 'score', seed: undefined });
+
+  const rememberCursor = (page, nextCursor, base = cursors) => {
+    const updated = base.slice(0, page);
+    updated[page] = nextCursor;
+    setCursors(updated);
+  };
 
   useEffect(() => {
     fetchMatches(1);
@@ -25,9 +34,13 @@ function JobMatches() {
     setLoading(true);
     setError('');
     try {
-      const data = await matchService.getMatches(page, pageSize);
+      const data = await matchService.getMatches(page, pageSize, {
+        cursor: cursors[page - 1] || undefined,
+        ...listSort
+      });
       setMatches(data.results || data.matches || []);
       setCurrentPage(data.page || page);
+      rememberCursor(page, data.next_cursor);
       setTotalMatches(data.total_matches || 0);
       setTotalPages(data.total_pages || 1);
       setHasNext(data.has_next || false);
@@ -53,6 +66,8 @@ function JobMatches() {
       });
       setSuccess(result.message || 'Matching completed successfully!');
       setMatches(result.matches || []);
+      setListSort({ sort_by: sortBy, seed: result.seed });
+      rememberCursor(1, result.next_cursor, [null]);
       setTotalMatches(result.total_matches || 0);
       setTotalPages(result.total_pages || 1);
       setHasNext(result.has_next || false);
@@ -92,6 +107,8 @@ function JobMatches() {
       const jobsShown = result.total_matches;
       setSuccess(result.message || `Showing ${jobsShown} jobs with lower requirements!`);
       setMatches(result.matches || []);
+      setListSort({ sort_by: 'random', seed: result.seed });
+      rememberCursor(1, result.next_cursor, [null]);
       setTotalMatches(result.total_matches || 0);
       setTotalPages(result.total_pages || 1);
       setHasNext(result.has_next || false);
@@ -128,9 +145,10 @@ function JobMatches() {
     if (totalMatches > 0) {
       setLoading(true);
       try {
-        const data = await matchService.getMatches(1, newSize);
+        const data = await matchService.getMatches(1, newSize, listSort);
         setMatches(data.results || data.matches || []);
         setCurrentPage(data.page || 1);
+        rememberCursor(1, data.next_cursor, [null]);
         setTotalMatches(data.total_matches || 0);
         setTotalPages(data.total_pages || 1);
         setHasNext(data.has_next || false);
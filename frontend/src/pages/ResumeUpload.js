@@ -78,12 +78,16 @@ function ResumeUpload() {
     setSuccess('');
 
     try {
-      await matchService.uploadResume(file);
+      const uploaded = await matchService.uploadResume(file);
       setSuccess('Resume uploaded successfully!');
       setFile(null);
 
-      // Parse and extract skills
-      const result = await matchService.parseAndExtract();
+      // Parsing runs in the background; wait for the extracted skills
+      const result = await matchService.waitForParseTask(uploaded.task_id);
+      if (result.status === 'failed') {
+        setError(result.error || 'Failed to parse resume.');
+        return;
+      }
       setExtractedSkills(result.skills);
       setResumeData({
         email: result.email || '',